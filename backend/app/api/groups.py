@@ -1,10 +1,12 @@
 # app/api/groups.py
+import json
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 from app.api.utils.auth import AuthContext
 from app.api.utils.authorization import authorize_group_access
+from app.api.utils.responses import model_response, validate_items
 from app.schemas.groups import Group
 from app.schemas.users import ErrorResponse, UserBrief, UsersBriefResponse
 from app.services.group_service import GroupService
@@ -53,33 +55,49 @@ async def read_group(
     "/groups/{groupid}/users",
     response_model=UsersBriefResponse,
     summary="グループメンバーの取得",
-    description="指定されたグループIDに所属するユーザー一覧を取得します。",
+    description=(
+        "指定されたグループIDに所属するユーザー一覧を取得します。"
+        "ユーザー名は users テーブルの最新の値で補完され、startkey によるページングと並べ替えに対応します。"
+    ),
+    responses={
+        400: {"model": ErrorResponse, "description": "Bad Request"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+        404: {"model": ErrorResponse, "description": "Resource not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
 )
 async def get_group_members(
     groupid: str,
     request: Request,
+    limit: int = Query(100, ge=1, le=1000, description="最大取得数"),
+    startkey: str | None = Query(None, description="前ページの LastEvaluatedKey（JSON文字列）"),
+    sort: str = Query("userid", pattern="^(userid|username)$", description="並べ替えのキー"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="並び順"),
     auth: AuthContext = Depends(get_auth_context),
-) -> UsersBriefResponse:
+) -> Response:
     await log_start(request)
     authorize_group_access(auth, groupid, required_permission="get_members")
 
     try:
-        res = group_service.get_group_members(groupid)
+        startkey_dict = json.loads(startkey) if startkey else None
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid startkey format")
+
+    try:
+        res = group_service.list_group_members(groupid, limit=limit, startkey=startkey_dict, sort=sort, order=order)
     except Exception:
         logger.exception(f"🔥 get_group_members 例外 - groupid={groupid}")
         raise HTTPException(status_code=500, detail="Failed to retrieve group members")
 
-    if res.data is None:
+    if res.code == 404 or (res.is_success and res.data is None):
         logger.warning(f"Group not found when getting members - groupid={groupid}")
         raise HTTPException(status_code=404, detail="Group not found")
+    if not res.is_success or res.data is None:
+        raise HTTPException(status_code=res.code, detail=res.detail)
 
-    # 1. サービスから返ってきたデータ（リスト）を取得
-    # res.data.item が list[dict] または list[User] である前提
-    members_data = res.data.item if res.data.item is not None else []
-
-    # 2. 各要素を UserBrief Pydanticモデルに変換してリスト化
-    # こうすることで、型が list[UserBrief] に確定します
-    validated_members = [UserBrief.model_validate(m) for m in members_data]
-    logger.info(f"Group members retrieved successfully - groupid={groupid}")
+    # TypeAdapter でまとめて UserBrief に変換してリスト化
+    validated_members = validate_items(UserBrief, res.data.items)
+    logger.info(f"Group members retrieved successfully - groupid={groupid} (count={res.data.count})")
 
-    return UsersBriefResponse(Items=validated_members)
+    return model_response(UsersBriefResponse, Items=validated_members, LastEvaluatedKey=res.data.last_evaluated_key)
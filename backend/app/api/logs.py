@@ -1,15 +1,32 @@
 # app/api/logs.py
 
+import itertools
 import json
 import logging
+from collections.abc import AsyncIterator
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from app.api.utils.auth import AuthContext
 from app.api.utils.authorization import authorize_group_access
-from app.schemas.logs import ErrorResponse, LogItem, LogsResponse
+from app.api.utils.responses import model_response, validate_items
+from app.api.utils.sse import SSE_HEADERS, sse_comment, sse_event, sse_retry
+from app.schemas.logs import (
+    ErrorResponse,
+    LogBatchRequest,
+    LogBatchResponse,
+    LogBatchResult,
+    LogItem,
+    LogsResponse,
+    LogStatsResponse,
+)
 from app.services.log_service import LogsService
+from app.services.log_stats_service import LogStatsService
+from app.services.log_stream_service import LogStreamService, get_log_stream_broker
 from app.utils.access_log import log_start
+from app.utils.log_export import MEDIA_TYPES
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -39,8 +56,12 @@ async def list_logs(
     end: str | None = Query(None, description="終了日時(ISO)（<=）"),
     userid: str | None = Query(None, description="ユーザーIDでフィルタ"),
     type_: str | None = Query(None, alias="type", description="タイプでフィルタ"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="並び順（asc: 古い順 / desc: 新しい順）"),
+    direction: str = Query(
+        "next", pattern="^(next|prev)$", description="next: startkey=LastEvaluatedKey / prev: startkey=PrevKey"
+    ),
     auth: AuthContext = Depends(get_auth_context),
-) -> LogsResponse:
+) -> Response:
     await log_start(request)
     authorize_group_access(auth, groupid, required_permission="list_logs")
     try:
@@ -54,16 +75,329 @@ async def list_logs(
             begin=begin,
             end=end,
             type_=type_,
+            order=order,
+            direction=direction,
         )
         if res.data is None:
             logger.warning(f"No logs found for groupid={groupid}")
-            return LogsResponse(Items=[], LastEvaluatedKey=None)
-        logs = [LogItem.model_validate(item) for item in res.data.items if item is not None]
+            return model_response(LogsResponse, Items=[], LastEvaluatedKey=None)
+        logs = validate_items(LogItem, res.data.items)
         logger.info(f"Logs retrieved successfully for groupid={groupid} (count={res.data.count})")
-        return LogsResponse(Items=logs, LastEvaluatedKey=res.data.last_evaluated_key)
+        return model_response(
+            LogsResponse, Items=logs, LastEvaluatedKey=res.data.last_evaluated_key, PrevKey=res.data.prev_key
+        )
 
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid startkey format")
     except Exception:
         logger.exception(f"🔥 list_logs 例外 - groupid={groupid}, userid={userid}")
         raise HTTPException(status_code=500, detail="Failed to list logs")
+
+
+@router.get(
+    "/logs",
+    response_model=LogsResponse,
+    summary="複数グループのログタイムライン",
+    description=(
+        "groupids（カンマ区切り、最大20件）の各グループのログを created_at 順に1本にまとめて返します。"
+        "LastEvaluatedKey はグループごとの読み出し位置を持つ複合カーソルで、そのまま startkey に渡します。"
+    ),
+    responses={
+        400: {"model": ErrorResponse, "description": "Bad Request"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+        404: {"model": ErrorResponse, "description": "Resource not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def list_timeline(
+    request: Request,
+    groupids: str = Query(..., min_length=1, description="グループID（カンマ区切り）"),
+    limit: int = Query(25, ge=1, le=1000, description="最大取得数"),
+    startkey: str | None = Query(None, description="前ページの LastEvaluatedKey（JSON文字列）"),
+    begin: str | None = Query(None, description="開始日時(ISO)（>=）"),
+    end: str | None = Query(None, description="終了日時(ISO)（<=）"),
+    type_: str | None = Query(None, alias="type", description="タイプでフィルタ"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="並び順（asc: 古い順 / desc: 新しい順）"),
+    auth: AuthContext = Depends(get_auth_context),
+) -> Response:
+    await log_start(request)
+    ids = list(dict.fromkeys(groupid.strip() for groupid in groupids.split(",") if groupid.strip()))
+    if not ids or len(ids) > 20:
+        raise HTTPException(status_code=400, detail="groupids must contain 1 to 20 group IDs")
+    for groupid in ids:
+        authorize_group_access(auth, groupid, required_permission="list_logs")
+
+    try:
+        startkey_dict = json.loads(startkey) if startkey else None
+        res = LogsService().list_timeline(
+            groupids=ids,
+            limit=limit,
+            startkey=startkey_dict,
+            begin=begin,
+            end=end,
+            type_=type_,
+            order=order,
+        )
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid startkey format")
+    except Exception:
+        logger.exception(f"🔥 list_timeline 例外 - groupids={ids}")
+        raise HTTPException(status_code=500, detail="Failed to list logs")
+
+    if not res.is_success or res.data is None:
+        raise HTTPException(status_code=res.code, detail=res.detail)
+
+    logs = validate_items(LogItem, res.data.items)
+    logger.info(f"Timeline retrieved successfully for groupids={ids} (count={res.data.count})")
+    return model_response(LogsResponse, Items=logs, LastEvaluatedKey=res.data.last_evaluated_key)
+
+
+@router.get(
+    "/groups/{groupid}/logs/stats",
+    response_model=LogStatsResponse,
+    summary="ログ件数の集計",
+    description=(
+        "集計テーブルの時間バケット（hour / day）だけを読み、期間内のログ件数を type / userid 別に返します。"
+        "begin / end はバケット単位に丸められます。"
+    ),
+    responses={
+        400: {"model": ErrorResponse, "description": "Bad Request"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+        404: {"model": ErrorResponse, "description": "Resource not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def get_log_stats(
+    request: Request,
+    groupid: str = Path(..., description="グループID（パーティションキー）"),
+    granularity: str = Query("day", pattern="^(hour|day)$", description="集計の単位"),
+    begin: str | None = Query(None, description="開始日時(ISO)（>=）"),
+    end: str | None = Query(None, description="終了日時(ISO)（<=）"),
+    userid: str | None = Query(None, description="ユーザーIDで絞り込み"),
+    type_: str | None = Query(None, alias="type", description="タイプで絞り込み"),
+    auth: AuthContext = Depends(get_auth_context),
+) -> LogStatsResponse:
+    await log_start(request)
+    authorize_group_access(auth, groupid, required_permission="list_logs")
+
+    try:
+        res = LogStatsService().get_stats(
+            groupid=groupid,
+            granularity=granularity,
+            begin=begin,
+            end=end,
+            userid=userid,
+            type_=type_,
+        )
+    except Exception:
+        logger.exception(f"🔥 get_log_stats 例外 - groupid={groupid}")
+        raise HTTPException(status_code=500, detail="Failed to get log stats")
+
+    if not res.is_success or res.data is None:
+        raise HTTPException(status_code=res.code, detail=res.detail)
+
+    logger.info(f"Log stats retrieved successfully for groupid={groupid} (total={res.data.item['total']})")
+    return LogStatsResponse.model_validate(res.data.item)
+
+
+@router.get(
+    "/groups/{groupid}/logs/search",
+    response_model=LogsResponse,
+    summary="ログメッセージの全文検索",
+    description=(
+        "転置インデックスを使い、q の全ての語を message に含むログを created_at 昇順で返します。"
+        "日本語は文字 bi-gram、英数字は単語単位で照合します。logs テーブルは Scan しません。"
+    ),
+    responses={
+        400: {"model": ErrorResponse, "description": "Bad Request"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+        404: {"model": ErrorResponse, "description": "Resource not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def search_logs(
+    request: Request,
+    groupid: str = Path(..., description="グループID（パーティションキー）"),
+    q: str = Query(..., min_length=1, max_length=256, description="検索語（空白区切りで AND）"),
+    limit: int = Query(25, ge=1, le=100, description="最大取得数"),
+    startkey: str | None = Query(None, description="前ページの LastEvaluatedKey（JSON文字列）"),
+    begin: str | None = Query(None, description="開始日時(ISO)（>=）"),
+    end: str | None = Query(None, description="終了日時(ISO)（<=）"),
+    auth: AuthContext = Depends(get_auth_context),
+) -> Response:
+    await log_start(request)
+    authorize_group_access(auth, groupid, required_permission="list_logs")
+    try:
+        startkey_dict = json.loads(startkey) if startkey else None
+        res = LogsService().search_logs(
+            groupid=groupid,
+            q=q,
+            limit=limit,
+            startkey=startkey_dict,
+            begin=begin,
+            end=end,
+        )
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid startkey format")
+    except Exception:
+        logger.exception(f"🔥 search_logs 例外 - groupid={groupid}, q={q!r}")
+        raise HTTPException(status_code=500, detail="Failed to search logs")
+
+    if not res.is_success or res.data is None:
+        raise HTTPException(status_code=res.code, detail=res.detail)
+
+    logs = validate_items(LogItem, res.data.items)
+    logger.info(f"Logs searched successfully for groupid={groupid} (count={res.data.count})")
+    return model_response(LogsResponse, Items=logs, LastEvaluatedKey=res.data.last_evaluated_key)
+
+
+@router.get(
+    "/groups/{groupid}/logs/export",
+    summary="ログのエクスポート",
+    description=(
+        "条件に一致するログを件数上限なしで NDJSON / CSV としてストリーミング返却します。"
+        "DynamoDB から1ページ読むごとに送信するため、メモリ使用量は件数に依存しません。"
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/x-ndjson": {}, "text/csv": {}}, "description": "エクスポートデータ"},
+        400: {"model": ErrorResponse, "description": "Bad Request"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+        404: {"model": ErrorResponse, "description": "Resource not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def export_logs(
+    request: Request,
+    groupid: str = Path(..., description="グループID（パーティションキー）"),
+    format_: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="出力形式"),
+    begin: str | None = Query(None, description="開始日時(ISO)（>=）"),
+    end: str | None = Query(None, description="終了日時(ISO)（<=）"),
+    userid: str | None = Query(None, description="ユーザーIDでフィルタ"),
+    type_: str | None = Query(None, alias="type", description="タイプでフィルタ"),
+    gzip: bool = Query(False, description="gzip 圧縮して返す"),
+    auth: AuthContext = Depends(get_auth_context),
+) -> StreamingResponse:
+    await log_start(request)
+    authorize_group_access(auth, groupid, required_permission="list_logs")
+
+    logs_service = LogsService()
+    stream = logs_service.export_logs(
+        groupid=groupid,
+        fmt=format_,
+        begin=begin,
+        end=end,
+        userid=userid,
+        type_=type_,
+        gzip=gzip,
+    )
+
+    # 最初のチャンクだけは先に読み、DynamoDB のエラーをステータスコードで返せるようにする
+    try:
+        first_chunk = next(stream, b"")
+    except ClientError:
+        logger.exception(f"🔥 export_logs 例外 - groupid={groupid}, userid={userid}")
+        raise HTTPException(status_code=500, detail="Failed to export logs")
+
+    headers = {"Content-Disposition": f'attachment; filename="{groupid}-logs.{format_}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    logger.info(f"Logs export started for groupid={groupid} (format={format_}, gzip={gzip})")
+    # 同期イテレータは Starlette がスレッドプールで1チャンクずつ取り出すため、
+    # クライアントへの送信が終わるまで次の DynamoDB ページは読まれない
+    return StreamingResponse(itertools.chain([first_chunk], stream), media_type=MEDIA_TYPES[format_], headers=headers)
+
+
+@router.get(
+    "/groups/{groupid}/logs/stream",
+    summary="ログのライブ配信（SSE）",
+    description=(
+        "新しいログを Server-Sent Events（text/event-stream）で配信します。各イベントの id は created_at です。"
+        "再接続時に Last-Event-ID ヘッダー（または last_event_id パラメータ）を送ると、"
+        "それより新しいログを読み直してからライブ配信に合流します。"
+    ),
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "log イベントのストリーム"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+    },
+)
+async def stream_logs(
+    request: Request,
+    groupid: str = Path(..., description="グループID（パーティションキー）"),
+    last_event_id: str | None = Query(None, description="この created_at より新しいログから再開する"),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+    auth: AuthContext = Depends(get_auth_context),
+) -> StreamingResponse:
+    await log_start(request)
+    authorize_group_access(auth, groupid, required_permission="list_logs")
+
+    resume_from = last_event_id_header or last_event_id
+    fields = list(LogItem.model_fields)
+
+    async def events() -> AsyncIterator[bytes]:
+        yield sse_retry(3000)
+        async for item in LogStreamService().stream_logs(groupid, last_event_id=resume_from):
+            if item is None:
+                yield sse_comment("keep-alive")
+                continue
+            data = {field: item.get(field) for field in fields}
+            yield sse_event(data, event="log", event_id=item["created_at"])
+
+    logger.info(f"Log stream started for groupid={groupid} (last_event_id={resume_from})")
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post(
+    "/groups/{groupid}/logs:batch",
+    response_model=LogBatchResponse,
+    summary="ログの一括書き込み",
+    description=(
+        "最大5000件のログをまとめて書き込み、エントリごとの結果（created / duplicate / failed）を返します。"
+        "created_at を省略したエントリはサーバー側で採番し、GSI 用の groupid#type / groupid#userid を付与します。"
+        "created_at は UTC・マイクロ秒固定長の形式に揃えて保存し、結果の created_at もその形式で返します。"
+        "created_at がアーカイブ済みの期間のエントリを含む場合は、何も書き込まずに 400 を返します。"
+        "idempotency_key が同じエントリは、別のバッチ・リトライ（24時間以内）でも1度だけ書き込みます。"
+        "created_at を指定したエントリは既存のログを上書きせず、同じ内容なら duplicate、違う内容なら failed になります。"
+    ),
+    responses={
+        400: {"model": ErrorResponse, "description": "Bad Request"},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        403: {"model": ErrorResponse, "description": "Forbidden"},
+        404: {"model": ErrorResponse, "description": "Resource not found"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+    },
+)
+async def ingest_logs(
+    request: Request,
+    body: LogBatchRequest,
+    groupid: str = Path(..., description="グループID（パーティションキー）"),
+    auth: AuthContext = Depends(get_auth_context),
+) -> Response:
+    await log_start(request)
+    authorize_group_access(auth, groupid, required_permission="write_logs")
+
+    try:
+        entries = [entry.model_dump() for entry in body.entries]
+        res = LogsService().ingest_logs(groupid, entries, publish=get_log_stream_broker().publish)
+    except Exception:
+        logger.exception(f"🔥 ingest_logs 例外 - groupid={groupid}")
+        raise HTTPException(status_code=500, detail="Failed to write logs")
+
+    if not res.is_success or res.data is None:
+        raise HTTPException(status_code=res.code, detail=res.detail)
+
+    summary = res.data.item
+    results = validate_items(LogBatchResult, summary["results"])
+    return model_response(
+        LogBatchResponse,
+        created=summary["created"],
+        duplicates=summary["duplicates"],
+        failed=summary["failed"],
+        results=results,
+    )
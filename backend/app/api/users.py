@@ -5,10 +5,11 @@ import logging
 from datetime import UTC, datetime
 
 from botocore.exceptions import ClientError
-from fastapi import APIRouter, Body, HTTPException, Query, Request
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
 from pydantic import ValidationError
 
 from app.api.utils.auth import AuthContext
+from app.api.utils.responses import model_response, validate_items
 from app.schemas.users import (
     ErrorResponse,
     MessageResponse,
@@ -44,7 +45,7 @@ async def list_users(
     request: Request,
     limit: int = Query(25, ge=1, le=1000, description="最大取得数"),
     startkey: str | None = Query(None, description="ExclusiveStartKey相当"),
-) -> UsersResponse:
+) -> Response:
     await log_start(request)
 
     startkey_dict = json.loads(startkey) if startkey else None
@@ -56,13 +57,13 @@ async def list_users(
         raise HTTPException(status_code=res.code, detail=res.detail)
 
     try:
-        # model_validate を使うことで、型チェックとバリデーションが同時に行われます
-        validated_users = [User.model_validate(item) for item in res.data.items if item is not None]
+        # TypeAdapter でリスト全体をまとめて検証します
+        validated_users = validate_items(User, res.data.items)
     except Exception as e:
         logger.error(f"User validation failed: {e}")
         raise HTTPException(status_code=500, detail="Data integrity error")  # noqa: B904
 
-    return UsersResponse(Items=validated_users, LastEvaluatedKey=res.data.last_evaluated_key)
+    return model_response(UsersResponse, Items=validated_users, LastEvaluatedKey=res.data.last_evaluated_key)
 
 
 @router.post(
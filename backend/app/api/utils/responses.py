@@ -0,0 +1,52 @@
+# app/api/utils/responses.py
+"""
+レスポンス生成ユーティリティ
+
+一覧系 API では DynamoDB から取得した dict のリストを Pydantic モデルに変換して返す。
+アイテムごとに model_validate を呼び、さらに FastAPI の response_model で再検証・再シリアライズすると
+1000件規模のページでは CPU 時間の大半がここに費やされるため、以下の方針で1回ずつに抑える。
+
+- リストはキャッシュした TypeAdapter でまとめて検証する（validate_items）
+- 検証済みのモデルは model_construct で包み、再検証しない
+- JSON バイト列へ直接シリアライズした Response を返し、response_model による二重処理を避ける
+  （response_model はドキュメント生成のためにデコレータへ残しておく）
+"""
+
+from functools import cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+@cache
+def get_type_adapter(tp: Any) -> TypeAdapter[Any]:
+    """型ごとに TypeAdapter を1度だけ生成して使い回す。"""
+    return TypeAdapter(tp)
+
+
+def validate_items[M: BaseModel](model: type[M], items: list[Any]) -> list[M]:
+    """dict のリストをまとめて検証し、モデルのリストに変換する。None は除外する。"""
+    adapter: TypeAdapter[list[M]] = get_type_adapter(list[model])  # type: ignore[valid-type]
+    return adapter.validate_python([item for item in items if item is not None])
+
+
+class ModelJSONResponse(Response):
+    """検証済みの Pydantic モデルを JSON バイト列へ直接シリアライズする Response。"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        content_type: Any = type(content)
+        return get_type_adapter(content_type).dump_json(content)
+
+
+def model_response[M: BaseModel](response_model: type[M], status_code: int = 200, **fields: Any) -> ModelJSONResponse:
+    """
+    検証済みのフィールド値からレスポンスモデルを組み立て、そのまま JSON で返す。
+
+    利用例:
+        items = validate_items(LogItem, res.data.items)
+        return model_response(LogsResponse, Items=items, LastEvaluatedKey=res.data.last_evaluated_key)
+    """
+    return ModelJSONResponse(content=response_model.model_construct(**fields), status_code=status_code)
@@ -0,0 +1,34 @@
+# app/api/utils/sse.py
+"""
+Server-Sent Events のフレーム生成
+
+EventSource は id: の値を保持し、再接続時に Last-Event-ID ヘッダーとして送ってくる。
+"""
+
+import json
+from typing import Any
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # リバースプロキシでのバッファリングを無効化
+}
+
+
+def sse_event(data: Any, event: str | None = None, event_id: str | None = None) -> bytes:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+def sse_comment(text: str) -> bytes:
+    """コメント行。接続維持（heartbeat）に使う。"""
+    return f": {text}\n\n".encode()
+
+
+def sse_retry(milliseconds: int) -> bytes:
+    return f"retry: {milliseconds}\n\n".encode()
@@ -12,6 +12,17 @@ class Settings:
     REGION_NAME: str = os.getenv("AWS_DEFAULT_REGION", "ap-northeast-1")
     DYNAMODB_ENDPOINT: str | None = os.getenv("AWS_ENDPOINT_URL", "http://localhost:4566")
 
+    # logs テーブルのキー設計（app/repositories/log_keys.py を参照）
+    # LOGS_BUCKET: "" (バケットなし) / "month" / "day"
+    LOGS_BUCKET: str = os.getenv("LOGS_BUCKET", "")
+    LOGS_SHARDS: int = int(os.getenv("LOGS_SHARDS", "1"))
+    LOGS_LEGACY_READ: bool = os.getenv("LOGS_LEGACY_READ", "true").lower() == "true"
+    # ログの保持日数（DynamoDB の TTL）。0 の場合は期限切れにせず、S3 のアーカイブも読まない
+    # （app/repositories/log_archive_repo.py を参照）
+    LOGS_RETENTION_DAYS: int = int(os.getenv("LOGS_RETENTION_DAYS", "0"))
+    # true の場合、コンパクション済みの日のログを logchunks テーブルから読む（app/repositories/logchunk_repo.py）
+    LOGS_CHUNKS: bool = os.getenv("LOGS_CHUNKS", "false").lower() == "true"
+
     # テスト用設定
     # TEST_USE_LOCALSTACK=true (デフォルト) → LocalStack を使用
     # TEST_USE_LOCALSTACK=false → AWS DynamoDB を使用
@@ -1,30 +1,38 @@
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from typing import Any, TypeVar
+from typing import Any, Self, TypeVar
 
 T = TypeVar("T")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SingleItemData:
     item: dict[str, Any]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ListItemData:
     items: list[dict[str, Any]] = field(default_factory=list)
     last_evaluated_key: dict[str, Any] | None = None
     size: int = 0
     count: int = 0
+    prev_key: dict[str, Any] | None = None  # 1つ前のページを読むためのキー（逆方向のカーソル）
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MessageData:
     message: str = "OK"
 
 
-@dataclass(frozen=True)
-class RepositoryResponse[T]:
+@dataclass(frozen=True, slots=True)
+class ResultEnvelope[T]:
+    """
+    Repository / Service 層で共通の戻り値の基底クラス。
+
+    data はコピーせず参照をそのまま保持するため、層をまたいで結果を受け渡しても
+    アイテムのリストが複製されることはない。
+    """
+
     code: int
     data: T | None = None
     detail: str | None = None
@@ -33,16 +41,22 @@ class RepositoryResponse[T]:
     def is_success(self) -> bool:
         return 200 <= self.code < 300 or self.code == 20000
 
+    @classmethod
+    def of(cls, other: "ResultEnvelope[T]") -> Self:
+        """別の層の結果を、data を共有したまま自クラスの型に付け替える。"""
+        if type(other) is cls:
+            return other
+        return cls(code=other.code, data=other.data, detail=other.detail)
 
-@dataclass(frozen=True)
-class ServiceResponse[T]:
-    code: int
-    data: T | None = None
-    detail: str | None = None
 
-    @property
-    def is_success(self) -> bool:
-        return 200 <= self.code < 300 or self.code == 20000
+@dataclass(frozen=True, slots=True)
+class RepositoryResponse[T](ResultEnvelope[T]):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class ServiceResponse[T](ResultEnvelope[T]):
+    pass
 
 
 @dataclass(frozen=True)
@@ -20,10 +20,15 @@ if item is None:
 """
 
 import logging
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
 from typing import Any
 
 import boto3
+from boto3.dynamodb.conditions import Attr, ConditionBase
 from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import ClientError
 
@@ -57,16 +62,7 @@ def get_full_table_name(table_name: str) -> str:
 
 
 def get_table(table_name: str) -> Any:
-    endpoint_url = settings.dynamodb_endpoint_url
-    if endpoint_url:
-        resource = boto3.resource(
-            "dynamodb",
-            endpoint_url=endpoint_url,
-            region_name=settings.REGION_NAME,
-        )
-    else:
-        resource = boto3.resource("dynamodb", region_name=settings.REGION_NAME)
-    return resource.Table(get_full_table_name(table_name))
+    return get_dynamodb_resource().Table(get_full_table_name(table_name))
 
 
 def _log_dynamodb_error(context: str, table_name: str, key: Any, e: ClientError) -> Any:
@@ -87,23 +83,71 @@ def iso8601_z_to_datetime(iso_str: str) -> datetime:
     return datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
 
 
+def iso8601_to_utc_datetime(iso_str: str) -> datetime:
+    """ISO8601 文字列を UTC の aware な datetime に変換。タイムゾーンの無い値は UTC とみなす。解釈できない場合は ValueError。"""
+    dt = iso8601_z_to_datetime(iso_str)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=UTC)
+    return dt.astimezone(UTC)
+
+
+def datetime_to_created_at(dt: datetime) -> str:
+    """
+    datetime を logs の created_at の正規形 '2026-01-18T01:15:30.000000Z' に変換。
+    マイクロ秒まで固定長で出すため、文字列の大小が時刻の前後と一致する（カーソル・ライブ配信の watermark も同じ形式）
+    """
+    return dt.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def normalize_created_at(iso_str: str) -> str:
+    """
+    クライアントが指定した created_at（+09:00 などのオフセット付き、日付のみ、秒精度など）を正規形に変換。
+    タイムゾーンの無い値は UTC とみなす。解釈できない場合は ValueError。
+    """
+    return datetime_to_created_at(iso8601_to_utc_datetime(iso_str))
+
+
 # ====================
 # リソース／テーブル操作
 # ====================
 
 
+# boto3 のリソース（と Table）はスレッドセーフではないため、スレッドごとに1つ生成して使い回す。
+# FastAPI のスレッドプールや ThreadPoolExecutor のワーカーはスレッドが再利用されるので、接続プールも使い回される。
+_local = threading.local()
+# デフォルトセッションからのリソース生成はスレッドセーフではないため、生成だけを直列化する
+_resource_lock = threading.Lock()
+
+
 def get_dynamodb_resource() -> Any:
-    """DynamoDBリソースを取得する。ローカル/テスト環境ではエンドポイントを明示。"""
+    """
+    DynamoDBリソースを取得する。ローカル/テスト環境ではエンドポイントを明示。
+
+    リソースは呼び出したスレッドごとに1つだけ生成する（Lambda のコンテナ内では1つ）。
+    """
+    resource = getattr(_local, "resource", None)
+    if resource is not None:
+        return resource
     endpoint_url = settings.dynamodb_endpoint_url
-    if endpoint_url:
-        logger.debug(f"[get_dynamodb_resource] Using endpoint: {endpoint_url}")
-        return boto3.resource(
-            "dynamodb",
-            endpoint_url=endpoint_url,
-            region_name=settings.REGION_NAME,
-        )
-    logger.debug(f"[get_dynamodb_resource] ENV={settings.ENV}")
-    return boto3.resource("dynamodb", region_name=settings.REGION_NAME)
+    with _resource_lock:
+        if endpoint_url:
+            logger.debug(f"[get_dynamodb_resource] Using endpoint: {endpoint_url}")
+            resource = boto3.resource(
+                "dynamodb",
+                endpoint_url=endpoint_url,
+                region_name=settings.REGION_NAME,
+            )
+        else:
+            logger.debug(f"[get_dynamodb_resource] ENV={settings.ENV}")
+            resource = boto3.resource("dynamodb", region_name=settings.REGION_NAME)
+    _local.resource = resource
+    return resource
+
+
+def reset_dynamodb_resources() -> None:
+    """生成済みのリソースを破棄する（以降の呼び出しで、その時点のデフォルトセッションから作り直す）。"""
+    global _local
+    _local = threading.local()
 
 
 # ====================
@@ -156,9 +200,11 @@ def update_item(
     update_expr: str,
     expr_attr_values: dict[str, Any],
     expr_attr_names: dict[str, str] | None = None,
+    condition: ConditionBase | None = None,
 ) -> RepositoryResponse[MessageData]:
     """
     指定したキーのアイテムに対して、属性を更新します。
+    condition を指定した場合、条件を満たさなければ更新せず 400 を返します。
 
     利用例:
         update_item("users", {"userid": "user1@example.com"},
@@ -167,7 +213,7 @@ def update_item(
                     {"#n": "name"})
     """
     table = get_table(table_name)
-    kwargs = {
+    kwargs: dict[str, Any] = {
         "Key": key,
         "UpdateExpression": update_expr,
         "ExpressionAttributeValues": expr_attr_values,
@@ -175,6 +221,8 @@ def update_item(
     }
     if expr_attr_names:
         kwargs["ExpressionAttributeNames"] = expr_attr_names
+    if condition is not None:
+        kwargs["ConditionExpression"] = condition
 
     try:
         table.update_item(**kwargs)
@@ -202,41 +250,67 @@ def delete_item(table_name: str, key: dict[str, Any]) -> RepositoryResponse[Mess
         return RepositoryResponse(code=code, data=None, detail=str(e))
 
 
-def batch_get_items(table_name: str, keys: list[dict[str, Any]]) -> RepositoryResponse[ListItemData]:
+def batch_get_items(
+    table_name: str,
+    keys: list[dict[str, Any]],
+    projection_expr: str | None = None,
+    expr_attr_names: dict[str, str] | None = None,
+    max_workers: int = 1,
+) -> RepositoryResponse[ListItemData]:
     """
-    複数のキーでまとめてアイテムを取得します（最大100件ずつ）。未取得キーは警告ログ表示
+    複数のキーでまとめてアイテムを取得します（最大100件ずつ）。
+    UnprocessedKeys はバックオフしながら再取得します。
+
+    Args:
+        table_name: テーブル名
+        keys: 取得するキーのリスト
+        projection_expr: ProjectionExpression（必要な属性だけ読む場合）
+        expr_attr_names: ExpressionAttributeNames（必要に応じて）
+        max_workers: 100件単位のリクエストを並列に発行する数（1 なら逐次）
 
     利用例:
         items = batch_get_items("users", [{"userid": "user1@example.com"}, {"userid": "user2@example.com"}])
     """
     full_table_name = get_full_table_name(table_name)
-    endpoint_url = settings.dynamodb_endpoint_url
-    if endpoint_url:
-        dynamodb = boto3.resource("dynamodb", endpoint_url=endpoint_url, region_name=settings.REGION_NAME)
-    else:
-        dynamodb = boto3.resource("dynamodb", region_name=settings.REGION_NAME)
-    client = dynamodb.meta.client
-    results = []
-    total_size = 0
+    client = get_dynamodb_resource().meta.client
 
+    table_request: dict[str, Any] = {}
+    if projection_expr:
+        table_request["ProjectionExpression"] = projection_expr
+    if expr_attr_names:
+        table_request["ExpressionAttributeNames"] = expr_attr_names
+
+    def fetch_chunk(batch_keys: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], int]:
+        chunk_items: list[dict[str, Any]] = []
+        chunk_size = 0
+        request_items: dict[str, Any] = {full_table_name: {"Keys": batch_keys, **table_request}}
+        attempt = 0
+        while request_items:
+            if attempt:
+                time.sleep(min(0.05 * 2**attempt, 1.0))
+            response = client.batch_get_item(RequestItems=request_items)
+            chunk_items.extend(response.get("Responses", {}).get(full_table_name, []))
+            size_str = response.get("ResponseMetadata", {}).get("HTTPHeaders", {}).get("content-length", "0")
+            chunk_size += int(size_str)
+            request_items = response.get("UnprocessedKeys", {})
+            attempt += 1
+        return chunk_items, chunk_size
+
+    chunks = [keys[i : i + 100] for i in range(0, len(keys), 100)]
     try:
-        for i in range(0, len(keys), 100):
-            batch_keys = keys[i : i + 100]
-            request_items = {full_table_name: {"Keys": batch_keys}}
-            while request_items:
-                response = client.batch_get_item(RequestItems=request_items)
-                items = response.get("Responses", {}).get(full_table_name, [])
-                results.extend(items)
-                size_str = response.get("ResponseMetadata", {}).get("HTTPHeaders", {}).get("content-length", "0")
-                total_size += int(size_str)
-                request_items = response.get("UnprocessedKeys", {})
+        if max_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                fetched = list(executor.map(fetch_chunk, chunks))
+        else:
+            fetched = [fetch_chunk(chunk) for chunk in chunks]
 
+        results = [item for chunk_items, _ in fetched for item in chunk_items]
         return RepositoryResponse(
             code=200,
             data=ListItemData(
                 items=results,
                 last_evaluated_key=None,
-                size=total_size,
+                size=sum(size for _, size in fetched),
                 count=len(results),
             ),
             detail=None,
@@ -247,6 +321,110 @@ def batch_get_items(table_name: str, keys: list[dict[str, Any]]) -> RepositoryRe
         return RepositoryResponse(code=code, data=None, detail=str(e))
 
 
+def write_batches(
+    table_name: str,
+    items: list[dict[str, Any]],
+    max_workers: int = 1,
+    max_attempts: int = 8,
+) -> list[dict[str, Any]]:
+    """
+    複数のアイテムを BatchWriteItem（最大25件ずつ）で書き込み、書き込めなかったアイテムを返します。
+    UnprocessedItems は指数バックオフしながら再送し、max_attempts 回で諦めます。
+    チャンク単位の ClientError はそのチャンクのアイテムを失敗として返し、他のチャンクは続行します。
+    """
+    full_table_name = get_full_table_name(table_name)
+    client = get_dynamodb_resource().meta.client
+
+    def write_chunk(chunk: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        request_items: dict[str, Any] = {full_table_name: [{"PutRequest": {"Item": item}} for item in chunk]}
+        try:
+            for attempt in range(max_attempts):
+                if attempt:
+                    time.sleep(min(0.05 * 2**attempt, 2.0))
+                response = client.batch_write_item(RequestItems=request_items)
+                request_items = response.get("UnprocessedItems", {})
+                if not request_items:
+                    return []
+        except ClientError as e:
+            _log_dynamodb_error("write_batches", table_name, f"{len(chunk)} items", e)
+            return chunk
+        return [request["PutRequest"]["Item"] for request in request_items.get(full_table_name, [])]
+
+    chunks = [items[i : i + 25] for i in range(0, len(items), 25)]
+    if max_workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+            results = list(executor.map(write_chunk, chunks))
+    else:
+        results = [write_chunk(chunk) for chunk in chunks]
+    return [item for failed in results for item in failed]
+
+
+def put_new_items(
+    table_name: str,
+    items: list[dict[str, Any]],
+    key_attrs: tuple[str, ...],
+    max_workers: int = 1,
+    condition: ConditionBase | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    同じキーのアイテムが無い場合だけ、1件ずつ条件付き PutItem で書き込みます（BatchWriteItem には条件を付けられないため）。
+    (既にあったアイテムの現在の値, 書き込めなかったアイテム) を返します。
+    condition を渡すと、キーが無い場合に加えて condition を満たす場合も上書きします（期限切れの予約など）。
+
+    利用例:
+        existing, failed = put_new_items("logs", items, ("groupid", "created_at"))
+    """
+    table = get_table(table_name)
+    not_exists: ConditionBase = Attr(key_attrs[-1]).not_exists()
+    if condition is not None:
+        not_exists = not_exists | condition
+
+    def put_new(item: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        key = {attr: item[attr] for attr in key_attrs}
+        try:
+            table.put_item(Item=item, ConditionExpression=not_exists, ReturnValuesOnConditionCheckFailure="ALL_OLD")
+            return "written", item
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                _log_dynamodb_error("put_new_items", table_name, key, e)
+                return "failed", item
+            raw: dict[str, Any] | None = e.response.get("Item")  # type: ignore[assignment]
+        if raw is not None:
+            return "existing", {attr: deserializer.deserialize(value) for attr, value in raw.items()}
+        # ReturnValuesOnConditionCheckFailure に対応していない環境では読み直す
+        res = get_item(table_name, key)
+        old = res.data.item if res.is_success and res.data else None
+        return ("existing", old) if old else ("failed", item)
+
+    if max_workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            results = list(executor.map(put_new, items))
+    else:
+        results = [put_new(item) for item in items]
+    existing = [item for status, item in results if status == "existing"]
+    failed = [item for status, item in results if status == "failed"]
+    return existing, failed
+
+
+def batch_write_items(
+    table_name: str,
+    items: list[dict[str, Any]],
+    max_workers: int = 1,
+    max_attempts: int = 8,
+) -> RepositoryResponse[MessageData]:
+    """
+    複数のアイテムをまとめて書き込みます。1件でも書き込めなかった場合は 500 を返します。
+
+    利用例:
+        batch_write_items("logs", [{"groupid": "group1", "created_at": "..."}, ...])
+    """
+    failed = write_batches(table_name, items, max_workers=max_workers, max_attempts=max_attempts)
+    if failed:
+        logger.error(f"[batch_write_items] {len(failed)} items were not written on table={table_name}")
+        return RepositoryResponse(code=500, data=None, detail=f"{len(failed)} items were not written")
+    return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
+
+
 def query_items(
     table_name: str,
     key_condition_expr: Any,
@@ -256,6 +434,7 @@ def query_items(
     limit: int = 1000,
     exclusive_start_key: dict[str, Any] | None = None,
     filter_expr: Any | None = None,
+    scan_index_forward: bool = True,
 ) -> RepositoryResponse[ListItemData]:
     """
     キー条件に基づいてクエリを実行し、該当するアイテムを取得します。
@@ -270,6 +449,7 @@ def query_items(
         limit: 最大取得件数（デフォルト1000）
         exclusive_start_key: ページネーション用の開始キー
         filter_expr: FilterExpression（必要に応じて）
+        scan_index_forward: False の場合はソートキーの降順に読む
 
     Returns:
         dict: {
@@ -287,6 +467,7 @@ def query_items(
             query_kwargs = {
                 "KeyConditionExpression": key_condition_expr,
                 "Limit": min(1000, limit - len(items)),
+                "ScanIndexForward": scan_index_forward,
             }
             if expr_attr_values:
                 query_kwargs["ExpressionAttributeValues"] = expr_attr_values
@@ -326,6 +507,63 @@ def query_items(
         return RepositoryResponse(code=code, data=None, detail=str(e))
 
 
+def iter_query_pages(
+    table_name: str,
+    key_condition_expr: Any,
+    index_name: str | None = None,
+    expr_attr_values: dict[str, Any] | None = None,
+    expr_attr_names: dict[str, str] | None = None,
+    page_size: int = 1000,
+    exclusive_start_key: dict[str, Any] | None = None,
+    filter_expr: Any | None = None,
+    scan_index_forward: bool = True,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    キー条件に一致するアイテムを、DynamoDB の1ページ（最大 page_size 件）ずつ返すジェネレータ。
+    全件をメモリに保持しないため、エクスポートなど件数上限のない読み出しに使用します。
+    次のページは呼び出し側が前のページを消費した時点で取得します。
+
+    query_items と異なり戻り値で失敗を表現できないため、ClientError はログ出力後にそのまま送出します。
+
+    利用例:
+        for page in iter_query_pages("logs", Key("groupid").eq("group1")):
+            ...
+    """
+    table = get_table(table_name)
+    last_evaluated = exclusive_start_key
+
+    while True:
+        query_kwargs: dict[str, Any] = {
+            "KeyConditionExpression": key_condition_expr,
+            "Limit": min(1000, page_size),
+            "ScanIndexForward": scan_index_forward,
+        }
+        if expr_attr_values:
+            query_kwargs["ExpressionAttributeValues"] = expr_attr_values
+        if index_name:
+            query_kwargs["IndexName"] = index_name
+        if expr_attr_names:
+            query_kwargs["ExpressionAttributeNames"] = expr_attr_names
+        if last_evaluated:
+            query_kwargs["ExclusiveStartKey"] = last_evaluated
+        if filter_expr:
+            query_kwargs["FilterExpression"] = filter_expr
+
+        try:
+            response = table.query(**query_kwargs)
+        except ClientError as e:
+            _log_dynamodb_error("iter_query_pages", table_name, key_condition_expr, e)
+            raise
+
+        chunk = response.get("Items", [])
+        if chunk:
+            yield chunk
+
+        last_evaluated = response.get("LastEvaluatedKey")
+        if not last_evaluated:
+            break
+
+
 def scan_items(
     table_name: str,
     filter_expr: Any | None = None,
@@ -1,4 +1,6 @@
 # api/repositories/groups.py
+from typing import Any
+
 from app.models.common import RepositoryResponse, SingleItemData
 from app.repositories.dynamodb import get_item, get_table
 
@@ -11,3 +13,14 @@ class GroupsTable:
     def get_group_by_id(self, groupid: str) -> RepositoryResponse[SingleItemData]:
         """指定した groupid のグループ情報を取得します。"""
         return get_item(self.table_name, key={"groupid": groupid})
+
+    def list_groupids(self) -> list[str]:
+        """全グループの groupid を返します（Scan。バッチ処理用）。"""
+        kwargs: dict[str, Any] = {"ProjectionExpression": "groupid"}
+        groupids = []
+        while True:
+            response = self.table.scan(**kwargs)
+            groupids += [item["groupid"] for item in response.get("Items", [])]
+            if not response.get("LastEvaluatedKey"):
+                return sorted(groupids)
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
@@ -0,0 +1,198 @@
+# app/repositories/log_archive_repo.py
+"""
+logs テーブルの古いログを保存する S3 アーカイブ（コールド層）
+
+logs テーブル（ホット層）には直近 LOGS_RETENTION_DAYS 日分だけを残し、それより古いログは
+tools/archive_logs.py が1日単位で S3 に書き出してから、TTL 属性（expires_at）を付けて期限切れにする。
+アーカイブ済みの日のログにしか TTL を付けないため、アーカイブ前にログが消えることはない。
+
+    s3://prototype-app-logs-archive-{stage}/logs/{groupid}/{YYYY}/{MM}/{YYYY-MM-DD}.jsonl.gz
+    s3://prototype-app-logs-archive-{stage}/logs/{groupid}/index.json
+
+- 日ごとのオブジェクトは、export_tables.py と同じ DynamoDB 形式の JSON Lines を gzip したもの（created_at 昇順）
+- index.json はアーカイブ済みの最後の日（archived_through）と、ログのある日の件数だけを持つ小さな索引
+- ホット層とコールド層の境界は min(ホット層の先頭日, archived_through の翌日)。境界より前はアーカイブから、
+  境界以降は logs テーブルから読む。どちらの層にも確実に存在する範囲だけを読むため、重複も欠落もない
+"""
+
+import json
+import logging
+from collections.abc import Iterator
+from datetime import UTC, date, datetime, timedelta
+from functools import lru_cache
+from typing import Any
+
+import boto3
+from botocore.exceptions import ClientError
+
+from app.config import settings
+from app.utils.log_codec import decode_logs, encode_logs
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "logs"
+TTL_ATTRIBUTE = "expires_at"
+# index.json は書き換わるため短時間だけ、日ごとのオブジェクトは書き換わらないため長めにキャッシュする
+index_cache = TTLCache(maxsize=10000, ttl=60)
+day_cache = TTLCache(maxsize=64, ttl=600)
+
+
+def get_full_bucket_name(bucket_name: str) -> str:
+    # get_full_table_name と同じく、local/test 環境では devel を使用
+    stage = "devel" if settings.ENV in ("local", "test") else settings.ENV
+    return f"{settings.APP_NAME}-{bucket_name}-{stage}"
+
+
+@lru_cache(maxsize=1)
+def get_s3_client() -> Any:
+    """S3 クライアントを取得する。ローカル/テスト環境では DynamoDB と同じ LocalStack のエンドポイントを使う。"""
+    endpoint_url = settings.dynamodb_endpoint_url
+    if endpoint_url:
+        return boto3.client("s3", endpoint_url=endpoint_url, region_name=settings.REGION_NAME)
+    return boto3.client("s3", region_name=settings.REGION_NAME)
+
+
+def expires_at_of(created_at: str, retention_days: int) -> int:
+    """created_at から TTL 属性の値（エポック秒）を求める。"""
+    created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    return int((created + timedelta(days=retention_days)).timestamp())
+
+
+def day_expires_at(day: str, retention_days: int) -> int:
+    """1日分をまとめたデータ（チャンク）の TTL の値。その日の最後のログと同時に期限切れになる。"""
+    return expires_at_of(f"{day}T23:59:59Z", retention_days)
+
+
+def select_logs(
+    items: list[dict[str, Any]],
+    before: str,
+    begin: str | None,
+    end: str | None,
+    userid: str | None,
+    type_: str | None,
+    after: str | None,
+    descending: bool,
+) -> Iterator[dict[str, Any]]:
+    """created_at 昇順のログから、LogArchive.iter_logs と同じ条件に合うものを順に（descending なら逆順に）返す。"""
+    for item in reversed(items) if descending else items:
+        created_at = item["created_at"]
+        if created_at >= before or (begin and created_at < begin) or (end and created_at > end):
+            continue
+        if after and (created_at >= after if descending else created_at <= after):
+            continue
+        if userid and item.get("userid") != userid:
+            continue
+        if type_ and item.get("type") != type_:
+            continue
+        yield item
+
+
+class LogArchive:
+    def __init__(self, s3: Any = None, bucket: str | None = None, retention_days: int | None = None) -> None:
+        self.s3 = s3 or get_s3_client()
+        self.bucket = bucket or get_full_bucket_name("logs-archive")
+        self.retention_days = settings.LOGS_RETENTION_DAYS if retention_days is None else retention_days
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    @staticmethod
+    def day_key(groupid: str, day: str) -> str:
+        return f"{PREFIX}/{groupid}/{day[:4]}/{day[5:7]}/{day}.jsonl.gz"
+
+    @staticmethod
+    def index_key(groupid: str) -> str:
+        return f"{PREFIX}/{groupid}/index.json"
+
+    def hot_start(self, today: date | None = None) -> str:
+        """TTL で消えていないことが保証される最初の日（YYYY-MM-DD）"""
+        today = today or datetime.now(UTC).date()
+        return (today - timedelta(days=self.retention_days - 1)).isoformat()
+
+    # ---- 索引 ----
+
+    def read_index(self, groupid: str) -> dict[str, Any] | None:
+        """index.json を読む。アーカイブが無い場合は None。"""
+        cached = index_cache.get((self.bucket, groupid))
+        if cached is not None:
+            return cached or None
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=self.index_key(groupid))["Body"].read()
+            index: dict[str, Any] = json.loads(body)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                raise
+            index = {}
+        index_cache.set((self.bucket, groupid), index)
+        return index or None
+
+    def write_index(self, groupid: str, index: dict[str, Any]) -> None:
+        body = json.dumps(index, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        self.s3.put_object(Bucket=self.bucket, Key=self.index_key(groupid), Body=body, ContentType="application/json")
+        index_cache.set((self.bucket, groupid), index)
+
+    def boundary(self, groupid: str) -> str | None:
+        """ホット層とコールド層の境界（YYYY-MM-DD）。created_at がこれより前のログはアーカイブから読む。"""
+        if not self.enabled:
+            return None
+        index = self.read_index(groupid)
+        if not index:
+            return None
+        archived_end = (date.fromisoformat(index["archived_through"]) + timedelta(days=1)).isoformat()
+        return min(self.hot_start(), archived_end)
+
+    # ---- 日ごとのオブジェクト ----
+
+    def write_day(self, groupid: str, day: str, items: list[dict[str, Any]]) -> None:
+        """1日分のログを created_at 昇順で書き出す。同じ日を書き直した場合は上書きする。"""
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.day_key(groupid, day),
+            Body=encode_logs(items),
+            ContentType="application/x-ndjson",
+            ContentEncoding="gzip",
+        )
+        day_cache.delete((self.bucket, groupid, day))
+
+    def read_day(self, groupid: str, day: str) -> list[dict[str, Any]]:
+        cached: list[dict[str, Any]] | None = day_cache.get((self.bucket, groupid, day))
+        if cached is not None:
+            return cached
+        body = self.s3.get_object(Bucket=self.bucket, Key=self.day_key(groupid, day))["Body"].read()
+        items = decode_logs(body)
+        day_cache.set((self.bucket, groupid, day), items)
+        return items
+
+    def iter_logs(
+        self,
+        groupid: str,
+        before: str,
+        begin: str | None = None,
+        end: str | None = None,
+        userid: str | None = None,
+        type_: str | None = None,
+        after: str | None = None,
+        descending: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        created_at が before より前で begin〜end に含まれるアーカイブ済みのログを created_at 順に1件ずつ返す。
+        after を指定した場合は、それより後（descending なら前）のログだけを返す。
+        userid / type_ の絞り込みは、日ごとのオブジェクトを読んでから行う。
+        """
+        index = self.read_index(groupid)
+        if not index:
+            return
+        days = sorted(
+            day
+            for day in index.get("days", {})
+            if day < before[:10] and (not begin or day >= begin[:10]) and (not end or day <= end[:10])
+        )
+        if after:
+            days = [day for day in days if (day <= after[:10] if descending else day >= after[:10])]
+        if descending:
+            days.reverse()
+
+        for day in days:
+            yield from select_logs(self.read_day(groupid, day), before, begin, end, userid, type_, after, descending)
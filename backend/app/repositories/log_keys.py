@@ -0,0 +1,141 @@
+# app/repositories/log_keys.py
+"""
+logs テーブルのパーティションキー設計（時間バケット / 書き込みシャード）
+
+既定では1グループの全ログが groupid の1パーティションに入る。書き込みの多いグループでは
+パーティションあたりのスループット上限に当たり、パーティションも際限なく大きくなるため、
+設定でキーの値に接尾辞を付けられるようにする。
+
+    groupid         = "{groupid}#{bucket}#{shard}"     例) "group1#202401#3"
+    groupid#type    = "{groupid}#{type}#{bucket}#{shard}"
+    groupid#userid  = "{groupid}#{userid}#{bucket}#{shard}"
+
+- bucket: created_at の月（month: YYYYMM）または日（day: YYYYMMDD）。LOGS_BUCKET が空なら付けない
+- shard : created_at の CRC32 を LOGS_SHARDS で割った余り。LOGS_SHARDS=1 なら付けない
+
+接尾辞は created_at だけから決まるため、(groupid, created_at) が分かれば1件のキーを計算できる。
+テーブル・GSI の定義（属性名）は変えず、値だけが変わるので、既存のログ（接尾辞なし）と同じテーブルに共存できる。
+移行中は LOGS_LEGACY_READ=true で接尾辞なしのパーティションも一緒に読み、移行後に false にする。
+既存のログは tools/migrate_log_keys.py で接尾辞付きのキーに書き換える。
+
+バケットを使う場合、begin を指定しない読み出しは、接尾辞付きで書き込んだ最も古いログの日
+（app/repositories/logbucket_repo.py に書き込み時に記録する）と、移行中は接尾辞なしのパーティションの
+最も古いログの日のうち早い方から始まる。グループID自体に "#" を含めないこと。
+"""
+
+import zlib
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+from app.config import settings
+
+BUCKET_FORMATS = {"month": 6, "day": 8}  # YYYYMM / YYYYMMDD の桁数
+HASH_ATTRS = ("groupid", "groupid#type", "groupid#userid")
+# どの created_at よりも小さい / 大きい文字列
+MIN_CREATED_AT = "0"
+MAX_CREATED_AT = "~"
+
+
+@dataclass(frozen=True, slots=True)
+class LogKeyScheme:
+    bucket: str | None = None  # None / "month" / "day"
+    shards: int = 1
+    legacy_read: bool = True
+
+    @classmethod
+    def from_settings(cls) -> "LogKeyScheme":
+        bucket = settings.LOGS_BUCKET or None
+        if bucket is not None and bucket not in BUCKET_FORMATS:
+            raise ValueError(f"LOGS_BUCKET must be one of {list(BUCKET_FORMATS)}: {bucket}")
+        return cls(
+            bucket=bucket,
+            shards=max(1, settings.LOGS_SHARDS),
+            legacy_read=settings.LOGS_LEGACY_READ,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.bucket is not None or self.shards > 1
+
+    @property
+    def suffix_parts(self) -> int:
+        return (self.bucket is not None) + (self.shards > 1)
+
+    # ---- 書き込み側 ----
+
+    def bucket_of(self, created_at: str) -> str:
+        digits = created_at[:10].replace("-", "")
+        return digits[: BUCKET_FORMATS[self.bucket]] if self.bucket else ""
+
+    def shard_of(self, created_at: str) -> int:
+        return zlib.crc32(created_at.encode()) % self.shards if self.shards > 1 else 0
+
+    def suffix(self, bucket: str, shard: int) -> str:
+        parts = []
+        if self.bucket is not None:
+            parts.append(bucket)
+        if self.shards > 1:
+            parts.append(str(shard))
+        return "".join(f"#{part}" for part in parts)
+
+    def suffix_for(self, created_at: str) -> str:
+        return self.suffix(self.bucket_of(created_at), self.shard_of(created_at))
+
+    def encode_item(self, item: dict[str, Any]) -> dict[str, Any]:
+        """アイテムのハッシュキー属性（base / GSI）に接尾辞を付ける。"""
+        if not self.enabled:
+            return item
+        suffix = self.suffix_for(item["created_at"])
+        encoded = dict(item)
+        for attr in HASH_ATTRS:
+            if attr in encoded:
+                encoded[attr] = f"{encoded[attr]}{suffix}"
+        return encoded
+
+    def encode_key(self, groupid: str, created_at: str) -> dict[str, Any]:
+        return {"groupid": f"{groupid}{self.suffix_for(created_at)}", "created_at": created_at}
+
+    # ---- 読み出し側 ----
+
+    def decode_item(self, item: dict[str, Any]) -> dict[str, Any]:
+        """接尾辞付きのアイテムを、接尾辞なしの形に戻す（接尾辞付きのパーティションから読んだアイテムにだけ使う）。"""
+        if not self.enabled:
+            return item
+        decoded = dict(item)
+        for attr in HASH_ATTRS:
+            if attr in decoded:
+                decoded[attr] = decoded[attr].rsplit("#", self.suffix_parts)[0]
+        return decoded
+
+    def buckets(self, begin: str | None, end: str | None) -> list[tuple[str, str, str]]:
+        """
+        begin〜end を含むバケットを古い順に (bucket, バケットの下限, バケットの上限) で返す。
+        下限・上限は created_at と比較できる文字列で、begin / end で切り詰める。
+        バケットを使う場合は begin が必要（LogsTable が最も古いログの日を渡す）。
+        """
+        if self.bucket is None:
+            return [("", begin or MIN_CREATED_AT, end or MAX_CREATED_AT)]
+        if begin is None:
+            raise ValueError("begin is required to enumerate time buckets")
+
+        lo = begin
+        hi = end or (datetime.now(UTC) + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        current = date.fromisoformat(lo[:10])
+        last = date.fromisoformat(hi[:10])
+        if self.bucket == "month":
+            current = current.replace(day=1)
+        result = []
+        while current <= last:
+            prefix = current.isoformat()[:7] if self.bucket == "month" else current.isoformat()
+            result.append((prefix.replace("-", ""), max(lo, prefix), min(hi, prefix + "~")))
+            if self.bucket == "month":
+                current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+            else:
+                current += timedelta(days=1)
+        return result
+
+    def partitions(self, hash_value: str, bucket: str) -> list[str]:
+        """1バケットぶんの全シャードのハッシュキー値"""
+        return [f"{hash_value}{self.suffix(bucket, shard)}" for shard in range(self.shards)]
@@ -1,41 +1,76 @@
 # api/repositories/logs.py
 
+import heapq
+import itertools
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import boto3
 from boto3.dynamodb.conditions import ConditionBase, Key
 
+from app.config import settings
 from app.models.common import ListItemData, RepositoryResponse
-from app.repositories.dynamodb import query_items
+from app.repositories.dynamodb import batch_get_items, iter_query_pages, put_new_items, query_items, write_batches
+from app.repositories.log_archive_repo import LogArchive
+from app.repositories.log_keys import LogKeyScheme
+from app.repositories.logbucket_repo import LogBucketTable
+from app.repositories.logchunk_repo import LogChunkTable
+from app.repositories.range_query import parallel_range_query
+
+# ホット層（logs テーブル）より前を読む層と、その層から読む期間の終わり（YYYY-MM-DD）。古い層から順に並べる
+ColdTiers = list[tuple[LogArchive | LogChunkTable, str]]
+
+
+def _dedupe_sorted(items: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    """created_at 順に並んだアイテムから、移行中に新旧両方のパーティションにある同じログを1件にする。"""
+    previous = None
+    for item in items:
+        if item["created_at"] != previous:
+            previous = item["created_at"]
+            yield item
 
 
 class LogsTable:
-    def __init__(self, dynamodb: Any = None) -> None:
+    def __init__(
+        self,
+        dynamodb: Any = None,
+        key_scheme: LogKeyScheme | None = None,
+        archive: LogArchive | None = None,
+        chunks: LogChunkTable | None = None,
+        buckets: LogBucketTable | None = None,
+    ) -> None:
         self.dynamodb = dynamodb or boto3.resource("dynamodb")
         self.table_name = "logs"
+        self.key_scheme = key_scheme or LogKeyScheme.from_settings()
+        # 保持期間を設定した場合だけ、期限切れになったログを S3 のアーカイブから読む
+        self.archive = archive or (LogArchive() if settings.LOGS_RETENTION_DAYS > 0 else None)
+        # コンパクション済みの日は logchunks テーブルのチャンクから読む
+        self.chunks = chunks or (LogChunkTable() if settings.LOGS_CHUNKS else None)
+        # 時間バケットを使う場合、begin 未指定の読み出しを始める日をグループごとに記録する
+        self.buckets = buckets or (LogBucketTable() if self.key_scheme.bucket else None)
 
-    def list_logs(
-        self,
+    @staticmethod
+    def hash_key_of(groupid: str, userid: str | None = None, type_: str | None = None) -> tuple[str, str, str | None]:
+        """フィルタ条件から (ハッシュキー属性, 値, 使用する GSI 名) を決める。"""
+        if userid:
+            return "groupid#userid", f"{groupid}#{userid}", "groupid-userid-created_at-index"
+        if type_:
+            return "groupid#type", f"{groupid}#{type_}", "groupid-type-created_at-index"
+        return "groupid", groupid, None  # ベーステーブルを使用
+
+    @staticmethod
+    def build_key_condition(
         groupid: str,
-        limit: int = 25,
-        startkey: dict[str, Any] | None = None,
         begin: str | None = None,
         end: str | None = None,
         userid: str | None = None,
         type_: str | None = None,
-    ) -> RepositoryResponse[ListItemData]:
+    ) -> tuple[ConditionBase, str | None]:
+        """フィルタ条件から (KeyConditionExpression, 使用する GSI 名) を組み立てる。"""
         # GSI 切り替えと KeyConditionExpression の構築
-        key_condition: ConditionBase
-        index_name: str | None
-        if userid:
-            key_condition = Key("groupid#userid").eq(f"{groupid}#{userid}")
-            index_name = "groupid-userid-created_at-index"
-        elif type_:
-            key_condition = Key("groupid#type").eq(f"{groupid}#{type_}")
-            index_name = "groupid-type-created_at-index"
-        else:
-            key_condition = Key("groupid").eq(groupid)
-            index_name = None  # ベーステーブルを使用
+        hash_attr, hash_value, index_name = LogsTable.hash_key_of(groupid, userid, type_)
+        key_condition: ConditionBase = Key(hash_attr).eq(hash_value)
 
         if begin and end:
             key_condition = key_condition & Key("created_at").between(begin, end)
@@ -44,11 +79,529 @@ class LogsTable:
         elif end:
             key_condition = key_condition & Key("created_at").lte(end)
 
-        # 実クエリ
+        return key_condition, index_name
+
+    @staticmethod
+    def key_of(item: dict[str, Any], userid: str | None = None, type_: str | None = None) -> dict[str, Any]:
+        """アイテムから、同じ条件の Query に渡せる ExclusiveStartKey を作る（GSI の場合はそのキーも含める）。"""
+        key = {"groupid": item["groupid"], "created_at": item["created_at"]}
+        if userid:
+            key["groupid#userid"] = item["groupid#userid"]
+        elif type_:
+            key["groupid#type"] = item["groupid#type"]
+        return key
+
+    def list_logs(
+        self,
+        groupid: str,
+        limit: int = 25,
+        startkey: dict[str, Any] | None = None,
+        begin: str | None = None,
+        end: str | None = None,
+        userid: str | None = None,
+        type_: str | None = None,
+        order: str = "asc",
+    ) -> RepositoryResponse[ListItemData]:
+        """
+        begin がホット層（logs テーブル）より前の場合は、コールド層（S3 のアーカイブ・チャンク）と続けて読む。
+        次のページのキーはどの層から読んだ場合も同じ形式（最後に返したアイテムのキー）。
+        """
+        tiers = self._cold_tiers(groupid, userid, type_)
+        if not tiers or (begin is not None and begin >= tiers[-1][1]):
+            return self._list_hot_logs(groupid, limit, startkey, begin, end, userid, type_, order)
+        return self._list_tiered_logs(tiers, groupid, limit, startkey, begin, end, userid, type_, order)
+
+    def sealed_before(self, groupid: str) -> str | None:
+        """
+        コールド層（アーカイブ・チャンク）に書き出し済みの期間の終わり（YYYY-MM-DD）。
+        created_at がこれより前のログは logs テーブルに書き込んでもコールド層から読むため、読み出せない。
+        """
+        tiers = self._cold_tiers(groupid, None, None)
+        return tiers[-1][1] if tiers else None
+
+    def _cold_tiers(self, groupid: str, userid: str | None, type_: str | None) -> ColdTiers:
+        """
+        このグループで使えるコールド層。チャンクは1日分をまとめて読むため、userid / type_ で絞り込む場合は
+        GSI を使える logs テーブルから読む（チャンクの期間もログはテーブルに残っている）。
+        """
+        tiers: ColdTiers = []
+        for tier in (self.archive, None if userid or type_ else self.chunks):
+            boundary = tier.boundary(groupid) if tier else None
+            if tier and boundary and (not tiers or boundary > tiers[-1][1]):
+                tiers.append((tier, boundary))
+        return tiers
+
+    @staticmethod
+    def _iter_cold(
+        tiers: ColdTiers,
+        groupid: str,
+        begin: str | None,
+        end: str | None,
+        userid: str | None,
+        type_: str | None,
+        after: str | None,
+        descending: bool,
+    ) -> Iterator[dict[str, Any]]:
+        """コールド層のログを created_at 順に1件ずつ返す。各層は前の層の境界から自分の境界までを受け持つ。"""
+        segments = []
+        lower = begin
+        for tier, boundary in tiers:
+            segments.append((tier, lower, boundary))
+            lower = max(lower, boundary) if lower else boundary
+        if descending:
+            segments.reverse()
+        for tier, seg_begin, boundary in segments:
+            yield from tier.iter_logs(groupid, boundary, seg_begin, end, userid, type_, after, descending)
+
+    def _list_hot_logs(
+        self,
+        groupid: str,
+        limit: int,
+        startkey: dict[str, Any] | None,
+        begin: str | None,
+        end: str | None,
+        userid: str | None,
+        type_: str | None,
+        order: str,
+    ) -> RepositoryResponse[ListItemData]:
+        if self.key_scheme.enabled:
+            return self._list_logs_scattered(groupid, limit, startkey, begin, end, userid, type_, order)
+
+        key_condition, index_name = self.build_key_condition(groupid, begin, end, userid, type_)
+
+        # 実クエリ（order="desc" は新しい順）
         return query_items(
             table_name=self.table_name,
             key_condition_expr=key_condition,
             index_name=index_name,
             exclusive_start_key=startkey,
             limit=limit,
+            scan_index_forward=order != "desc",
+        )
+
+    def _list_tiered_logs(
+        self,
+        tiers: ColdTiers,
+        groupid: str,
+        limit: int,
+        startkey: dict[str, Any] | None,
+        begin: str | None,
+        end: str | None,
+        userid: str | None,
+        type_: str | None,
+        order: str,
+    ) -> RepositoryResponse[ListItemData]:
+        """
+        created_at が境界より前をコールド層から、境界以降を logs テーブルから読み、1ページにつなげる。
+        昇順はコールド層 → テーブル、降順はテーブル → コールド層の順に読む。
+        """
+        boundary = tiers[-1][1]
+        descending = order == "desc"
+        after = startkey["created_at"] if startkey else None
+        in_cold = after is not None and after < boundary
+        hot_begin = max(begin, boundary) if begin else boundary
+        has_hot = end is None or end >= hot_begin
+
+        items: list[dict[str, Any]] = []
+        size = 0
+        # 降順で startkey がまだホット層にある場合は、先にテーブルを読む
+        if descending and not in_cold and has_hot:
+            res = self._list_hot_logs(groupid, limit, startkey, hot_begin, end, userid, type_, order)
+            if not res.is_success or res.data is None or res.data.last_evaluated_key:
+                return res
+            items, size = res.data.items, res.data.size
+            after = None
+
+        # コールド層（1件多く読んで続きがあるかを判定する）
+        if descending or in_cold or not startkey:
+            need = limit - len(items)
+            stream = self._iter_cold(tiers, groupid, begin, end, userid, type_, after, descending)
+            cold = list(itertools.islice(stream, need + 1))
+            items += cold[:need]
+            if len(cold) > need:
+                return self._tiered_page(items, self.key_of(items[-1], userid, type_), size)
+
+        # 昇順でコールド層を読み切った場合は、テーブルの境界から続ける
+        if not descending and has_hot:
+            need = limit - len(items)
+            hot_startkey = None if in_cold else startkey
+            res = self._list_hot_logs(groupid, max(need, 1), hot_startkey, hot_begin, end, userid, type_, order)
+            if not res.is_success or res.data is None:
+                return res
+            if need == 0:
+                next_key = self.key_of(items[-1], userid, type_) if res.data.items else None
+                return self._tiered_page(items, next_key, size)
+            items += res.data.items
+            size += res.data.size
+            return self._tiered_page(items, res.data.last_evaluated_key, size)
+
+        return self._tiered_page(items, None, size)
+
+    @staticmethod
+    def _tiered_page(
+        items: list[dict[str, Any]], next_key: dict[str, Any] | None, size: int
+    ) -> RepositoryResponse[ListItemData]:
+        return RepositoryResponse(
+            code=200,
+            data=ListItemData(items=items, last_evaluated_key=next_key, size=size, count=len(items)),
+            detail=None,
+        )
+
+    def iter_logs(
+        self,
+        groupid: str,
+        begin: str | None = None,
+        end: str | None = None,
+        userid: str | None = None,
+        type_: str | None = None,
+        page_size: int = 1000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        list_logs と同じ条件に一致するログを、件数上限なしでページ単位に返す。
+        begin がホット層より前（または未指定）の場合は、list_logs と同じくコールド層から続けて返す。
+        """
+        tiers = self._cold_tiers(groupid, userid, type_)
+        if not tiers or (begin is not None and begin >= tiers[-1][1]):
+            return self._iter_hot_pages(groupid, begin, end, userid, type_, page_size)
+
+        cold = self._iter_cold(tiers, groupid, begin, end, userid, type_, None, False)
+        pages: Iterator[list[dict[str, Any]]] = (
+            list(page) for page in itertools.batched(cold, page_size, strict=False)
+        )
+        hot_begin = max(begin, tiers[-1][1]) if begin else tiers[-1][1]
+        if end is not None and end < hot_begin:
+            return pages
+        return itertools.chain(pages, self._iter_hot_pages(groupid, hot_begin, end, userid, type_, page_size))
+
+    def _iter_hot_pages(
+        self,
+        groupid: str,
+        begin: str | None,
+        end: str | None,
+        userid: str | None,
+        type_: str | None,
+        page_size: int,
+    ) -> Iterator[list[dict[str, Any]]]:
+        if self.key_scheme.enabled:
+            stream = self._iter_logs_scattered(groupid, begin, end, userid, type_, page_size=page_size)
+            return (list(page) for page in itertools.batched(stream, page_size, strict=False))
+
+        key_condition, index_name = self.build_key_condition(groupid, begin, end, userid, type_)
+        return iter_query_pages(
+            table_name=self.table_name,
+            key_condition_expr=key_condition,
+            index_name=index_name,
+            page_size=page_size,
+        )
+
+    def iter_logs_parallel(
+        self,
+        groupid: str,
+        begin: str,
+        end: str,
+        userid: str | None = None,
+        type_: str | None = None,
+        startkey: dict[str, Any] | None = None,
+        order: str = "asc",
+        page_size: int = 1000,
+        buffer_pages: int = 2,
+    ) -> Generator[dict[str, Any]]:
+        """
+        begin〜end を部分範囲に分けて並列に Query し、created_at 順に1件ずつ返す（長い期間向け）。
+        begin がホット層より前の場合は、list_logs と同じくコールド層と続けて返す。
+        """
+        tiers = self._cold_tiers(groupid, userid, type_)
+        if tiers and begin < tiers[-1][1]:
+            return self._iter_tiered_logs(
+                tiers, groupid, begin, end, userid, type_, startkey, order, page_size, buffer_pages
+            )
+        return self._iter_hot_logs_parallel(
+            groupid, begin, end, userid, type_, startkey, order, page_size, buffer_pages
+        )
+
+    def _iter_hot_logs_parallel(
+        self,
+        groupid: str,
+        begin: str,
+        end: str,
+        userid: str | None,
+        type_: str | None,
+        startkey: dict[str, Any] | None,
+        order: str,
+        page_size: int,
+        buffer_pages: int,
+    ) -> Generator[dict[str, Any]]:
+        if self.key_scheme.enabled:
+            # バケット / シャードに分かれている場合は、それ自体が部分範囲になる
+            return self._iter_logs_scattered(groupid, begin, end, userid, type_, startkey, order, page_size)
+
+        hash_condition, index_name = self.build_key_condition(groupid, userid=userid, type_=type_)
+        return parallel_range_query(
+            table_name=self.table_name,
+            hash_condition=hash_condition,
+            begin=begin,
+            end=end,
+            index_name=index_name,
+            exclusive_start_key=startkey,
+            descending=order == "desc",
+            page_size=page_size,
+            buffer_pages=buffer_pages,
+        )
+
+    def _iter_tiered_logs(
+        self,
+        tiers: ColdTiers,
+        groupid: str,
+        begin: str,
+        end: str,
+        userid: str | None,
+        type_: str | None,
+        startkey: dict[str, Any] | None,
+        order: str,
+        page_size: int,
+        buffer_pages: int,
+    ) -> Generator[dict[str, Any]]:
+        boundary = tiers[-1][1]
+        descending = order == "desc"
+        after = startkey["created_at"] if startkey else None
+        in_cold = after is not None and after < boundary
+        cold = self._iter_cold(tiers, groupid, begin, end, userid, type_, after, descending)
+        if end < boundary:
+            yield from cold
+            return
+
+        # 昇順はコールド層 → テーブル、降順はテーブル → コールド層。startkey の層より前の層は読まない
+        if not descending and (in_cold or not startkey):
+            yield from cold
+        if not in_cold or not descending:
+            hot_startkey = None if in_cold else startkey
+            yield from self._iter_hot_logs_parallel(
+                groupid, boundary, end, userid, type_, hot_startkey, order, page_size, buffer_pages
+            )
+        if descending:
+            yield from cold
+
+    def batch_get_logs(self, groupid: str, created_ats: list[str]) -> RepositoryResponse[ListItemData]:
+        """
+        (groupid, created_at) のキーでログをまとめて取得する。順序は保証されない。
+        logs テーブルに無く、created_at がコールド層の期間のログ（期限切れで消えたもの）は、コールド層から読む。
+        """
+        res = self._batch_get_hot_logs(groupid, created_ats)
+        if not res.is_success or res.data is None:
+            return res
+        tiers = self._cold_tiers(groupid, None, None)
+        found = {item["created_at"] for item in res.data.items}
+        missing = sorted(c for c in created_ats if c not in found and tiers and c < tiers[-1][1])
+        if not missing:
+            return res
+
+        items = res.data.items + self._get_cold_logs(tiers, groupid, missing)
+        return RepositoryResponse(
+            code=200, data=ListItemData(items=items, size=res.data.size, count=len(items)), detail=None
         )
+
+    def _get_cold_logs(self, tiers: ColdTiers, groupid: str, created_ats: list[str]) -> list[dict[str, Any]]:
+        """コールド層から created_ats（昇順）のログを読む。日ごと（オブジェクト・チャンク単位）に読んで選ぶ。"""
+        wanted = set(created_ats)
+        items = []
+        for _, in_day in itertools.groupby(created_ats, key=lambda created_at: created_at[:10]):
+            day = list(in_day)
+            stream = self._iter_cold(tiers, groupid, day[0], day[-1], None, None, None, False)
+            items += [item for item in stream if item["created_at"] in wanted]
+        return items
+
+    def _batch_get_hot_logs(self, groupid: str, created_ats: list[str]) -> RepositoryResponse[ListItemData]:
+        keys = [{"groupid": groupid, "created_at": created_at} for created_at in created_ats]
+        if not self.key_scheme.enabled:
+            return batch_get_items(self.table_name, keys, max_workers=4)
+
+        encoded = [self.key_scheme.encode_key(groupid, created_at) for created_at in created_ats]
+        res = batch_get_items(self.table_name, encoded + (keys if self.key_scheme.legacy_read else []), max_workers=4)
+        if not res.is_success or res.data is None:
+            return res
+        items = {}
+        for item in res.data.items:
+            if item["groupid"] != groupid:
+                item = self.key_scheme.decode_item(item)
+            items[item["created_at"]] = item
+        return RepositoryResponse(
+            code=200, data=ListItemData(items=list(items.values()), size=res.data.size, count=len(items)), detail=None
+        )
+
+    def put_logs(self, items: list[dict[str, Any]], max_workers: int = 4) -> RepositoryResponse[ListItemData]:
+        """ログをまとめて書き込む。data.items には書き込めなかったアイテムを返す。"""
+        if not self._record_oldest_days(items):
+            return RepositoryResponse(code=200, data=ListItemData(items=items, count=len(items)), detail=None)
+        if self.key_scheme.enabled:
+            items = [self.key_scheme.encode_item(item) for item in items]
+        failed = write_batches(self.table_name, items, max_workers=max_workers)
+        if self.key_scheme.enabled:
+            failed = [self.key_scheme.decode_item(item) for item in failed]
+        return RepositoryResponse(code=200, data=ListItemData(items=failed, count=len(failed)), detail=None)
+
+    def put_new_logs(
+        self, items: list[dict[str, Any]], max_workers: int = 8
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """
+        (groupid, created_at) が同じログが無い場合だけ、条件付き PutItem で書き込む。
+        (既にあったログの現在の値, 書き込めなかったアイテム) を返す。
+        """
+        if not self._record_oldest_days(items):
+            return [], items
+        if self.key_scheme.enabled:
+            items = [self.key_scheme.encode_item(item) for item in items]
+        existing, failed = put_new_items(self.table_name, items, ("groupid", "created_at"), max_workers=max_workers)
+        if self.key_scheme.enabled:
+            existing = [self.key_scheme.decode_item(item) for item in existing]
+            failed = [self.key_scheme.decode_item(item) for item in failed]
+        return existing, failed
+
+    def _record_oldest_days(self, items: list[dict[str, Any]]) -> bool:
+        """書き込む前に、グループごとの最も古いログの日を記録する。記録できなかった場合は False（書き込まない）。"""
+        return self.buckets is None or self.buckets.record_logs(items).is_success
+
+    # ---- バケット / シャードに分かれたパーティションの scatter-gather ----
+
+    def _oldest_day(self, groupid: str, hash_attr: str, hash_value: str, index_name: str | None) -> str | None:
+        """
+        begin を指定しない読み出しを始める日。記録された最も古い日と、移行中は接尾辞なしのパーティションの
+        最も古いログの日のうち早い方。どちらも無ければ None（読むバケットが無い）。
+        """
+        days = []
+        if self.buckets is not None and (recorded := self.buckets.oldest_day(groupid)):
+            days.append(recorded)
+        if self.key_scheme.legacy_read:
+            res = query_items(
+                table_name=self.table_name,
+                key_condition_expr=Key(hash_attr).eq(hash_value),
+                index_name=index_name,
+                limit=1,
+            )
+            if not res.is_success or res.data is None:
+                raise RuntimeError(f"Failed to read the oldest legacy log: {res.detail}")
+            days += [item["created_at"][:10] for item in res.data.items]
+        return min(days, default=None)
+
+    def _buckets(
+        self, groupid: str, userid: str | None, type_: str | None, lo: str | None, hi: str | None
+    ) -> list[tuple[str, str, str]]:
+        """lo〜hi を含むバケット。lo が無い場合は、最も古いログの日から読む。"""
+        if lo is None and self.key_scheme.bucket is not None:
+            hash_attr, hash_value, index_name = self.hash_key_of(groupid, userid, type_)
+            lo = self._oldest_day(groupid, hash_attr, hash_value, index_name)
+            if lo is None:
+                return []
+        return self.key_scheme.buckets(lo, hi)
+
+    def _sources(self, hash_value: str, bucket: str) -> list[tuple[str, bool]]:
+        """1バケットで読むパーティション (ハッシュキー値, 接尾辞付きか)。移行中は接尾辞なしのパーティションも読む。"""
+        sources = [(partition, True) for partition in self.key_scheme.partitions(hash_value, bucket)]
+        if self.key_scheme.legacy_read:
+            sources.append((hash_value, False))
+        return sources
+
+    def _bounds(
+        self, begin: str | None, end: str | None, startkey: dict[str, Any] | None, descending: bool
+    ) -> tuple[str | None, str | None, str | None]:
+        """startkey を考慮した (下限, 上限, 除外する created_at)。startkey のアイテム自体は返さない。"""
+        after = startkey["created_at"] if startkey else None
+        if after and descending:
+            end = min(end, after) if end else after
+        elif after:
+            begin = max(begin, after) if begin else after
+        return begin, end, after
+
+    def _list_logs_scattered(
+        self,
+        groupid: str,
+        limit: int,
+        startkey: dict[str, Any] | None,
+        begin: str | None,
+        end: str | None,
+        userid: str | None,
+        type_: str | None,
+        order: str,
+    ) -> RepositoryResponse[ListItemData]:
+        """
+        バケットを新しい順（asc なら古い順）に読み、バケット内の全シャードを並列に Query して created_at 順に merge する。
+        limit 件を超えた時点で止めるため、新しい順の先頭ページは直近のバケットだけで済む。
+        """
+        hash_attr, hash_value, index_name = self.hash_key_of(groupid, userid, type_)
+        descending = order == "desc"
+        lo, hi, after = self._bounds(begin, end, startkey, descending)
+        buckets = self._buckets(groupid, userid, type_, lo, hi)
+        if descending:
+            buckets.reverse()
+
+        items: list[dict[str, Any]] = []
+        size = 0
+        with ThreadPoolExecutor(max_workers=self.key_scheme.shards + 1) as executor:
+            for bucket, bucket_lo, bucket_hi in buckets:
+                sources = self._sources(hash_value, bucket)
+                need = limit + 1 - len(items)
+
+                def read(source: tuple[str, bool], lo: str = bucket_lo, hi: str = bucket_hi, need: int = need) -> Any:
+                    return query_items(
+                        table_name=self.table_name,
+                        key_condition_expr=Key(hash_attr).eq(source[0]) & Key("created_at").between(lo, hi),
+                        index_name=index_name,
+                        limit=need + 1,  # startkey と同じ created_at を除く分
+                        scan_index_forward=not descending,
+                    )
+
+                streams = []
+                for (_, encoded), res in zip(sources, executor.map(read, sources), strict=True):
+                    if not res.is_success or res.data is None:
+                        return res  # type: ignore[no-any-return]
+                    size += res.data.size
+                    page = res.data.items
+                    streams.append([self.key_scheme.decode_item(item) for item in page] if encoded else page)
+
+                merged = heapq.merge(*streams, key=lambda item: item["created_at"], reverse=descending)
+                fresh = (item for item in _dedupe_sorted(merged) if item["created_at"] != after)
+                items.extend(itertools.islice(fresh, need))
+                if len(items) > limit:
+                    break
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        next_key = {"groupid": groupid, "created_at": items[-1]["created_at"]} if has_more else None
+        return RepositoryResponse(
+            code=200,
+            data=ListItemData(items=items, last_evaluated_key=next_key, size=size, count=len(items)),
+            detail=None,
+        )
+
+    def _iter_logs_scattered(
+        self,
+        groupid: str,
+        begin: str | None,
+        end: str | None,
+        userid: str | None = None,
+        type_: str | None = None,
+        startkey: dict[str, Any] | None = None,
+        order: str = "asc",
+        page_size: int = 1000,
+    ) -> Generator[dict[str, Any]]:
+        """全バケット・全シャードのログを created_at 順に1件ずつ返す（ページは merge が必要とした時点で読む）。"""
+        hash_attr, hash_value, index_name = self.hash_key_of(groupid, userid, type_)
+        descending = order == "desc"
+        lo, hi, after = self._bounds(begin, end, startkey, descending)
+        buckets = self._buckets(groupid, userid, type_, lo, hi)
+        if descending:
+            buckets.reverse()
+
+        for bucket, bucket_lo, bucket_hi in buckets:
+            streams = []
+            for partition, encoded in self._sources(hash_value, bucket):
+                pages = iter_query_pages(
+                    table_name=self.table_name,
+                    key_condition_expr=Key(hash_attr).eq(partition) & Key("created_at").between(bucket_lo, bucket_hi),
+                    index_name=index_name,
+                    page_size=page_size,
+                    scan_index_forward=not descending,
+                )
+                stream = itertools.chain.from_iterable(pages)
+                streams.append(map(self.key_scheme.decode_item, stream) if encoded else stream)
+            merged = heapq.merge(*streams, key=lambda item: item["created_at"], reverse=descending)
+            yield from (item for item in _dedupe_sorted(merged) if item["created_at"] != after)
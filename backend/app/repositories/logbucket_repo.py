@@ -0,0 +1,82 @@
+# app/repositories/logbucket_repo.py
+"""
+時間バケット付きのキー（app/repositories/log_keys.py）で書き込んだログの、グループごとの最も古い日（logbuckets）
+
+キー設計:
+    groupid (HASH) : グループID
+
+oldest_day 属性に、接尾辞付きのキーで書き込んだログの最も古い created_at の日（YYYY-MM-DD）を持つ。
+LogsTable はログを書き込む前に（tools/migrate_log_keys.py は書き換える前に）記録し、
+begin を指定しない読み出しはこの日のバケットから読み始める。
+"""
+
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from boto3.dynamodb.conditions import Attr
+
+from app.models.common import MessageData, RepositoryResponse
+from app.repositories.dynamodb import get_item, update_item
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+oldest_day_cache = TTLCache(maxsize=10000, ttl=60)
+
+
+def oldest_days_of(items: Iterable[dict[str, Any]]) -> dict[str, str]:
+    """ログを groupid ごとの最も古い created_at の日（YYYY-MM-DD）に集約する。"""
+    days: dict[str, str] = {}
+    for item in items:
+        day = item["created_at"][:10]
+        days[item["groupid"]] = min(days.get(item["groupid"], day), day)
+    return days
+
+
+class LogBucketTable:
+    def __init__(self, table_name: str = "logbuckets") -> None:
+        self.table_name = table_name
+
+    def oldest_day(self, groupid: str) -> str | None:
+        """記録された最も古い日。接尾辞付きのキーで書き込んだログが無い場合は None。"""
+        cached = oldest_day_cache.get(groupid)
+        if cached is not None:
+            return cached or None
+        res = get_item(self.table_name, {"groupid": groupid})
+        if not res.is_success or res.data is None:
+            raise RuntimeError(f"Failed to read oldest log day: {res.detail}")
+        day: str = (res.data.item or {}).get("oldest_day", "")
+        oldest_day_cache.set(groupid, day)
+        return day or None
+
+    def record(self, groupid: str, day: str) -> RepositoryResponse[MessageData]:
+        """day のログを書き込む前に呼ぶ。記録済みの日より古い場合だけ、条件付き UpdateItem で更新する。"""
+        known = self.oldest_day(groupid)
+        if known is not None and known <= day:
+            return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
+        res = update_item(
+            self.table_name,
+            {"groupid": groupid},
+            "SET oldest_day = :day",
+            {":day": day},
+            condition=Attr("oldest_day").not_exists() | Attr("oldest_day").gt(day),
+        )
+        if res.is_success:
+            oldest_day_cache.set(groupid, day)
+            return res
+        # 条件を満たさなかった場合は、他のワーカーがより古い日を記録済み
+        oldest_day_cache.delete(groupid)
+        known = self.oldest_day(groupid)
+        if known is not None and known <= day:
+            return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
+        return res
+
+    def record_logs(self, items: Iterable[dict[str, Any]]) -> RepositoryResponse[MessageData]:
+        """これから書き込むログの、グループごとの最も古い日を記録する。"""
+        for groupid, day in oldest_days_of(items).items():
+            res = self.record(groupid, day)
+            if not res.is_success:
+                logger.error(f"Failed to record the oldest log day: groupid={groupid} day={day}")
+                return res
+        return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
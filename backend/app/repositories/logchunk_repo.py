@@ -0,0 +1,163 @@
+# app/repositories/logchunk_repo.py
+"""
+1日分のログを圧縮してまとめたチャンクのテーブル（logchunks）
+
+キー設計:
+    groupid (HASH)  : グループID
+    chunk   (RANGE) : "{YYYY-MM-DD}#{part:04d}"（1日分を created_at 昇順に分割した番号）
+                      "meta" は compacted_through（コンパクション済みの最後の日）と日ごとのパート数を持つ
+
+各チャンクは data 属性に、ログを DynamoDB 形式の JSON Lines にして gzip したもの（app/utils/log_codec.py）を持つ。
+アイテムの上限（400KB）に収まるよう、1日分を MAX_CHUNK_BYTES ごとのパートに分ける。
+tools/compact_logs.py が日付の変わった日を書き込み、LogsTable は compacted_through までの期間をチャンクから読む。
+1日数千件のログが数件のチャンクになるため、過去の期間の読み出しは数回の Query で済む。
+"""
+
+import logging
+from collections.abc import Iterator
+from datetime import date, timedelta
+from typing import Any
+
+from boto3.dynamodb.conditions import Key
+
+from app.repositories.dynamodb import delete_item, get_item, iter_query_pages, put_item, update_item, write_batches
+from app.repositories.log_archive_repo import select_logs
+from app.utils.log_codec import compress_lines, decode_logs, encode_lines
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+META = "meta"
+MAX_CHUNK_BYTES = 300 * 1024  # 圧縮後。キーと他の属性を含めて 400KB に収める
+RAW_CHUNK_BYTES = 2 * 1024 * 1024  # 圧縮前にまとめる目安（ログはおおむね 1/5 以下に縮む）
+meta_cache = TTLCache(maxsize=10000, ttl=60)
+
+
+def chunk_key(day: str, part: int) -> str:
+    return f"{day}#{part:04d}"
+
+
+def pack_chunks(items: list[dict[str, Any]]) -> list[tuple[bytes, int]]:
+    """
+    ログを created_at 昇順に並べ、圧縮後 MAX_CHUNK_BYTES 以下のチャンク (data, 件数) に分ける。
+    圧縮前 RAW_CHUNK_BYTES ごとに区切り、圧縮しても大きすぎる場合は半分に分け直す。
+    """
+    groups: list[list[bytes]] = []
+    size = RAW_CHUNK_BYTES
+    for line in encode_lines(items):
+        if size + len(line) > RAW_CHUNK_BYTES:
+            groups.append([])
+            size = 0
+        groups[-1].append(line)
+        size += len(line)
+
+    chunks: list[tuple[bytes, int]] = []
+    while groups:
+        group = groups.pop(0)
+        body = compress_lines(group)
+        if len(body) > MAX_CHUNK_BYTES and len(group) > 1:
+            groups[:0] = [group[: len(group) // 2], group[len(group) // 2 :]]
+            continue
+        chunks.append((body, len(group)))
+    return chunks
+
+
+class LogChunkTable:
+    def __init__(self, table_name: str = "logchunks") -> None:
+        self.table_name = table_name
+
+    # ---- meta ----
+
+    def read_meta(self, groupid: str) -> dict[str, Any] | None:
+        """コンパクションの進み具合。まだ1日もコンパクションしていない場合は None。"""
+        cached = meta_cache.get(groupid)
+        if cached is not None:
+            return cached or None
+        res = get_item(self.table_name, {"groupid": groupid, "chunk": META})
+        if not res.is_success or res.data is None:
+            raise RuntimeError(f"Failed to read chunk meta: {res.detail}")
+        meta: dict[str, Any] = res.data.item or {}
+        meta_cache.set(groupid, meta)
+        return meta or None
+
+    def write_meta(self, groupid: str, meta: dict[str, Any]) -> None:
+        res = put_item(self.table_name, {**meta, "groupid": groupid, "chunk": META})
+        if not res.is_success:
+            raise RuntimeError(f"Failed to write chunk meta: {res.detail}")
+        meta_cache.set(groupid, meta)
+
+    def boundary(self, groupid: str) -> str | None:
+        """チャンクから読める期間の終わり（compacted_through の翌日, YYYY-MM-DD）"""
+        meta = self.read_meta(groupid)
+        if not meta:
+            return None
+        return (date.fromisoformat(meta["compacted_through"]) + timedelta(days=1)).isoformat()
+
+    # ---- チャンク ----
+
+    def write_day(
+        self, groupid: str, day: str, items: list[dict[str, Any]], expires_at: int | None = None, stale_parts: int = 0
+    ) -> int:
+        """
+        1日分のログをチャンクに書き込み、パート数を返す。
+        同じ日を書き直す場合は、前回のパート数を stale_parts に渡すと余ったパートを削除する。
+        """
+        chunks = pack_chunks(items) if items else []
+        rows = [
+            {"groupid": groupid, "chunk": chunk_key(day, part), "data": body, "count": count}
+            for part, (body, count) in enumerate(chunks)
+        ]
+        if expires_at is not None:
+            for row in rows:
+                row["expires_at"] = expires_at
+        failed = write_batches(self.table_name, rows, max_workers=2)
+        if failed:
+            raise RuntimeError(f"Failed to write {len(failed)} chunks of {groupid} {day}")
+        for part in range(len(chunks), stale_parts):
+            delete_item(self.table_name, {"groupid": groupid, "chunk": chunk_key(day, part)})
+        return len(chunks)
+
+    def expire_day(self, groupid: str, day: str, parts: int, expires_at: int) -> None:
+        """
+        1日分のチャンク（parts はその日のパート数）に TTL を付ける。
+        アーカイブ前のチャンクが消えると、その日を読めなくなるため、アーカイブを書き終えてから呼ぶこと。
+        """
+        for part in range(parts):
+            res = update_item(
+                self.table_name,
+                {"groupid": groupid, "chunk": chunk_key(day, part)},
+                "SET expires_at = :expires_at",
+                {":expires_at": expires_at},
+            )
+            if not res.is_success:
+                raise RuntimeError(f"Failed to set TTL on chunk {part} of {groupid} {day}: {res.detail}")
+
+    def iter_logs(
+        self,
+        groupid: str,
+        before: str,
+        begin: str | None = None,
+        end: str | None = None,
+        userid: str | None = None,
+        type_: str | None = None,
+        after: str | None = None,
+        descending: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        """LogArchive.iter_logs と同じ条件で、チャンクからログを created_at 順に1件ずつ返す。"""
+        lo = begin[:10] if begin else "0"
+        hi = min(end[:10] + "~" if end else "~", before[:10])  # before の日のチャンクは読まない
+        if after:
+            lo, hi = (lo, min(hi, after[:10] + "~")) if descending else (max(lo, after[:10]), hi)
+        if lo >= hi:
+            return
+
+        pages = iter_query_pages(
+            table_name=self.table_name,
+            key_condition_expr=Key("groupid").eq(groupid) & Key("chunk").between(lo, hi),
+            page_size=10,  # 1チャンクは最大 400KB のため、1ページ（1MB）に数件しか入らない
+            scan_index_forward=not descending,
+        )
+        for page in pages:
+            for row in page:
+                items = decode_logs(bytes(row["data"]))
+                yield from select_logs(items, before, begin, end, userid, type_, after, descending)
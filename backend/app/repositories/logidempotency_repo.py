@@ -0,0 +1,61 @@
+# app/repositories/logidempotency_repo.py
+"""
+ログの一括書き込みで使う idempotency_key の予約テーブル
+
+キー設計:
+    idempotency_key (HASH) : "{groupid}#{idempotency_key}"
+
+各アイテムは、そのキーで書き込んだ（書き込む）ログの created_at と、TTL 用の expires_at を持つ。
+条件付き PutItem で予約するため、別の Lambda コンテナ・uvicorn ワーカーや再起動後のリトライでも、
+同じキーのエントリには最初に予約した created_at が使われる。
+"""
+
+import logging
+import time
+
+from boto3.dynamodb.conditions import Attr
+
+from app.repositories.dynamodb import delete_item, put_new_items
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+
+
+def idempotency_key_of(groupid: str, key: str) -> str:
+    return f"{groupid}#{key}"
+
+
+class LogIdempotencyTable:
+    def __init__(self, table_name: str = "logidempotency", ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS) -> None:
+        self.table_name = table_name
+        self.ttl_seconds = ttl_seconds
+
+    def claim(self, groupid: str, keys: dict[str, str]) -> tuple[dict[str, str], set[str]]:
+        """
+        idempotency_key -> created_at を、まだ予約されていないキーだけ予約する。
+        (予約済みだったキー -> 最初に予約した created_at, 予約できなかったキー) を返す。
+        DynamoDB の TTL は削除が遅れるため、expires_at を過ぎた予約は無いものとして上書きする。
+        """
+        now = int(time.time())
+        rows = [
+            {
+                "idempotency_key": idempotency_key_of(groupid, key),
+                "created_at": created_at,
+                "expires_at": now + self.ttl_seconds,
+            }
+            for key, created_at in keys.items()
+        ]
+        existing, failed = put_new_items(
+            self.table_name, rows, ("idempotency_key",), max_workers=8, condition=Attr("expires_at").lt(now)
+        )
+        prefix = len(idempotency_key_of(groupid, ""))
+        taken = {row["idempotency_key"][prefix:]: row["created_at"] for row in existing}
+        return taken, {row["idempotency_key"][prefix:] for row in failed}
+
+    def release(self, groupid: str, keys: list[str]) -> None:
+        """書き込めなかったエントリの予約を取り消す（リトライで書き込めるようにする）。"""
+        for key in keys:
+            res = delete_item(self.table_name, {"idempotency_key": idempotency_key_of(groupid, key)})
+            if not res.is_success:
+                logger.warning(f"Failed to release idempotency key: groupid={groupid} key={key}: {res.detail}")
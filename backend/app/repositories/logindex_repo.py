@@ -0,0 +1,109 @@
+# app/repositories/logindex_repo.py
+"""
+ログ全文検索用の転置インデックステーブル
+
+キー設計:
+    termkey    (HASH)  : "{groupid}#{term}"
+    created_at (RANGE) : ログの created_at（logs テーブルのソートキーと同じ値）
+
+1つの termkey の配下が、その語を含むログの posting list（created_at 昇順）になる。
+logs テーブルのキーは (groupid, created_at) なので、posting からそのままログを引ける。
+"""
+
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from boto3.dynamodb.conditions import ConditionBase, Key
+
+from app.models.common import MessageData, RepositoryResponse
+from app.repositories.dynamodb import batch_write_items, query_items
+from app.utils.tokenizer import index_terms
+
+logger = logging.getLogger(__name__)
+
+
+def term_key(groupid: str, term: str) -> str:
+    return f"{groupid}#{term}"
+
+
+def postings_for(items: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """ログから posting アイテム（語ごとに1件）を生成する。BatchWriteItem は重複キーを拒否するため重複は除く。"""
+    postings: dict[tuple[str, str], dict[str, Any]] = {}
+    for item in items:
+        groupid = item.get("groupid")
+        created_at = item.get("created_at")
+        if not groupid or not created_at:
+            continue
+        for term in index_terms(item.get("message")):
+            key = term_key(groupid, term)
+            postings[(key, created_at)] = {"termkey": key, "created_at": created_at}
+    return list(postings.values())
+
+
+class PostingCursor:
+    """
+    1語分の posting list を created_at 昇順に読むカーソル。
+
+    seek(target) で target 以上の最初の created_at を返す。バッファに無い場合は
+    KeyCondition の created_at >= target で DynamoDB 上を直接読み飛ばすため、
+    長い posting list でも先頭から全件読む必要はない。
+    """
+
+    def __init__(self, index: "LogIndexTable", groupid: str, term: str, end: str | None, page_size: int) -> None:
+        self.index = index
+        self.termkey = term_key(groupid, term)
+        self.end = end
+        self.page_size = page_size
+        self._buffer: list[str] = []
+        self._pos = 0
+        self._exhausted = False  # バッファの末尾以降に posting が無い
+
+    def seek(self, target: str) -> str | None:
+        while self._pos < len(self._buffer) and self._buffer[self._pos] < target:
+            self._pos += 1
+        if self._pos < len(self._buffer):
+            return self._buffer[self._pos]
+        if self._exhausted:
+            return None
+
+        self._buffer, has_more = self.index.read_postings(self.termkey, target, self.end, self.page_size)
+        self._pos = 0
+        self._exhausted = not has_more
+        return self._buffer[0] if self._buffer else None
+
+
+class LogIndexTable:
+    def __init__(self, table_name: str = "logindex") -> None:
+        self.table_name = table_name
+
+    def index_logs(self, items: Iterable[dict[str, Any]], max_workers: int = 4) -> RepositoryResponse[MessageData]:
+        """ログのメッセージを語に分割し、posting を書き込む。"""
+        postings = postings_for(items)
+        if not postings:
+            return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
+        logger.info(f"Indexing {len(postings)} postings")
+        return batch_write_items(self.table_name, postings, max_workers=max_workers)
+
+    def read_postings(
+        self,
+        termkey: str,
+        begin: str,
+        end: str | None,
+        limit: int,
+    ) -> tuple[list[str], bool]:
+        """termkey の posting を begin 以上（end 以下）から limit 件読み、(created_at のリスト, 続きがあるか) を返す。"""
+        key_condition: ConditionBase = Key("termkey").eq(termkey)
+        if end:
+            key_condition = key_condition & Key("created_at").between(begin, end)
+        else:
+            key_condition = key_condition & Key("created_at").gte(begin)
+
+        res = query_items(table_name=self.table_name, key_condition_expr=key_condition, limit=limit)
+        if not res.is_success or res.data is None:
+            raise RuntimeError(f"Failed to read postings: {res.detail}")
+        created_ats = [item["created_at"] for item in res.data.items]
+        return created_ats, res.data.last_evaluated_key is not None
+
+    def cursor(self, groupid: str, term: str, end: str | None = None, page_size: int = 200) -> PostingCursor:
+        return PostingCursor(self, groupid, term, end, page_size)
@@ -0,0 +1,178 @@
+# app/repositories/logstats_repo.py
+"""
+ログ集計（ロールアップ）テーブル
+
+グループごと・時間バケットごとに、ログ件数を type / userid 別のカウンタとして保持する。
+
+キー設計:
+    rollupkey (HASH)  : "{groupid}#{granularity}"   例) "group1#hour"
+    bucket    (RANGE) : UTC の created_at の先頭部分  例) "2025-05-01T08"（hour）/ "2025-05-01"（day）
+
+カウンタ属性:
+    total             : 件数の合計
+    type#{type}       : type 別の件数
+
+userid 別の件数は、ユーザー数に比例してバケットのアイテムが 400KB の上限に近づかないよう、別のアイテムに分ける。
+    rollupkey (HASH)  : "{groupid}#{granularity}#user"
+    bucket    (RANGE) : "{bucket}#{userid}"         例) "2025-05-01T08#user1@example.com"
+    total             : そのユーザーの件数
+
+以前の形式で書き込んだバケットは user#{userid} 属性を持つため、読み出し時は両方を合算する
+（tools/backfill_log_stats.py で書き直すと、バケットのアイテムから user#{userid} 属性が無くなる）。
+"""
+
+import logging
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from boto3.dynamodb.conditions import ConditionBase, Key
+
+from app.models.common import ListItemData, MessageData, RepositoryResponse
+from app.repositories.dynamodb import iter_query_pages, normalize_created_at, put_item, query_items, update_item
+
+logger = logging.getLogger(__name__)
+
+# created_at（ISO8601, UTC）の先頭何文字をバケットとするか
+GRANULARITIES: dict[str, int] = {"hour": 13, "day": 10}
+
+TOTAL_ATTR = "total"
+TYPE_PREFIX = "type#"
+USER_PREFIX = "user#"
+
+
+def bucket_of(created_at: str, granularity: str) -> str:
+    """created_at（オフセット付き・日付のみも可）を UTC に揃えてバケットにする。解釈できない場合は ValueError。"""
+    return normalize_created_at(created_at)[: GRANULARITIES[granularity]]
+
+
+def rollup_key(groupid: str, granularity: str) -> str:
+    return f"{groupid}#{granularity}"
+
+
+def user_rollup_key(groupid: str, granularity: str) -> str:
+    return f"{groupid}#{granularity}#user"
+
+
+def split_user_counts(counts: dict[str, int]) -> tuple[dict[str, int], dict[str, int]]:
+    """カウンタを (バケットのアイテムに持つ total / type 別, userid 別) に分ける。"""
+    shared = {attr: value for attr, value in counts.items() if not attr.startswith(USER_PREFIX)}
+    users = {attr[len(USER_PREFIX) :]: value for attr, value in counts.items() if attr.startswith(USER_PREFIX)}
+    return shared, users
+
+
+def count_logs(items: Iterable[dict[str, Any]]) -> dict[tuple[str, str, str], Counter[str]]:
+    """ログを (groupid, granularity, bucket) ごとのカウンタに集計する。"""
+    counters: dict[tuple[str, str, str], Counter[str]] = defaultdict(Counter)
+    for item in items:
+        groupid = item.get("groupid")
+        created_at = item.get("created_at")
+        if not groupid or not created_at:
+            continue
+        try:
+            created_at = normalize_created_at(created_at)
+        except ValueError:
+            logger.warning(f"Skipping log with invalid created_at: groupid={groupid} created_at={created_at}")
+            continue
+        for granularity in GRANULARITIES:
+            counter = counters[(groupid, granularity, created_at[: GRANULARITIES[granularity]])]
+            counter[TOTAL_ATTR] += 1
+            if item.get("type"):
+                counter[f"{TYPE_PREFIX}{item['type']}"] += 1
+            if item.get("userid"):
+                counter[f"{USER_PREFIX}{item['userid']}"] += 1
+    return counters
+
+
+class LogStatsTable:
+    def __init__(self, table_name: str = "logstats") -> None:
+        self.table_name = table_name
+
+    def _add(self, key: dict[str, str], counts: dict[str, int]) -> RepositoryResponse[MessageData]:
+        names = {f"#c{i}": attr for i, attr in enumerate(counts)}
+        values = {f":v{i}": value for i, value in enumerate(counts.values())}
+        update_expr = "ADD " + ", ".join(f"#c{i} :v{i}" for i in range(len(counts)))
+        return update_item(
+            table_name=self.table_name,
+            key=key,
+            update_expr=update_expr,
+            expr_attr_values=values,
+            expr_attr_names=names,
+        )
+
+    def add_counts(
+        self, groupid: str, granularity: str, bucket: str, counts: dict[str, int]
+    ) -> RepositoryResponse[MessageData]:
+        """1バケットのカウンタを ADD でアトミックに加算する（userid 別の件数はユーザーごとのアイテムに加算する）。"""
+        shared, users = split_user_counts(counts)
+        res = self._add({"rollupkey": rollup_key(groupid, granularity), "bucket": bucket}, shared)
+        for userid, count in users.items():
+            if not res.is_success:
+                break
+            user_key = {"rollupkey": user_rollup_key(groupid, granularity), "bucket": f"{bucket}#{userid}"}
+            res = self._add(user_key, {TOTAL_ATTR: count})
+        return res
+
+    def add_logs(self, items: Iterable[dict[str, Any]]) -> RepositoryResponse[MessageData]:
+        """
+        書き込まれたログをカウンタへ反映する。同じバケットに入るログはまとめて1回の更新にする。
+        """
+        counters = count_logs(items)
+        for (groupid, granularity, bucket), counter in counters.items():
+            res = self.add_counts(groupid, granularity, bucket, dict(counter))
+            if not res.is_success:
+                logger.error(f"Failed to update log stats: groupid={groupid} bucket={granularity}/{bucket}")
+                return res
+        return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
+
+    def put_bucket(
+        self, groupid: str, granularity: str, bucket: str, counts: dict[str, int]
+    ) -> RepositoryResponse[MessageData]:
+        """バケットのカウンタを上書きする（バックフィル用）。"""
+        shared, users = split_user_counts(counts)
+        res = put_item(
+            self.table_name, item={"rollupkey": rollup_key(groupid, granularity), "bucket": bucket, **shared}
+        )
+        for userid, count in users.items():
+            if not res.is_success:
+                break
+            user_item = {"rollupkey": user_rollup_key(groupid, granularity), "bucket": f"{bucket}#{userid}"}
+            res = put_item(self.table_name, item={**user_item, TOTAL_ATTR: count})
+        return res
+
+    def list_buckets(
+        self,
+        groupid: str,
+        granularity: str,
+        begin: str | None = None,
+        end: str | None = None,
+        limit: int = 10000,
+    ) -> RepositoryResponse[ListItemData]:
+        """begin〜end（created_at 形式）を含むバケットを時系列順に取得する。"""
+        key_condition: ConditionBase = Key("rollupkey").eq(rollup_key(groupid, granularity))
+        if begin and end:
+            key_condition = key_condition & Key("bucket").between(
+                bucket_of(begin, granularity), bucket_of(end, granularity)
+            )
+        elif begin:
+            key_condition = key_condition & Key("bucket").gte(bucket_of(begin, granularity))
+        elif end:
+            key_condition = key_condition & Key("bucket").lte(bucket_of(end, granularity))
+
+        return query_items(table_name=self.table_name, key_condition_expr=key_condition, limit=limit)
+
+    def iter_user_counts(
+        self, groupid: str, granularity: str, begin: str | None = None, end: str | None = None
+    ) -> Iterator[tuple[str, str, int]]:
+        """begin〜end（created_at 形式）のバケットの userid 別の件数を (bucket, userid, 件数) で返す。"""
+        lo = bucket_of(begin, granularity) if begin else "0"
+        hi = bucket_of(end, granularity) + "$" if end else "~"  # "{bucket}#{userid}" < "{bucket}$"
+        pages = iter_query_pages(
+            table_name=self.table_name,
+            key_condition_expr=Key("rollupkey").eq(user_rollup_key(groupid, granularity))
+            & Key("bucket").between(lo, hi),
+        )
+        for page in pages:
+            for item in page:
+                bucket, userid = item["bucket"].split("#", 1)
+                yield bucket, userid, int(item.get(TOTAL_ATTR, 0))
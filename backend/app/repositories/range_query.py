@@ -0,0 +1,202 @@
+# app/repositories/range_query.py
+"""
+ソートキー（created_at）の範囲を分割して並列に Query するユーティリティ
+
+数か月分の begin / end を1本の Query で読むと、1MB ごとのページを順番に待つことになる。
+ここでは範囲を重ならない部分範囲に分け、部分範囲ごとにスレッドでページを先読みしながら、
+heapq.merge（k-way merge）でソート順に1件ずつ返す。
+
+- 部分範囲は [b0, b1), [b1, b2), ..., [bk-1, end] の半開区間。DynamoDB の between は両端を含むため、
+  上端と同じ created_at のアイテムは次の部分範囲に任せて捨てる
+- 再開用のキー（startkey）は、返した最後のアイテムのキーをそのまま使える。再開時は
+  startkey の created_at から end（降順なら begin から startkey）までを改めて分割する
+- 並列数は read_concurrency() がテーブル / GSI の読み込みキャパシティから決める（成功した結果だけを数分間キャッシュする）
+- 呼び出し側がイテレータを途中で閉じると、先読み中のスレッドも停止する
+"""
+
+import heapq
+import logging
+import queue
+import threading
+from collections.abc import Generator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from boto3.dynamodb.conditions import ConditionBase, Key
+from botocore.exceptions import ClientError
+
+from app.repositories.dynamodb import (
+    get_dynamodb_resource,
+    get_full_table_name,
+    iso8601_to_utc_datetime,
+    iter_query_pages,
+)
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+# 1ワーカーが連続して 1000 件（約200KB）のページを読むと、結果整合性読み込みで1ページあたり約25RCU。
+# 毎秒2ページ程度を見込み、プロビジョンド RCU 50 あたり1ワーカーとする
+RCU_PER_WORKER = 50
+
+_DONE = object()
+
+# キャパシティはオートスケーリングでも変わるため、describe_table の結果は数分だけ使い回す
+concurrency_cache = TTLCache(maxsize=64, ttl=300)
+
+
+def read_concurrency(table_name: str, index_name: str | None = None, maximum: int = DEFAULT_MAX_CONCURRENCY) -> int:
+    """
+    テーブル（または GSI）の読み込みキャパシティから並列数を決める。
+    オンデマンドの場合は maximum、プロビジョンドの場合は RCU / RCU_PER_WORKER（1〜maximum）。
+    describe_table に失敗した場合は 1 を返し、キャッシュしない（次の呼び出しで再び問い合わせる）。
+    """
+    cached = concurrency_cache.get((table_name, index_name, maximum))
+    if cached is not None:
+        return int(cached)
+    try:
+        table = get_dynamodb_resource().meta.client.describe_table(TableName=get_full_table_name(table_name))["Table"]
+    except ClientError as e:
+        logger.warning(f"[read_concurrency] describe_table failed for {table_name}: {e}")
+        return 1
+
+    workers = maximum
+    if table.get("BillingModeSummary", {}).get("BillingMode") != "PAY_PER_REQUEST":
+        throughput = table.get("ProvisionedThroughput", {})
+        if index_name:
+            for index in table.get("GlobalSecondaryIndexes", []):
+                if index["IndexName"] == index_name:
+                    throughput = index.get("ProvisionedThroughput", {})
+        rcu = int(throughput.get("ReadCapacityUnits", 0))
+        if rcu > 0:
+            workers = max(1, min(maximum, rcu // RCU_PER_WORKER))
+    concurrency_cache.set((table_name, index_name, maximum), workers)
+    return workers
+
+
+def split_time_range(begin: str, end: str, parts: int) -> list[tuple[str, str]]:
+    """
+    [begin, end] を parts 個の部分範囲に等分する。境界は created_at と同じ ISO8601（UTC, Z）文字列。
+    オフセット付き・タイムゾーン無し（UTC とみなす）の値も UTC に揃えてから分割する。
+    日時として解釈できない場合や範囲が短すぎる場合は分割しない。
+    """
+    try:
+        lo, hi = iso8601_to_utc_datetime(begin), iso8601_to_utc_datetime(end)
+    except ValueError:
+        return [(begin, end)]
+    if parts <= 1 or hi <= lo:
+        return [(begin, end)]
+
+    step = (hi - lo) / parts
+    if step.total_seconds() < 1:
+        return [(begin, end)]
+    bounds = [begin]
+    for i in range(1, parts):
+        bounds.append((lo + step * i).replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%SZ"))
+    bounds.append(end)
+    # 丸めで境界が重なった場合は除く
+    bounds = [b for i, b in enumerate(bounds) if i == 0 or b > bounds[i - 1]]
+    return list(zip(bounds, bounds[1:], strict=False))
+
+
+def _prefetch(
+    executor: ThreadPoolExecutor,
+    pages: Generator[list[dict[str, Any]]],
+    stop: threading.Event,
+    buffer_pages: int,
+) -> Iterator[list[dict[str, Any]]]:
+    """pages をスレッドで先読みし、最大 buffer_pages ページをキューに溜めながら返す。"""
+    q: queue.Queue[Any] = queue.Queue(maxsize=buffer_pages)
+
+    def put(value: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run() -> None:
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+            put(_DONE)
+        except BaseException as e:  # 例外は消費側のスレッドで送出する
+            put(e)
+        finally:
+            pages.close()
+
+    executor.submit(run)
+    while True:
+        value = q.get()
+        if value is _DONE:
+            return
+        if isinstance(value, BaseException):
+            raise value
+        yield value
+
+
+def parallel_range_query(
+    table_name: str,
+    hash_condition: ConditionBase,
+    begin: str,
+    end: str,
+    index_name: str | None = None,
+    sort_key: str = "created_at",
+    exclusive_start_key: dict[str, Any] | None = None,
+    descending: bool = False,
+    concurrency: int | None = None,
+    page_size: int = 1000,
+    buffer_pages: int = 2,
+) -> Generator[dict[str, Any]]:
+    """
+    hash_condition かつ sort_key が [begin, end] のアイテムを、部分範囲ごとに並列で Query し、
+    sort_key の順（descending=True なら降順）に1件ずつ返す。
+
+    exclusive_start_key を渡すと、そのアイテムの直後（降順なら直前）から再開する。
+    ClientError はそのまま送出する。
+    """
+    if exclusive_start_key:
+        if descending:
+            end = min(end, exclusive_start_key[sort_key])
+        else:
+            begin = max(begin, exclusive_start_key[sort_key])
+    if begin > end:
+        return
+
+    workers = concurrency or read_concurrency(table_name, index_name)
+    ranges = split_time_range(begin, end, workers)
+    # 再開キーを含む部分範囲（昇順なら最初、降順なら最後）だけ ExclusiveStartKey を使う
+    start_range = len(ranges) - 1 if descending else 0
+
+    def range_pages(i: int, lo: str, hi: str) -> Generator[list[dict[str, Any]]]:
+        pages = iter_query_pages(
+            table_name=table_name,
+            key_condition_expr=hash_condition & Key(sort_key).between(lo, hi),
+            index_name=index_name,
+            page_size=page_size,
+            exclusive_start_key=exclusive_start_key if i == start_range else None,
+            scan_index_forward=not descending,
+        )
+        last = i == len(ranges) - 1
+        for page in pages:
+            if not last:
+                page = [item for item in page if item[sort_key] != hi]
+            if page:
+                yield page
+
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="range-query")
+    try:
+        streams = [
+            (item for page in _prefetch(executor, range_pages(i, lo, hi), stop, buffer_pages) for item in page)
+            for i, (lo, hi) in enumerate(ranges)
+        ]
+        logger.info(f"[parallel_range_query] {table_name} {begin}..{end} split into {len(ranges)} ranges")
+        yield from heapq.merge(*streams, key=lambda item: item[sort_key], reverse=descending)
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -28,6 +28,18 @@ class UsersTable:
         keys = [{"userid": userid} for userid in userids]
         return batch_get_items(self.table_name, keys)
 
+    def batch_get_user_briefs(self, userids: list[str], max_workers: int = 8) -> RepositoryResponse[ListItemData]:
+        """userid と username だけを、100件単位のリクエストを並列に発行して取得する。"""
+        logger.info(f"Batch fetching user briefs by IDs: {len(userids)}")
+        keys = [{"userid": userid} for userid in userids]
+        return batch_get_items(
+            self.table_name,
+            keys,
+            projection_expr="#userid, #username",
+            expr_attr_names={"#userid": "userid", "#username": "username"},
+            max_workers=max_workers,
+        )
+
     def list_users(
         self,
         limit: int = 25,
@@ -1,6 +1,6 @@
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ErrorResponse(BaseModel):
@@ -19,3 +19,50 @@ class LogItem(BaseModel):
 class LogsResponse(BaseModel):
     Items: list[LogItem]
     LastEvaluatedKey: dict[str, Any] | None = None
+    PrevKey: dict[str, Any] | None = None
+
+
+class LogStatsBucket(BaseModel):
+    bucket: str
+    total: int
+    types: dict[str, int]
+    users: dict[str, int]
+
+
+class LogStatsResponse(BaseModel):
+    groupid: str
+    granularity: str
+    total: int
+    types: dict[str, int]
+    users: dict[str, int]
+    buckets: list[LogStatsBucket]
+
+
+class LogBatchEntry(BaseModel):
+    created_at: str | None = Field(
+        None,
+        description="ISO8601（オフセット可）。UTC・マイクロ秒固定長（2026-01-18T01:15:30.000000Z）に揃えて保存し、省略時はサーバー側で採番",
+    )
+    userid: str | None = None
+    username: str | None = None
+    type: str | None = None
+    message: str | None = None
+    idempotency_key: str | None = Field(None, max_length=128, description="同じキーのエントリは1度だけ書き込む")
+
+
+class LogBatchRequest(BaseModel):
+    entries: list[LogBatchEntry] = Field(..., min_length=1, max_length=5000)
+
+
+class LogBatchResult(BaseModel):
+    index: int
+    status: str  # created / duplicate / failed
+    created_at: str | None = None
+    detail: str | None = None
+
+
+class LogBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: list[LogBatchResult]
@@ -40,6 +40,9 @@ class UserBrief(BaseModel):
 
 class UsersBriefResponse(BaseModel):
     Items: list[UserBrief] = Field(..., description="ユーザー情報の一覧（IDと名前）")
+    LastEvaluatedKey: dict[str, Any] | None = Field(
+        default=None, description="次ページ取得用の開始キー。これが存在する場合はさらにデータがあります。"
+    )
 
 
 class MessageResponse(BaseModel):
@@ -1,39 +1,169 @@
 # app/services/group_service.py
 import logging
+from bisect import bisect_left, bisect_right
+from typing import Any
 
 # 定義した型をインポート
-from app.models.common import ServiceResponse, SingleItemData
+from app.models.common import ListItemData, ServiceResponse, SingleItemData
 from app.repositories.group_repo import GroupsTable
 from app.repositories.user_repo import UsersTable
+from app.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+MEMBER_SORT_KEYS = ("userid", "username")
+
+# userid -> {"userid", "username"}。ワーカー内の全リクエストで共有する
+member_brief_cache = TTLCache(maxsize=50000, ttl=60.0)
+
+
+def extract_member_ids(group_item: dict[str, Any]) -> list[str]:
+    """グループアイテムの users 属性からユーザーIDを取り出す（文字列 / {"userid": ...} の両形式に対応）。"""
+    member_ids: list[str] = []
+    for member in group_item.get("users", []) or []:
+        if isinstance(member, str):
+            member_ids.append(member)
+        elif isinstance(member, dict) and member.get("userid"):
+            member_ids.append(member["userid"])
+    return list(dict.fromkeys(member_ids))
+
+
+def _sort_key(sort: str) -> Any:
+    if sort == "username":
+        return lambda row: (row["username"], row["userid"])
+    return lambda row: (row["userid"],)
+
+
+def is_valid_cursor(startkey: Any, sort: str) -> bool:
+    """startkey が _paginate で使える形（並べ替えのキーを文字列で持つオブジェクト）か"""
+    fields = ("username", "userid") if sort == "username" else ("userid",)
+    return isinstance(startkey, dict) and all(isinstance(startkey.get(field), str) for field in fields)
+
+
+def _paginate(
+    rows: list[dict[str, Any]],
+    sort: str,
+    limit: int,
+    startkey: dict[str, Any] | None,
+    descending: bool,
+) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
+    """
+    昇順に並んだ rows から startkey の直後（降順なら直前）の limit 件を切り出す。
+    戻り値は (ページ, 次ページ用の LastEvaluatedKey)。
+    """
+    key = _sort_key(sort)
+    cursor = key(startkey) if startkey else None
+
+    if descending:
+        end = bisect_left(rows, cursor, key=key) if cursor else len(rows)
+        start = max(0, end - limit)
+        page = rows[start:end][::-1]
+        has_more = start > 0
+    else:
+        start = bisect_right(rows, cursor, key=key) if cursor else 0
+        page = rows[start : start + limit]
+        has_more = start + limit < len(rows)
+
+    if not has_more or not page:
+        return page, None
+    last = page[-1]
+    return page, {k: last[k] for k in MEMBER_SORT_KEYS if k in last}
+
 
 class GroupService:
     def __init__(
         self,
         groups_repo: GroupsTable | None = None,
         users_repo: UsersTable | None = None,
+        brief_cache: TTLCache | None = None,
     ):
         self.groups_repo = groups_repo or GroupsTable()
         self.users_repo = users_repo or UsersTable()
+        self.brief_cache = brief_cache if brief_cache is not None else member_brief_cache
 
     def get_group_by_id(self, groupid: str) -> ServiceResponse[SingleItemData]:
         """グループIDに基づいてグループ情報を取得する。"""
         repo_res = self.groups_repo.get_group_by_id(groupid)
-
-        return ServiceResponse(
-            code=repo_res.code,
-            data=repo_res.data,
-            detail=repo_res.detail,
-        )
+        return ServiceResponse.of(repo_res)
 
     def get_group_members(self, groupid: str) -> ServiceResponse[SingleItemData]:
         """指定されたグループに所属するユーザーの一覧を取得する。"""
-        # 1. グループ情報の取得
-        repo_res = self.get_group_by_id(groupid)
+        # メンバーはグループアイテム内に保持されているため、グループ情報をそのまま返す
+        return self.get_group_by_id(groupid)
+
+    def list_group_members(
+        self,
+        groupid: str,
+        limit: int = 100,
+        startkey: dict[str, Any] | None = None,
+        sort: str = "userid",
+        order: str = "asc",
+    ) -> ServiceResponse[ListItemData]:
+        """
+        グループのメンバーを users テーブルの最新情報で補完（hydrate）し、ページ単位で返す。
+
+        - sort=userid: グループ内のIDだけで並べ替え・ページングし、そのページ分だけユーザーを取得する
+        - sort=username: 全メンバーを取得してから並べ替える（取得結果はキャッシュされる）
+        """
+        if sort not in MEMBER_SORT_KEYS:
+            return ServiceResponse(code=400, data=None, detail=f"Invalid sort key: {sort}")
+        if startkey is not None and not is_valid_cursor(startkey, sort):
+            return ServiceResponse(code=400, data=None, detail="Invalid startkey format")
+
+        group_res = self.get_group_by_id(groupid)
+        if not group_res.is_success:
+            return ServiceResponse(code=group_res.code, data=None, detail=group_res.detail)
+        if group_res.data is None or group_res.data.item is None:
+            return ServiceResponse(code=404, data=None, detail="Group not found")
+
+        group_item = group_res.data.item
+        member_ids = sorted(extract_member_ids(group_item))
+        descending = order == "desc"
+
+        if sort == "userid":
+            id_rows = [{"userid": userid} for userid in member_ids]
+            page, last_key = _paginate(id_rows, sort, limit, startkey, descending)
+            briefs = self.hydrate_members([row["userid"] for row in page], group_item)
+            items = [briefs[row["userid"]] for row in page]
+        else:
+            briefs = self.hydrate_members(member_ids, group_item)
+            rows = sorted(briefs.values(), key=_sort_key(sort))
+            items, last_key = _paginate(rows, sort, limit, startkey, descending)
+
+        logger.info(f"Group members listed - groupid={groupid} total={len(member_ids)} page={len(items)}")
         return ServiceResponse(
-            code=repo_res.code,
-            data=repo_res.data,
-            detail=repo_res.detail,
+            code=200,
+            data=ListItemData(items=items, last_evaluated_key=last_key, size=0, count=len(items)),
+            detail=None,
         )
+
+    def hydrate_members(self, userids: list[str], group_item: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        """
+        userid ごとに {"userid", "username"} を返す。キャッシュに無いものだけ users テーブルから取得し、
+        users テーブルに存在しないメンバーはグループ内の非正規化データ（無ければ userid）で補う。
+        """
+        briefs: dict[str, dict[str, Any]] = {}
+        for userid, brief in self.brief_cache.get_many(userids).items():
+            briefs[str(userid)] = brief
+
+        missing = [userid for userid in userids if userid not in briefs]
+        if missing:
+            res = self.users_repo.batch_get_user_briefs(missing)
+            if res.is_success and res.data is not None:
+                fetched = {
+                    item["userid"]: {"userid": item["userid"], "username": item.get("username") or item["userid"]}
+                    for item in res.data.items
+                }
+                self.brief_cache.set_many(dict(fetched))
+                briefs.update(fetched)
+            else:
+                logger.warning(f"Failed to hydrate group members: code={res.code} detail={res.detail}")
+
+        denormalized = {
+            m["userid"]: m for m in group_item.get("users", []) or [] if isinstance(m, dict) and m.get("userid")
+        }
+        for userid in userids:
+            if userid not in briefs:
+                username = denormalized.get(userid, {}).get("username") or userid
+                briefs[userid] = {"userid": userid, "username": username}
+        return briefs
@@ -1,14 +1,140 @@
 # app/services/log_service.py
 
+import heapq
+import itertools
+import logging
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
-from app.models.common import ListItemData, ServiceResponse
+from botocore.exceptions import ClientError
+
+from app.models.common import ListItemData, MessageData, ServiceResponse, SingleItemData
+from app.repositories.dynamodb import datetime_to_created_at, iso8601_to_utc_datetime, normalize_created_at
 from app.repositories.log_repo import LogsTable
+from app.repositories.logidempotency_repo import LogIdempotencyTable
+from app.repositories.logindex_repo import LogIndexTable, PostingCursor
+from app.services.log_stats_service import LogStatsService
+from app.utils.log_export import encode_logs
+from app.utils.tokenizer import tokenize
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# created_at の下限として使う、どの ISO8601 文字列よりも小さい値
+MIN_CREATED_AT = "0"
+
+# begin〜end がこの期間以上で、limit がこの件数以上の一覧は、期間を分割して並列に読む
+PARALLEL_MIN_SPAN = timedelta(days=7)
+PARALLEL_MIN_LIMIT = 200
+
+# 複数グループのタイムラインで同時に Query するグループ数
+TIMELINE_MAX_WORKERS = 8
+
+# 新しい順の先頭ページ (groupid, userid, type, limit) -> (items, 続きがあるか)
+head_page_cache = TTLCache(maxsize=10000, ttl=300.0)
+
+# 書き込み済みの idempotency_key -> created_at（logidempotency テーブルの予約の、ワーカー内のキャッシュ）
+idempotency_cache = TTLCache(maxsize=200000, ttl=24 * 3600.0)
+
+LOG_ENTRY_FIELDS = ("userid", "username", "type", "message")
+
+
+def is_long_range(begin: str, end: str) -> bool:
+    """期間分割による並列読み出しの対象になる長い期間か（日付のみ・オフセット付きの値も UTC に揃えて比べる）"""
+    try:
+        return iso8601_to_utc_datetime(end) - iso8601_to_utc_datetime(begin) >= PARALLEL_MIN_SPAN
+    except ValueError:
+        return False
+
+
+def is_valid_timeline_cursor(startkey: Any) -> bool:
+    """startkey が list_timeline の複合カーソル（{"positions": {groupid: キー}, "done": [groupid]}）の形か"""
+    if not isinstance(startkey, dict):
+        return False
+    positions = startkey.get("positions", {})
+    done = startkey.get("done", [])
+    return (
+        isinstance(positions, dict)
+        and all(isinstance(key, dict) and isinstance(key.get("created_at"), str) for key in positions.values())
+        and isinstance(done, list)
+        and all(isinstance(groupid, str) for groupid in done)
+    )
+
+
+def server_timestamp(base: datetime, offset: int) -> str:
+    """
+    サーバー側で採番する created_at。logs テーブルのキーは (groupid, created_at) なので、
+    同じバッチ内で衝突しないよう base からエントリ番号ぶんマイクロ秒をずらす。
+    """
+    return datetime_to_created_at(base + timedelta(microseconds=offset))
+
+
+def build_log_item(groupid: str, entry: dict[str, Any], created_at: str) -> dict[str, Any]:
+    """エントリから logs テーブルのアイテムを作り、GSI 用の複合属性を付与する。"""
+    item: dict[str, Any] = {"groupid": groupid, "created_at": created_at}
+    for field in LOG_ENTRY_FIELDS:
+        if entry.get(field) is not None:
+            item[field] = entry[field]
+    if entry.get("idempotency_key"):
+        item["idempotency_key"] = entry["idempotency_key"]
+    # GSI のキー属性は空文字列にできないため、値が無い場合は属性ごと省く
+    if item.get("type"):
+        item["groupid#type"] = f"{groupid}#{item['type']}"
+    if item.get("userid"):
+        item["groupid#userid"] = f"{groupid}#{item['userid']}"
+    return item
+
+
+def same_log(a: dict[str, Any], b: dict[str, Any]) -> bool:
+    """created_at が同じ2件のログが、同じエントリから書き込まれたものか（リトライ・再送の判定）"""
+    return all(a.get(field) == b.get(field) for field in LOG_ENTRY_FIELDS)
+
+
+def intersect_postings(cursors: list[PostingCursor], lower: str, limit: int) -> list[str]:
+    """
+    各語の posting list（created_at 昇順）の共通部分を、lower 以上から最大 limit 件求める（leapfrog join）。
+    一致しない語があれば、その語の次の値まで他の語のカーソルを読み飛ばす。
+    """
+    matched: list[str] = []
+    candidate = lower
+    while len(matched) < limit:
+        value = cursors[0].seek(candidate)
+        if value is None:
+            break
+        agreed = True
+        for cursor in cursors[1:]:
+            other = cursor.seek(value)
+            if other is None:
+                return matched
+            if other != value:
+                candidate = other
+                agreed = False
+                break
+        if agreed:
+            matched.append(value)
+            candidate = value + "\x00"  # value の直後の文字列
+    return matched
 
 
 class LogsService:
-    def __init__(self, logs_repo: LogsTable | None = None):
+    def __init__(
+        self,
+        logs_repo: LogsTable | None = None,
+        index_repo: LogIndexTable | None = None,
+        stats_service: LogStatsService | None = None,
+        idempotency: TTLCache | None = None,
+        head_cache: TTLCache | None = None,
+        idempotency_repo: LogIdempotencyTable | None = None,
+    ):
         self.logs_repo = logs_repo or LogsTable()
+        self.index_repo = index_repo or LogIndexTable()
+        self.stats_service = stats_service or LogStatsService()
+        self.idempotency = idempotency if idempotency is not None else idempotency_cache
+        self.head_cache = head_cache if head_cache is not None else head_page_cache
+        self.idempotency_repo = idempotency_repo or LogIdempotencyTable()
 
     def list_logs(
         self,
@@ -19,14 +145,442 @@ class LogsService:
         end: str | None = None,
         userid: str | None = None,
         type_: str | None = None,
+        order: str = "asc",
+        direction: str = "next",
     ) -> ServiceResponse[ListItemData]:
+        """
+        order は並び順（asc: 古い順 / desc: 新しい順）、direction はカーソルの向き。
+        direction="prev" の場合は startkey（前のページの prev_key）より前のページを、逆順の Query で読んで並べ直す。
+        """
+        if order == "desc" and direction == "next" and not startkey and not begin and not end:
+            return self._head_page(groupid, limit, userid, type_)
+
+        if direction == "next" and limit >= PARALLEL_MIN_LIMIT and begin and end and is_long_range(begin, end):
+            return self._list_logs_parallel(groupid, limit, startkey, begin, end, userid, type_, order)
+
+        backward = direction == "prev"
+        query_order = ("desc" if order == "asc" else "asc") if backward else order
+        # 前のページは1件多く読む。DynamoDB は Limit に達すると続きが無くても LastEvaluatedKey を返すため、
+        # limit 件を超えて読めた（または途中で打ち切られた）場合だけ、さらに前のページがある
         res = self.logs_repo.list_logs(
             groupid=groupid,
-            limit=limit,
+            limit=limit + 1 if backward else limit,
             startkey=startkey,
             begin=begin,
             end=end,
             userid=userid,
             type_=type_,
+            order=query_order,
+        )
+        if not res.is_success or res.data is None:
+            return ServiceResponse.of(res)
+
+        items = res.data.items
+        if backward:
+            items = items[:limit][::-1]
+            prev_key = self.logs_repo.key_of(items[0], userid, type_) if items and res.data.last_evaluated_key else None
+            next_key = self.logs_repo.key_of(items[-1], userid, type_) if items else None
+        else:
+            prev_key = self.logs_repo.key_of(items[0], userid, type_) if items and startkey else None
+            next_key = res.data.last_evaluated_key
+        return ServiceResponse(
+            code=200,
+            data=ListItemData(
+                items=items, last_evaluated_key=next_key, size=res.data.size, count=len(items), prev_key=prev_key
+            ),
+            detail=None,
+        )
+
+    def _list_logs_parallel(
+        self,
+        groupid: str,
+        limit: int,
+        startkey: dict[str, Any] | None,
+        begin: str,
+        end: str,
+        userid: str | None,
+        type_: str | None,
+        order: str,
+    ) -> ServiceResponse[ListItemData]:
+        """期間を分割した並列 Query から limit 件を取り出す。次のページのキーは最後に返したアイテムのキー。"""
+        stream = self.logs_repo.iter_logs_parallel(
+            groupid=groupid,
+            begin=begin,
+            end=end,
+            userid=userid,
+            type_=type_,
+            startkey=startkey,
+            order=order,
+            page_size=min(limit, 1000),
+            buffer_pages=1,
+        )
+        try:
+            items = list(itertools.islice(stream, limit + 1))
+        except ClientError as e:
+            logger.error(f"Parallel log query failed: groupid={groupid}: {e}")
+            return ServiceResponse(code=500, data=None, detail=str(e))
+        finally:
+            stream.close()
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        next_key = self.logs_repo.key_of(items[-1], userid, type_) if has_more else None
+        prev_key = self.logs_repo.key_of(items[0], userid, type_) if items and startkey else None
+        return ServiceResponse(
+            code=200,
+            data=ListItemData(items=items, last_evaluated_key=next_key, count=len(items), prev_key=prev_key),
+            detail=None,
+        )
+
+    def _head_page(
+        self, groupid: str, limit: int, userid: str | None, type_: str | None
+    ) -> ServiceResponse[ListItemData]:
+        """
+        新しい順の先頭ページ。グループ・フィルタごとにキャッシュし、2回目以降はキャッシュの最新 created_at より
+        新しいログだけを Query して先頭に足す（新着が無ければ空の小さな Query 1回で済む）。
+        """
+        cache_key = (groupid, userid, type_, limit)
+        cached = self.head_cache.get(cache_key)
+        newest = cached[0][0]["created_at"] if cached and cached[0] else None
+
+        # キャッシュ済みの最新ログ自体は読まないよう、newest の直後の文字列から読む
+        res = self.logs_repo.list_logs(
+            groupid=groupid,
+            limit=limit,
+            begin=newest + "\x00" if newest else None,
+            userid=userid,
+            type_=type_,
+            order="desc",
+        )
+        if not res.is_success or res.data is None:
+            return ServiceResponse.of(res)
+
+        fresh = res.data.items
+        if cached is None or res.data.last_evaluated_key is not None:
+            # 初回、または新着が1ページを超えた場合はキャッシュを使わずに読み直した結果を先頭ページとする
+            items, has_more = fresh, res.data.last_evaluated_key is not None
+        else:
+            merged = fresh + cached[0]
+            items, has_more = merged[:limit], cached[1] or len(merged) > limit
+        self.head_cache.set(cache_key, (items, has_more))
+
+        next_key = self.logs_repo.key_of(items[-1], userid, type_) if items and has_more else None
+        return ServiceResponse(
+            code=200,
+            data=ListItemData(items=items, last_evaluated_key=next_key, size=res.data.size, count=len(items)),
+            detail=None,
+        )
+
+    def list_timeline(
+        self,
+        groupids: list[str],
+        limit: int = 25,
+        startkey: dict[str, Any] | None = None,
+        begin: str | None = None,
+        end: str | None = None,
+        type_: str | None = None,
+        order: str = "desc",
+    ) -> ServiceResponse[ListItemData]:
+        """
+        複数グループのログを created_at 順に1本のタイムラインとして返す。
+
+        グループごとに limit 件を並列に Query し、heapq で k-way merge して先頭 limit 件を返す。
+        続きのキーは {"positions": {groupid: 最後に返したアイテムのキー}, "done": [読み終えたグループ]} の複合カーソル。
+        """
+        if startkey is not None and not is_valid_timeline_cursor(startkey):
+            return ServiceResponse(code=400, data=None, detail="Invalid startkey format")
+
+        cursor = startkey or {}
+        positions: dict[str, Any] = dict(cursor.get("positions", {}))
+        done = set(cursor.get("done", []))
+        active = [groupid for groupid in dict.fromkeys(groupids) if groupid not in done]
+        if not active:
+            return ServiceResponse(code=200, data=ListItemData(), detail=None)
+
+        def read(groupid: str) -> ServiceResponse[ListItemData]:
+            return self.list_logs(
+                groupid=groupid,
+                limit=limit,
+                startkey=positions.get(groupid),
+                begin=begin,
+                end=end,
+                type_=type_,
+                order=order,
+            )
+
+        with ThreadPoolExecutor(max_workers=min(TIMELINE_MAX_WORKERS, len(active))) as executor:
+            results = dict(zip(active, executor.map(read, active), strict=True))
+        pages: dict[str, ListItemData] = {}
+        for groupid, res in results.items():
+            if not res.is_success or res.data is None:
+                logger.error(f"Timeline query failed: groupid={groupid}: {res.detail}")
+                return ServiceResponse(code=res.code, data=None, detail=res.detail)
+            pages[groupid] = res.data
+
+        merged = heapq.merge(
+            *(page.items for page in pages.values()),
+            key=lambda item: item["created_at"],
+            reverse=order == "desc",
+        )
+        items = list(itertools.islice(merged, limit))
+
+        # グループごとに、今回返した件数ぶん位置を進める
+        consumed = Counter(item["groupid"] for item in items)
+        for groupid, page in pages.items():
+            if consumed[groupid]:
+                positions[groupid] = self.logs_repo.key_of(page.items[consumed[groupid] - 1], type_=type_)
+            if consumed[groupid] == len(page.items) and page.last_evaluated_key is None:
+                done.add(groupid)
+                positions.pop(groupid, None)
+
+        finished = all(groupid in done for groupid in active)
+        next_key = None if finished else {"positions": positions, "done": sorted(done)}
+        return ServiceResponse(
+            code=200,
+            data=ListItemData(
+                items=items,
+                last_evaluated_key=next_key,
+                size=sum(page.size for page in pages.values()),
+                count=len(items),
+            ),
+            detail=None,
+        )
+
+    def export_logs(
+        self,
+        groupid: str,
+        fmt: str = "ndjson",
+        begin: str | None = None,
+        end: str | None = None,
+        userid: str | None = None,
+        type_: str | None = None,
+        gzip: bool = False,
+    ) -> Iterator[bytes]:
+        """
+        条件に一致する全ログを、DynamoDB から読みながら NDJSON / CSV のバイト列として逐次返す。
+        長い期間は部分範囲に分けて並列に先読みする。どちらの場合も、ホット層より前はコールド層から読む。
+        """
+        if begin and end and is_long_range(begin, end):
+            stream = self.logs_repo.iter_logs_parallel(
+                groupid=groupid, begin=begin, end=end, userid=userid, type_=type_, buffer_pages=4
+            )
+            return encode_logs(map(list, itertools.batched(stream, 1000, strict=False)), fmt=fmt, gzip=gzip)
+
+        pages = self.logs_repo.iter_logs(
+            groupid=groupid,
+            begin=begin,
+            end=end,
+            userid=userid,
+            type_=type_,
         )
-        return ServiceResponse(code=res.code, data=res.data, detail=res.detail)
+        return encode_logs(pages, fmt=fmt, gzip=gzip)
+
+    def index_logs(self, items: Iterable[dict[str, Any]]) -> ServiceResponse[MessageData]:
+        """書き込んだログのメッセージを転置インデックスに登録する（ログ書き込み経路から呼ぶ）。"""
+        return ServiceResponse.of(self.index_repo.index_logs(items))
+
+    def search_logs(
+        self,
+        groupid: str,
+        q: str,
+        limit: int = 25,
+        startkey: dict[str, Any] | None = None,
+        begin: str | None = None,
+        end: str | None = None,
+    ) -> ServiceResponse[ListItemData]:
+        """
+        転置インデックスの posting list を突き合わせ、q の全ての語を含むログを created_at 昇順で返す。
+        logs テーブルは Scan せず、一致したキーだけを BatchGetItem で読む（期限切れのログはコールド層から読む）。
+        """
+        terms = tokenize(q)
+        if not terms:
+            return ServiceResponse(code=400, data=None, detail="Query has no searchable terms")
+
+        lower = begin or MIN_CREATED_AT
+        if startkey and startkey.get("created_at"):
+            lower = max(lower, startkey["created_at"] + "\x00")
+
+        page_size = max(limit, 100)
+        cursors = [self.index_repo.cursor(groupid, term, end=end, page_size=page_size) for term in terms]
+        try:
+            matched = intersect_postings(cursors, lower, limit)
+        except RuntimeError as e:
+            logger.error(f"Log search failed: groupid={groupid} q={q!r}: {e}")
+            return ServiceResponse(code=500, data=None, detail=str(e))
+
+        if not matched:
+            return ServiceResponse(code=200, data=ListItemData(), detail=None)
+
+        res = self.logs_repo.batch_get_logs(groupid, matched)
+        if not res.is_success or res.data is None:
+            return ServiceResponse(code=res.code, data=None, detail=res.detail)
+
+        items = sorted(res.data.items, key=lambda item: item["created_at"])
+        last_key = {"groupid": groupid, "created_at": matched[-1]} if len(matched) == limit else None
+        return ServiceResponse(
+            code=200,
+            data=ListItemData(items=items, last_evaluated_key=last_key, size=res.data.size, count=len(items)),
+            detail=None,
+        )
+
+    def ingest_logs(
+        self,
+        groupid: str,
+        entries: list[dict[str, Any]],
+        publish: Callable[[str, list[dict[str, Any]]], None] | None = None,
+    ) -> ServiceResponse[SingleItemData]:
+        """
+        ログをまとめて書き込み、エントリごとの結果（created / duplicate / failed）を返す。
+
+        - created_at が無いエントリはサーバー側で採番し、groupid#type / groupid#userid を付与する
+        - created_at は UTC・マイクロ秒固定長の正規形（datetime_to_created_at）に揃えて保存する
+        - created_at がアーカイブ・コンパクション済みの期間（LogsTable.sealed_before より前）のエントリがあれば、
+          何も書き込まずに 400 を返す
+        - idempotency_key が同じエントリは、同じバッチ内でも過去のバッチ（24時間以内）でも1度だけ書き込む。
+          キーは logidempotency テーブルに条件付きで予約するため、別のワーカーへのリトライでも同じ created_at になる
+        - created_at を指定したエントリと idempotency_key のあるエントリは、同じ created_at のログが無い場合だけ書き込む。
+          既にあれば同じ内容（または同じ idempotency_key）なら duplicate、違う内容なら failed とし、上書きしない
+        - 新しく書き込めたログだけを集計テーブル・全文検索インデックスに反映し、publish があればライブ配信にも流す
+        """
+        results: list[dict[str, Any]] = [{"index": i, "status": "failed"} for i in range(len(entries))]
+        items: list[tuple[int, dict[str, Any]]] = []
+        key_owner: dict[str, int] = {}  # idempotency_key -> 最初に出現したエントリ番号
+        duplicates_of: list[tuple[int, int]] = []
+        created_owner: dict[str, int] = {}
+        base = datetime.now(UTC)
+
+        for index, entry in enumerate(entries):
+            key = entry.get("idempotency_key")
+            if key:
+                if key in key_owner:
+                    duplicates_of.append((index, key_owner[key]))
+                    continue
+                written_at = self.idempotency.get(f"{groupid}#{key}")
+                if written_at is not None:
+                    results[index] = {"index": index, "status": "duplicate", "created_at": written_at}
+                    continue
+                key_owner[key] = index
+
+            try:
+                # クライアント指定の値も正規形に揃えてから、キー・集計・アーカイブの日付に使う
+                created_at = (
+                    normalize_created_at(entry["created_at"])
+                    if entry.get("created_at")
+                    else server_timestamp(base, index)
+                )
+            except ValueError:
+                results[index]["detail"] = "Invalid created_at"
+                continue
+            if created_at in created_owner:
+                results[index]["detail"] = f"created_at collides with entry {created_owner[created_at]}"
+                continue
+            created_owner[created_at] = index
+            items.append((index, build_log_item(groupid, entry, created_at)))
+
+        # アーカイブ・コンパクション済みの日に書き込んだログは読み出せないため、バッチごと受け付けない
+        sealed = self.logs_repo.sealed_before(groupid) if items else None
+        late = [index for index, item in items if sealed and item["created_at"] < sealed]
+        if late:
+            return ServiceResponse(
+                code=400,
+                data=None,
+                detail=f"created_at of entries {late} is before {sealed}, which is already archived",
+            )
+
+        # 別のワーカー（または再起動前）が予約済みのキーは、そのときの created_at で書き込み直す。
+        # 前回のログが書き込めていれば条件付き書き込みが衝突して duplicate になり、途中で止まっていればここで書き込む
+        keyed = {item["idempotency_key"]: item["created_at"] for _, item in items if item.get("idempotency_key")}
+        taken, unclaimed = self.idempotency_repo.claim(groupid, keyed) if keyed else ({}, set())
+        claimed: list[tuple[int, dict[str, Any]]] = []
+        for index, item in items:
+            key = item.get("idempotency_key")
+            if key in unclaimed:
+                results[index]["detail"] = "Write failed"
+                continue
+            if key in taken:
+                item = build_log_item(groupid, entries[index], taken[key])
+            claimed.append((index, item))
+
+        # 既存のログを上書きしうるエントリだけ条件付きで1件ずつ書き、サーバー採番のエントリは BatchWriteItem で書く
+        conditional: list[dict[str, Any]] = []
+        plain: list[dict[str, Any]] = []
+        for index, item in claimed:
+            (conditional if entries[index].get("created_at") or item.get("idempotency_key") else plain).append(item)
+        existing, failed = self.logs_repo.put_new_logs(conditional) if conditional else ([], [])
+        res = self.logs_repo.put_logs(plain) if plain else None
+        current = {item["created_at"]: item for item in existing}
+        unwritten = {item["created_at"] for item in failed + (res.data.items if res and res.data else [])}
+
+        written: list[dict[str, Any]] = []
+        released: list[str] = []
+        for index, item in claimed:
+            created_at = item["created_at"]
+            if created_at in unwritten:
+                results[index] = {
+                    "index": index,
+                    "status": "failed",
+                    "created_at": created_at,
+                    "detail": "Write failed",
+                }
+                if item.get("idempotency_key"):
+                    released.append(item["idempotency_key"])
+            elif created_at in current and not (item.get("idempotency_key") or same_log(current[created_at], item)):
+                results[index] = {
+                    "index": index,
+                    "status": "failed",
+                    "created_at": created_at,
+                    "detail": "A different log with the same created_at already exists",
+                }
+            elif created_at in current:
+                results[index] = {"index": index, "status": "duplicate", "created_at": created_at}
+            else:
+                results[index] = {"index": index, "status": "created", "created_at": created_at}
+                written.append(item)
+        for index, owner in duplicates_of:
+            if results[owner]["status"] == "created":
+                results[index] = {"index": index, "status": "duplicate", "created_at": results[owner]["created_at"]}
+            else:
+                results[index] = {**results[owner], "index": index}
+
+        if released:
+            self.idempotency_repo.release(groupid, released)
+        self.idempotency.set_many(
+            {
+                f"{groupid}#{item['idempotency_key']}": item["created_at"]
+                for index, item in claimed
+                if item.get("idempotency_key") and results[index]["status"] in ("created", "duplicate")
+            }
+        )
+        if written:
+            self._after_write(groupid, written, publish)
+
+        counts = Counter(result["status"] for result in results)
+        logger.info(f"Ingested logs for groupid={groupid}: {dict(counts)}")
+        return ServiceResponse(
+            code=200,
+            data=SingleItemData(
+                item={
+                    "created": counts["created"],
+                    "duplicates": counts["duplicate"],
+                    "failed": counts["failed"],
+                    "results": results,
+                }
+            ),
+            detail=None,
+        )
+
+    def _after_write(
+        self,
+        groupid: str,
+        written: list[dict[str, Any]],
+        publish: Callable[[str, list[dict[str, Any]]], None] | None,
+    ) -> None:
+        """書き込み後の派生データ更新。失敗してもログ自体は書き込み済みなので、警告だけ残す（backfill で復旧できる）。"""
+        stats = self.stats_service.record_logs(written)
+        if not stats.is_success:
+            logger.warning(f"Failed to update log stats for groupid={groupid}: {stats.detail}")
+        index = self.index_logs(written)
+        if not index.is_success:
+            logger.warning(f"Failed to index logs for groupid={groupid}: {index.detail}")
+        if publish:
+            publish(groupid, written)
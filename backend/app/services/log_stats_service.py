@@ -0,0 +1,105 @@
+# app/services/log_stats_service.py
+import logging
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+from app.models.common import MessageData, ServiceResponse, SingleItemData
+from app.repositories.logstats_repo import (
+    GRANULARITIES,
+    TOTAL_ATTR,
+    TYPE_PREFIX,
+    USER_PREFIX,
+    LogStatsTable,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _split_counters(item: dict[str, Any]) -> tuple[int, dict[str, int], dict[str, int]]:
+    """
+    バケットアイテムを (total, type別, userid別) に分解する。DynamoDB の数値は Decimal なので int にする。
+    userid 別は以前の形式（バケットのアイテムの user#{userid} 属性）の件数。
+    """
+    types: dict[str, int] = {}
+    users: dict[str, int] = {}
+    for attr, value in item.items():
+        if attr.startswith(TYPE_PREFIX):
+            types[attr[len(TYPE_PREFIX) :]] = int(value)
+        elif attr.startswith(USER_PREFIX):
+            users[attr[len(USER_PREFIX) :]] = int(value)
+    return int(item.get(TOTAL_ATTR, 0)), types, users
+
+
+class LogStatsService:
+    def __init__(self, stats_repo: LogStatsTable | None = None):
+        self.stats_repo = stats_repo or LogStatsTable()
+
+    def record_logs(self, items: Iterable[dict[str, Any]]) -> ServiceResponse[MessageData]:
+        """ログの書き込み時に呼び出し、集計テーブルのカウンタを加算する。"""
+        res = self.stats_repo.add_logs(items)
+        return ServiceResponse.of(res)
+
+    def get_stats(
+        self,
+        groupid: str,
+        granularity: str = "day",
+        begin: str | None = None,
+        end: str | None = None,
+        userid: str | None = None,
+        type_: str | None = None,
+    ) -> ServiceResponse[SingleItemData]:
+        """
+        集計テーブルのバケットだけを読んで、期間内のログ件数を集計する。
+
+        begin / end は UTC に揃えてからバケット単位に丸められる（端のバケットは全体が含まれる）。
+        userid / type_ を指定した場合は、そのカウンタの件数だけを total として返す。
+        カウンタは type と userid の組み合わせを持たないため、両方の同時指定はできない。
+        """
+        if granularity not in GRANULARITIES:
+            return ServiceResponse(code=400, data=None, detail=f"Invalid granularity: {granularity}")
+        if userid and type_:
+            return ServiceResponse(code=400, data=None, detail="userid and type cannot be combined")
+
+        try:
+            res = self.stats_repo.list_buckets(groupid, granularity, begin=begin, end=end)
+            # type で絞り込む場合は userid 別の件数を返さないため読まない
+            user_counts = [] if type_ else list(self.stats_repo.iter_user_counts(groupid, granularity, begin, end))
+        except ValueError:
+            return ServiceResponse(code=400, data=None, detail="Invalid begin or end")
+        if not res.is_success or res.data is None:
+            return ServiceResponse(code=res.code, data=None, detail=res.detail)
+
+        bucket_users: dict[str, Counter[str]] = defaultdict(Counter)
+        for bucket, user, count in user_counts:
+            bucket_users[bucket][user] += count
+
+        buckets = []
+        total_types: Counter[str] = Counter()
+        total_users: Counter[str] = Counter()
+        grand_total = 0
+        for item in res.data.items:
+            total, types, users = _split_counters(item)
+            users = dict(bucket_users[item["bucket"]] + Counter(users))
+            if userid:
+                total = users.get(userid, 0)
+                types, users = {}, {userid: total}
+            elif type_:
+                total = types.get(type_, 0)
+                types, users = {type_: total}, {}
+            if not total:
+                continue
+            grand_total += total
+            total_types.update(types)
+            total_users.update(users)
+            buckets.append({"bucket": item["bucket"], "total": total, "types": types, "users": users})
+
+        stats = {
+            "groupid": groupid,
+            "granularity": granularity,
+            "total": grand_total,
+            "types": dict(total_types),
+            "users": dict(total_users),
+            "buckets": buckets,
+        }
+        return ServiceResponse(code=200, data=SingleItemData(item=stats), detail=None)
@@ -0,0 +1,193 @@
+# app/services/log_stream_service.py
+"""
+ログのライブ配信（SSE 用）
+
+1ワーカー内の購読者をグループ単位でまとめ、グループごとに1つだけポーリングタスクを動かす。
+N 人が同じグループを購読していても、DynamoDB への Query は poll_interval ごとに1回で済む。
+
+- 購読者が0人になったグループのポーリングタスクは停止する
+- 同じワーカーでログを書き込んだ場合は publish() で即時に配信できる（ポーリングを待たない）
+- created_at を Last-Event-ID（watermark）として使い、再接続時は watermark より新しいログを
+  logs テーブルから読み直してから、ライブ配信に合流する
+- 購読者のキューがあふれた場合はその購読を打ち切る。クライアントは Last-Event-ID 付きで再接続すれば、
+  取りこぼした分を読み直せる
+
+created_at が watermark 以前の時刻で後から書き込まれたログ（時計のずれなど）は、ライブ配信には載らない。
+"""
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Iterable, Iterator
+from datetime import UTC, datetime
+from functools import lru_cache
+from typing import Any
+
+from app.repositories.dynamodb import datetime_to_created_at
+from app.repositories.log_repo import LogsTable
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 2.0
+HEARTBEAT_SECONDS = 15.0
+SUBSCRIBER_QUEUE_SIZE = 1000
+PAGE_SIZE = 100
+
+
+def current_watermark() -> str:
+    """
+    現在時刻を created_at と同じ正規形（マイクロ秒固定長）で返す。
+    秒に切り捨てると、購読した秒のうちに書き込まれたログが watermark より小さくなり配信されない。
+    """
+    return datetime_to_created_at(datetime.now(UTC))
+
+
+class Subscription:
+    def __init__(self, groupid: str) -> None:
+        self.groupid = groupid
+        self.queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = False
+
+    def offer(self, item: dict[str, Any]) -> bool:
+        """キューに積む。あふれた場合は購読を打ち切り False を返す。"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)  # 待機中の get() を起こす
+            return False
+
+
+class _Topic:
+    def __init__(self, groupid: str, watermark: str) -> None:
+        self.groupid = groupid
+        self.watermark = watermark
+        self.subscribers: set[Subscription] = set()
+        self.task: asyncio.Task[None] | None = None
+
+
+class LogStreamBroker:
+    """グループ単位の in-process pub/sub"""
+
+    def __init__(
+        self,
+        logs_repo: LogsTable | None = None,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        page_size: int = PAGE_SIZE,
+    ) -> None:
+        self.logs_repo = logs_repo or LogsTable()
+        self.poll_interval = poll_interval
+        self.page_size = page_size
+        self._topics: dict[str, _Topic] = {}
+
+    def subscriber_count(self, groupid: str) -> int:
+        topic = self._topics.get(groupid)
+        return len(topic.subscribers) if topic else 0
+
+    def subscribe(self, groupid: str) -> Subscription:
+        topic = self._topics.get(groupid)
+        if topic is None:
+            topic = _Topic(groupid, current_watermark())
+            self._topics[groupid] = topic
+        sub = Subscription(groupid)
+        topic.subscribers.add(sub)
+        if topic.task is None or topic.task.done():
+            topic.task = asyncio.get_running_loop().create_task(self._poll(topic))
+        logger.info(f"[stream] subscribe groupid={groupid} subscribers={len(topic.subscribers)}")
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        topic = self._topics.get(sub.groupid)
+        if topic is None:
+            return
+        topic.subscribers.discard(sub)
+        logger.info(f"[stream] unsubscribe groupid={sub.groupid} subscribers={len(topic.subscribers)}")
+        if not topic.subscribers:
+            if topic.task is not None:
+                topic.task.cancel()
+            del self._topics[sub.groupid]
+
+    def publish(self, groupid: str, items: Iterable[dict[str, Any]]) -> None:
+        """watermark より新しいログを購読者に配信し、watermark を進める。"""
+        topic = self._topics.get(groupid)
+        if topic is None:
+            return
+        fresh = sorted(
+            (item for item in items if item.get("created_at", "") > topic.watermark),
+            key=lambda item: item["created_at"],
+        )
+        if not fresh:
+            return
+        topic.watermark = fresh[-1]["created_at"]
+        for sub in list(topic.subscribers):
+            for item in fresh:
+                if not sub.offer(item):
+                    logger.warning(f"[stream] subscriber queue overflow, dropping groupid={groupid}")
+                    topic.subscribers.discard(sub)
+                    break
+
+    async def read_after(self, groupid: str, after: str) -> AsyncIterator[list[dict[str, Any]]]:
+        """after より新しいログを created_at 昇順にページ単位で読む（ブロッキング I/O はスレッドで実行）。"""
+        pages: Iterator[list[dict[str, Any]]] = self.logs_repo.iter_logs(
+            groupid=groupid, begin=after, page_size=self.page_size
+        )
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            items = [item for item in page if item.get("created_at", "") > after]
+            if items:
+                yield items
+
+    async def _poll(self, topic: _Topic) -> None:
+        while topic.subscribers:
+            try:
+                async for items in self.read_after(topic.groupid, topic.watermark):
+                    self.publish(topic.groupid, items)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"[stream] poll failed groupid={topic.groupid}")
+            await asyncio.sleep(self.poll_interval)
+
+
+@lru_cache(maxsize=1)
+def get_log_stream_broker() -> LogStreamBroker:
+    """ワーカー内で共有する broker（初回呼び出し時に生成する）"""
+    return LogStreamBroker()
+
+
+class LogStreamService:
+    def __init__(self, broker: LogStreamBroker | None = None, heartbeat: float = HEARTBEAT_SECONDS) -> None:
+        self.broker = broker or get_log_stream_broker()
+        self.heartbeat = heartbeat
+
+    async def stream_logs(self, groupid: str, last_event_id: str | None = None) -> AsyncIterator[dict[str, Any] | None]:
+        """
+        新しいログを created_at 昇順に返し続ける。heartbeat 秒間ログが無ければ None を返す。
+        last_event_id を指定した場合は、それより新しいログを読み直してからライブ配信に合流する。
+        """
+        # 先に購読しておき、読み直しとライブ配信の間に取りこぼしが出ないようにする（重複は sent で除く）
+        sub = self.broker.subscribe(groupid)
+        sent = last_event_id or ""
+        try:
+            if last_event_id:
+                async for items in self.broker.read_after(groupid, last_event_id):
+                    for item in items:
+                        sent = item["created_at"]
+                        yield item
+
+            while not sub.dropped:
+                try:
+                    queued = await asyncio.wait_for(sub.queue.get(), timeout=self.heartbeat)
+                except TimeoutError:
+                    yield None
+                    continue
+                if queued is None or queued["created_at"] <= sent:
+                    continue
+                sent = queued["created_at"]
+                yield queued
+        finally:
+            self.broker.unsubscribe(sub)
@@ -16,15 +16,15 @@ class UsersService:
         複数のユーザーIDからユーザー情報を取得する。
         """
         res = self.users_repo.batch_get_users_by_ids(user_ids)
-        return ServiceResponse(code=res.code, data=res.data, detail=res.detail)
+        return ServiceResponse.of(res)
 
     def get_user_by_id(self, userid: str) -> ServiceResponse[SingleItemData]:
         res = self.users_repo.get_user_by_id(userid)
-        return ServiceResponse(code=res.code, data=res.data, detail=res.detail)
+        return ServiceResponse.of(res)
 
     def batch_get_users_by_ids(self, userids: list[str]) -> ServiceResponse[ListItemData]:
         res = self.users_repo.batch_get_users_by_ids(userids)
-        return ServiceResponse(code=res.code, data=res.data, detail=res.detail)
+        return ServiceResponse.of(res)
 
     def list_users(self, limit: int = 25, startkey: dict[str, Any] | None = None) -> ServiceResponse[ListItemData]:
         res = self.users_repo.list_users(
@@ -43,22 +43,10 @@ class UsersService:
                 detail=res.detail,
             )
 
-        # res.data は ListItemData インスタンスなのでドットでアクセス
-        items = res.data.items
-        last_evaluated_key = res.data.last_evaluated_key
+        logger.info(f"Retrieved items count: {len(res.data.items)}")
 
-        logger.info(f"Retrieved items count: {len(items)}")
-
-        return ServiceResponse(
-            code=res.code,
-            data=ListItemData(
-                items=items,
-                last_evaluated_key=last_evaluated_key,
-                size=res.data.size,
-                count=res.data.count,
-            ),
-            detail=res.detail,
-        )
+        # res.data (ListItemData) はそのまま共有し、型だけ付け替える
+        return ServiceResponse.of(res)
 
     def create_user(self, user: dict[str, Any]) -> ServiceResponse[MessageData]:
         res = self.users_repo.create_user(user)
@@ -0,0 +1,42 @@
+# app/utils/log_codec.py
+"""
+ログのまとめ書き用のエンコーダ
+
+複数のログを、export_tables.py と同じ DynamoDB 形式の JSON Lines（created_at 昇順）にして gzip で圧縮する。
+DynamoDB 形式のため、数値（Decimal）やバイナリも読み戻した後に DynamoDB から読んだ場合と同じ型になる。
+S3 のアーカイブ（log_archive_repo.py）と、logchunks テーブルのチャンク（logchunk_repo.py）で使う。
+"""
+
+import gzip
+import json
+from typing import Any
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def encode_lines(items: list[dict[str, Any]]) -> list[bytes]:
+    """1ログ1行（改行付き）のバイト列にする。"""
+    return [
+        (json.dumps({k: serializer.serialize(v) for k, v in item.items()}, ensure_ascii=False) + "\n").encode("utf-8")
+        for item in sorted(items, key=lambda item: item["created_at"])
+    ]
+
+
+def compress_lines(lines: list[bytes]) -> bytes:
+    return gzip.compress(b"".join(lines))
+
+
+def encode_logs(items: list[dict[str, Any]]) -> bytes:
+    return compress_lines(encode_lines(items))
+
+
+def decode_line(line: str | bytes) -> dict[str, Any]:
+    """DynamoDB 形式の JSON 1行を、DynamoDB から読んだ場合と同じ型のアイテムに戻す。"""
+    return {k: deserializer.deserialize(v) for k, v in json.loads(line).items()}
+
+
+def decode_logs(body: bytes) -> list[dict[str, Any]]:
+    return [decode_line(line) for line in gzip.decompress(body).decode("utf-8").splitlines() if line]
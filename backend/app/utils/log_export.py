@@ -0,0 +1,72 @@
+# app/utils/log_export.py
+"""
+ログのエクスポート用エンコーダ
+
+DynamoDB から読んだページ（list[dict]）のイテレータを受け取り、NDJSON / CSV のバイト列を
+ページ単位で逐次生成する。全件を保持しないため、件数に関係なくメモリ使用量は1ページ分で一定。
+"""
+
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = ("groupid", "created_at", "userid", "username", "type", "message")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _to_json_value(value: Any) -> Any:
+    # DynamoDB の数値は Decimal で返るため文字列化する
+    return str(value)
+
+
+def encode_ndjson(pages: Iterable[list[dict[str, Any]]]) -> Iterator[bytes]:
+    """1行1ログの JSON Lines を生成する。"""
+    for page in pages:
+        if not page:
+            continue
+        lines = [
+            json.dumps({f: item.get(f) for f in EXPORT_FIELDS}, ensure_ascii=False, default=_to_json_value)
+            for item in page
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def encode_csv(pages: Iterable[list[dict[str, Any]]]) -> Iterator[bytes]:
+    """ヘッダ行付きの CSV を生成する。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for page in pages:
+        writer.writerows([item.get(f) for f in EXPORT_FIELDS] for item in page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        # ログが0件の場合もヘッダ行だけは返す
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """バイト列のストリームを gzip 形式で逐次圧縮する。"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def encode_logs(pages: Iterable[list[dict[str, Any]]], fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """指定フォーマットでエンコードし、必要に応じて gzip 圧縮する。"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    stream = encode_ndjson(pages) if fmt == "ndjson" else encode_csv(pages)
+    return gzip_stream(stream) if gzip else stream
@@ -0,0 +1,49 @@
+# app/utils/tokenizer.py
+"""
+ログ検索用の簡易トークナイザ
+
+形態素解析器に依存せず、日本語と英数字の混在したメッセージを転置インデックス用の語に分割する。
+
+- NFKC 正規化（全角英数字→半角、半角カナ→全角）と小文字化を行う
+- 英数字の連続はそのまま1語とする                 例) "Deleted file42.txt" → "deleted", "file42", "txt"
+- 日本語（ひらがな・カタカナ・漢字）の連続は文字 bi-gram に分割する
+                                                    例) "ファイルを削除" → "ファ", "ァイ", ..., "削除"
+  1文字だけの連続はその1文字を語とする
+- それ以外の文字（空白・記号）は区切りとして扱う
+
+転置インデックスに登録する語（index_terms）には、日本語の各文字も1文字の語として加える。
+1文字のクエリ（例: "削"）は bi-gram に分割できないため、その1文字の posting list で検索する。
+"""
+
+import re
+import unicodedata
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+|[\u3040-\u309f\u30a0-\u30ff\u3400-\u4dbf\u4e00-\u9fff]+")
+_ASCII_PATTERN = re.compile(r"[a-z0-9_]+")
+
+MAX_TERM_LENGTH = 64
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text: str | None, unigrams: bool = False) -> list[str]:
+    """テキストを語に分割し、出現順・重複なしで返す。unigrams=True の場合は日本語の各文字も語に加える。"""
+    if not text:
+        return []
+    terms: dict[str, None] = {}
+    for run in _TOKEN_PATTERN.findall(normalize(text)):
+        if _ASCII_PATTERN.fullmatch(run):
+            terms[run[:MAX_TERM_LENGTH]] = None
+            continue
+        for i in range(max(len(run) - 1, 1)):
+            terms[run[i : i + 2]] = None
+        if unigrams:
+            terms.update(dict.fromkeys(run))
+    return list(terms)
+
+
+def index_terms(text: str | None) -> list[str]:
+    """転置インデックスに登録する語（1文字のクエリにも一致するよう、日本語の各文字を含む）"""
+    return tokenize(text, unigrams=True)
@@ -0,0 +1,67 @@
+# app/utils/ttl_cache.py
+"""
+プロセス内 TTL 付き LRU キャッシュ
+
+Lambda のコンテナや uvicorn のワーカー内で、DynamoDB から読んだ値を短時間だけ使い回すためのもの。
+プロセス間では共有されないため、整合性が厳密に必要な値には使用しないこと。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Any
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys: Iterable[Hashable]) -> dict[Hashable, Any]:
+        """キャッシュに存在する（期限内の）キーだけを dict で返す。"""
+        missing = object()
+        found = {}
+        for key in keys:
+            value = self.get(key, missing)
+            if value is not missing:
+                found[key] = value
+        return found
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_many(self, mapping: dict[Hashable, Any], ttl: float | None = None) -> None:
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -1,4 +1,99 @@
-from app.main import app
-from mangum import Mangum
+"""
+Lambda エントリポイント
 
-handler = Mangum(app)
+通常の API Gateway イベントは Mangum 経由で FastAPI に渡す。
+EventBridge のスケジュール実行などによるウォームアップ（keep-alive）イベントは
+ASGI スコープを組み立てずにここで即座に応答し、アクセスログ等のミドルウェアを通さない。
+
+ウォームアップイベントの例:
+    {"warmup": true}
+    {"warmup": true, "touch_dynamodb": true}
+    EventBridge Scheduled Event ({"source": "aws.events", "detail-type": "Scheduled Event", ...})
+"""
+
+import time
+
+_INIT_STARTED_AT = time.perf_counter()
+
+import json  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+from typing import Any  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.repositories.dynamodb import get_item  # noqa: E402
+from mangum import Mangum  # noqa: E402
+
+logger = logging.getLogger("lambda")
+logger.setLevel(logging.INFO)
+
+asgi_handler = Mangum(app)
+
+# コールドスタート時の初期化（import + アプリ構築）に掛かった時間
+INIT_DURATION_MS = (time.perf_counter() - _INIT_STARTED_AT) * 1000
+
+WARMUP_SOURCES = ("aws.events", "serverless-plugin-warmup")
+
+# 接続を温めるために読むテーブルと、存在しない前提のダミーキー
+WARMUP_TABLE_KEYS: dict[str, dict[str, str]] = {
+    "users": {"userid": "__warmup__"},
+    "groups": {"groupid": "__warmup__"},
+    "logs": {"groupid": "__warmup__", "created_at": "__warmup__"},
+}
+
+_is_cold_start = True
+
+
+def is_warmup_event(event: Any) -> bool:
+    """ウォームアップ（keep-alive）イベントかどうかを判定する。HTTP イベントは対象外。"""
+    if not isinstance(event, dict):
+        return False
+    if "httpMethod" in event or "requestContext" in event:
+        return False
+    if event.get("warmup") or event.get("keepalive"):
+        return True
+    return event.get("source") in WARMUP_SOURCES
+
+
+def touch_dynamodb() -> dict[str, int]:
+    """各テーブルへ軽量な get_item を発行し、DynamoDB への接続を確立しておく。"""
+    results: dict[str, int] = {}
+    for table_name, key in WARMUP_TABLE_KEYS.items():
+        try:
+            results[table_name] = get_item(table_name, key).code
+        except Exception as e:
+            logger.warning(f"[warmup] DynamoDB touch failed: table={table_name} error={e!r}")
+            results[table_name] = 500
+    return results
+
+
+def should_touch_dynamodb(event: dict[str, Any]) -> bool:
+    if "touch_dynamodb" in event:
+        return bool(event["touch_dynamodb"])
+    return os.getenv("WARMUP_TOUCH_DYNAMODB", "false").lower() == "true"
+
+
+def handle_warmup(event: dict[str, Any]) -> dict[str, Any]:
+    body: dict[str, Any] = {"warm": True, "cold_start": _is_cold_start}
+    if should_touch_dynamodb(event):
+        body["dynamodb"] = touch_dynamodb()
+    return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(body)}
+
+
+def handler(event: Any, context: Any) -> Any:
+    global _is_cold_start
+
+    started_at = time.perf_counter()
+    warmup = is_warmup_event(event)
+    try:
+        if warmup:
+            return handle_warmup(event)
+        return asgi_handler(event, context)
+    finally:
+        invoke_ms = (time.perf_counter() - started_at) * 1000
+        init_ms = INIT_DURATION_MS if _is_cold_start else 0.0
+        logger.info(
+            f"[lambda] {'warmup' if warmup else 'request'} cold_start={_is_cold_start} "
+            f"init={init_ms:.1f}ms invoke={invoke_ms:.1f}ms"
+        )
+        _is_cold_start = False
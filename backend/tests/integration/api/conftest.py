@@ -96,7 +96,7 @@ def make_sample_groups(groups_table):
             item = {
                 "groupid": group_id,
                 "groupname": f"テストグループ {group_id}",
-                "permissions": ["list_logs", "view_logs", "read_group", "get_members"],
+                "permissions": ["list_logs", "view_logs", "read_group", "get_members", "write_logs"],
                 "users": group_members[group_id],
             }
             items.append(item)
@@ -72,7 +72,8 @@ def test_get_group_members_success():
     data = response.json()
     logger.info(data)
     assert "Items" in data
-    assert len(data["Items"]) == 4
+    assert len(data["Items"]) == 5
+    assert all(item["username"] for item in data["Items"])
 
 
 def test_get_group_members_not_found():
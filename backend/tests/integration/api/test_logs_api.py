@@ -1,6 +1,7 @@
 import base64
 import json
 import logging
+import uuid
 
 import boto3
 import pytest
@@ -144,3 +145,137 @@ def test_list_logs_invalid_startkey(make_sample_logs, make_sample_groups):
     )
     assert response.status_code == 400
     assert response.json()["detail"] == "Invalid startkey format"
+
+
+def test_export_logs_ndjson(make_sample_logs, make_sample_groups):
+    """
+    NDJSON 形式で、LastEvaluatedKey を辿らずに全件を1リクエストでエクスポートできる
+    """
+    make_sample_groups()
+    make_sample_logs(count=30)
+
+    response = client.get(
+        "/groups/test-group1/logs/export",
+        params={"format": "ndjson"},
+        headers={"Authorization": make_dummy_jwt("test-admin@example.com")},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert len(lines) >= 30
+    assert all(line["groupid"] == "test-group1" for line in lines)
+    assert [line["created_at"] for line in lines] == sorted(line["created_at"] for line in lines)
+
+
+def test_export_logs_csv_with_filter_type(make_sample_logs, make_sample_groups):
+    """
+    CSV 形式でも type フィルターが効き、先頭行はヘッダになる
+    """
+    make_sample_groups()
+    make_sample_logs(count=10)
+
+    response = client.get(
+        "/groups/test-group1/logs/export",
+        params={"format": "csv", "type": "Login"},
+        headers={"Authorization": make_dummy_jwt("test-admin@example.com")},
+    )
+    assert response.status_code == 200
+    rows = response.text.splitlines()
+    assert rows[0] == "groupid,created_at,userid,username,type,message"
+    assert all(",Login," in row for row in rows[1:])
+
+
+def test_ingest_logs_batch(make_sample_groups, logs_table):
+    """
+    一括書き込みでは created_at と GSI 用の複合属性がサーバー側で付与され、
+    同じ idempotency_key のエントリは1度だけ書き込まれる
+    """
+    make_sample_groups()
+    key = f"batch-{uuid.uuid4().hex}"
+    body = {
+        "entries": [
+            {"userid": "test-user1@example.com", "type": "Login", "message": "batch 1", "idempotency_key": key},
+            {"userid": "test-user1@example.com", "type": "Login", "message": "batch 1", "idempotency_key": key},
+            {"userid": "test-user4@example.com", "type": "Logout", "message": "batch 2"},
+        ]
+    }
+
+    response = client.post(
+        "/groups/test-group1/logs:batch",
+        json=body,
+        headers={"Authorization": make_dummy_jwt("test-admin@example.com")},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["duplicates"], result["failed"]) == (2, 1, 0)
+    assert [r["status"] for r in result["results"]] == ["created", "duplicate", "created"]
+    assert result["results"][1]["created_at"] == result["results"][0]["created_at"]
+
+    item = logs_table.get_item(Key={"groupid": "test-group1", "created_at": result["results"][2]["created_at"]})["Item"]
+    assert item["groupid#type"] == "test-group1#Logout"
+    assert item["groupid#userid"] == "test-group1#test-user4@example.com"
+
+    for r in result["results"][::2]:
+        logs_table.delete_item(Key={"groupid": "test-group1", "created_at": r["created_at"]})
+
+
+def test_ingest_logs_normalizes_created_at(make_sample_groups, logs_table):
+    """
+    一括書き込みでは created_at を UTC・マイクロ秒固定長の形式に揃えて保存し、
+    揃えた結果が同じになるエントリは衝突として書き込まない
+    """
+    make_sample_groups()
+    body = {
+        "entries": [
+            {"created_at": "2024-01-02T09:00:00+09:00", "message": "offset"},
+            {"created_at": "2024-01-02T00:00:00Z", "message": "same instant"},
+            {"created_at": "2024-01-03", "message": "date only"},
+            {"message": "server 1"},
+            {"message": "server 2"},
+        ]
+    }
+
+    response = client.post(
+        "/groups/test-group1/logs:batch",
+        json=body,
+        headers={"Authorization": make_dummy_jwt("test-admin@example.com")},
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["created", "failed", "created", "created", "created"]
+    assert results[0]["created_at"] == "2024-01-02T00:00:00.000000Z"
+    assert results[2]["created_at"] == "2024-01-03T00:00:00.000000Z"
+    assert results[3]["created_at"] < results[4]["created_at"]
+    assert len({len(r["created_at"]) for r in results if r["status"] == "created"}) == 1
+    assert logs_table.get_item(Key={"groupid": "test-group1", "created_at": results[0]["created_at"]})["Item"]
+
+    for r in results:
+        if r["status"] == "created":
+            logs_table.delete_item(Key={"groupid": "test-group1", "created_at": r["created_at"]})
+
+
+def test_list_timeline_merges_groups(make_sample_logs, make_sample_groups):
+    """
+    複数グループのログが新しい順に1本にまとまり、複合カーソルで重複なく続きを読める
+    """
+    make_sample_groups()
+    make_sample_logs(count=8)
+    headers = {"Authorization": make_dummy_jwt("test-admin@example.com")}
+
+    seen = []
+    startkey = None
+    while True:
+        params = {"groupids": "test-group1,test-group2", "limit": 5}
+        if startkey:
+            params["startkey"] = json.dumps(startkey)
+        response = client.get("/logs", params=params, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        seen.extend((item["groupid"], item["created_at"]) for item in body["Items"])
+        startkey = body["LastEvaluatedKey"]
+        if not startkey:
+            break
+
+    assert {groupid for groupid, _ in seen} == {"test-group1", "test-group2"}
+    assert len(seen) == len(set(seen))
+    assert [created_at for _, created_at in seen] == sorted((created_at for _, created_at in seen), reverse=True)
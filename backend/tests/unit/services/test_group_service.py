@@ -93,6 +93,81 @@ class TestGetGroupMembers:
         assert result.data.item["users"] == []
 
 
+class TestListGroupMembers:
+    """list_group_members メソッドのテスト"""
+
+    def test_hydrates_usernames_from_users_table(
+        self,
+        group_service: GroupService,
+        create_test_group: Any,
+        create_test_users: Any,
+        sample_group: dict[str, Any],
+        sample_users: list[dict[str, Any]],
+    ) -> None:
+        """ユーザー名は users テーブルの値で補完される"""
+        create_test_users(sample_users)
+        create_test_group(sample_group)
+
+        result = group_service.list_group_members(sample_group["groupid"])
+
+        assert result.is_success
+        assert result.data is not None
+        assert [m["userid"] for m in result.data.items] == sorted(sample_group["users"])
+        assert result.data.items[0]["username"] == "Test User 1"
+        assert result.data.last_evaluated_key is None
+
+    def test_paginates_with_startkey(
+        self,
+        group_service: GroupService,
+        create_test_group: Any,
+        create_test_users: Any,
+        sample_users: list[dict[str, Any]],
+    ) -> None:
+        """limit と LastEvaluatedKey でページングできる"""
+        create_test_users(sample_users)
+        group = {
+            "groupid": "paged-group",
+            "groupname": "Paged Group",
+            "users": [u["userid"] for u in sample_users],
+        }
+        create_test_group(group)
+
+        first = group_service.list_group_members("paged-group", limit=2, sort="username", order="desc")
+        assert first.data is not None
+        assert first.data.last_evaluated_key is not None
+        second = group_service.list_group_members(
+            "paged-group", limit=10, startkey=first.data.last_evaluated_key, sort="username", order="desc"
+        )
+        assert second.data is not None
+
+        usernames = [m["username"] for m in first.data.items + second.data.items]
+        assert usernames == sorted((u["username"] for u in sample_users), reverse=True)
+        assert second.data.last_evaluated_key is None
+
+    def test_returns_400_for_malformed_startkey(self, group_service: GroupService) -> None:
+        """JSON としては正しくても、並べ替えのキーを持たない startkey は 400"""
+        cases: list[tuple[Any, str]] = [
+            (["user1@example.com"], "userid"),
+            ({"username": "Test User 1"}, "userid"),
+            ({"userid": "user1@example.com"}, "username"),
+        ]
+        for startkey, sort in cases:
+            result = group_service.list_group_members("paged-group", startkey=startkey, sort=sort)
+
+            assert result.code == 400
+            assert result.detail == "Invalid startkey format"
+
+    def test_returns_404_when_group_not_exists(
+        self,
+        group_service: GroupService,
+    ) -> None:
+        """存在しないグループの場合は 404"""
+        result = group_service.list_group_members("nonexistent-group")
+
+        assert result.code == 404
+        assert result.data is None
+
+
 class TestMultipleGroups:
     """複数グループのテスト"""
 
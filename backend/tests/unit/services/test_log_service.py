@@ -5,11 +5,20 @@ LogsService のテスト
 LocalStack (デフォルト) または AWS DynamoDB を使用してテストを実行します。
 """
 
+import json
+import uuid
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 import pytest
+from app.repositories.dynamodb import get_table
+from app.repositories.log_archive_repo import LogArchive, day_cache, index_cache
+from app.repositories.log_keys import LogKeyScheme
 from app.repositories.log_repo import LogsTable
+from app.repositories.logchunk_repo import LogChunkTable, meta_cache
 from app.services.log_service import LogsService
+from app.utils.ttl_cache import TTLCache
+from boto3.dynamodb.conditions import Key
 
 
 @pytest.fixture
@@ -91,6 +100,26 @@ class TestListLogs:
             assert log["created_at"] >= "2024-01-01T00:00:03Z"
             assert log["created_at"] <= "2024-01-01T00:00:07Z"
 
+    def test_accepts_long_range_with_mixed_timezones(
+        self,
+        logs_service: LogsService,
+        create_test_logs: Any,
+        sample_logs: list[dict[str, Any]],
+    ) -> None:
+        """日付のみ・オフセット付きの begin / end が混在する長い期間でも、期間分割して読める"""
+        create_test_logs(sample_logs)
+
+        result = logs_service.list_logs(
+            groupid="test-group-1",
+            begin="2023-12-01",
+            end="2024-02-01T09:00:00+09:00",
+            limit=200,
+        )
+
+        assert result.is_success
+        assert result.data is not None
+        assert len(result.data.items) == len(sample_logs)
+
 
 class TestListLogsWithFilters:
     """フィルタ付きの list_logs メソッドのテスト"""
@@ -154,3 +183,461 @@ class TestListLogsWithFilters:
         assert result.data is not None
         for log in result.data.items:
             assert log["type"] == "Login"
+
+
+class TestSearchLogs:
+    """search_logs メソッドのテスト（logindex テーブルが必要）"""
+
+    @pytest.fixture
+    def search_logs(self, logs_service: LogsService, create_test_logs: Any) -> list[dict[str, Any]]:
+        logs = [
+            {
+                "groupid": "search-test-group",
+                "created_at": f"2024-01-01T00:00:0{i}Z",
+                "userid": "user@example.com",
+                "username": "User",
+                "type": "DELETE" if i % 2 == 0 else "CREATE",
+                "message": f"report{i}.csv を{'削除' if i % 2 == 0 else '作成'}しました",
+            }
+            for i in range(6)
+        ]
+        create_test_logs(logs)
+        assert logs_service.index_logs(logs).is_success
+        return logs
+
+    def test_matches_all_terms(self, logs_service: LogsService, search_logs: list[dict[str, Any]]) -> None:
+        """日本語と英数字の語を AND で検索できる"""
+        result = logs_service.search_logs(groupid="search-test-group", q="削除 report2")
+
+        assert result.is_success
+        assert result.data is not None
+        assert [log["created_at"] for log in result.data.items] == ["2024-01-01T00:00:02Z"]
+
+    def test_paginates_in_created_at_order(self, logs_service: LogsService, search_logs: list[dict[str, Any]]) -> None:
+        """startkey で続きのページを取得できる"""
+        first = logs_service.search_logs(groupid="search-test-group", q="削除", limit=2)
+        assert first.data is not None
+        assert [log["created_at"] for log in first.data.items] == ["2024-01-01T00:00:00Z", "2024-01-01T00:00:02Z"]
+        assert first.data.last_evaluated_key is not None
+
+        second = logs_service.search_logs(
+            groupid="search-test-group", q="削除", limit=2, startkey=first.data.last_evaluated_key
+        )
+        assert second.data is not None
+        assert [log["created_at"] for log in second.data.items] == ["2024-01-01T00:00:04Z"]
+        assert second.data.last_evaluated_key is None
+
+    def test_matches_single_character_query(self, logs_service: LogsService, search_logs: list[dict[str, Any]]) -> None:
+        """1文字の日本語クエリでも、その文字を含む複数文字の語に一致する"""
+        result = logs_service.search_logs(groupid="search-test-group", q="削")
+
+        assert result.is_success
+        assert result.data is not None
+        assert [log["created_at"] for log in result.data.items] == [
+            "2024-01-01T00:00:00Z",
+            "2024-01-01T00:00:02Z",
+            "2024-01-01T00:00:04Z",
+        ]
+
+    def test_rejects_query_without_terms(self, logs_service: LogsService) -> None:
+        """検索できる語が無いクエリは 400"""
+        result = logs_service.search_logs(groupid="search-test-group", q="!? ")
+
+        assert result.code == 400
+
+
+class TestListTimeline:
+    """list_timeline メソッドのテスト"""
+
+    def test_returns_400_for_malformed_startkey(self, logs_service: LogsService) -> None:
+        """JSON としては正しくても、複合カーソルの形でない startkey は 400"""
+        cases: list[Any] = [
+            ["test-group-1"],
+            {"positions": ["test-group-1"]},
+            {"positions": {"test-group-1": "2024-01-01T00:00:00Z"}},
+            {"done": "test-group-1"},
+        ]
+        for startkey in cases:
+            result = logs_service.list_timeline(groupids=["test-group-1"], startkey=startkey)
+
+            assert result.code == 400
+            assert result.detail == "Invalid startkey format"
+
+
+class TestIngestLogs:
+    """ingest_logs メソッドのテスト（logidempotency テーブルが必要）"""
+
+    @pytest.fixture
+    def cleanup(self) -> Any:
+        yield
+        table = get_table("logs")
+        for item in table.query(KeyConditionExpression=Key("groupid").eq("ingest-test-group"))["Items"]:
+            table.delete_item(Key={"groupid": item["groupid"], "created_at": item["created_at"]})
+
+    def test_retry_on_another_worker_is_duplicate(self, cleanup: Any) -> None:
+        """キャッシュを共有しない別のワーカーへのリトライでも、同じ created_at の duplicate になり派生データを更新しない"""
+        entries = [
+            {"message": "keyed", "idempotency_key": f"retry-{uuid.uuid4().hex}"},
+            {"created_at": "2024-02-01T09:00:00+09:00", "message": "stamped"},
+        ]
+        published: list[dict[str, Any]] = []
+
+        def publish(_groupid: str, items: list[dict[str, Any]]) -> None:
+            published.extend(items)
+
+        first = LogsService(idempotency=TTLCache()).ingest_logs("ingest-test-group", entries, publish=publish)
+        retry = LogsService(idempotency=TTLCache()).ingest_logs("ingest-test-group", entries, publish=publish)
+
+        assert first.data is not None and retry.data is not None
+        assert [r["status"] for r in first.data.item["results"]] == ["created", "created"]
+        assert [r["status"] for r in retry.data.item["results"]] == ["duplicate", "duplicate"]
+        assert [r["created_at"] for r in retry.data.item["results"]] == [
+            r["created_at"] for r in first.data.item["results"]
+        ]
+        assert len(published) == 2
+
+    def test_does_not_overwrite_a_different_log(self, cleanup: Any) -> None:
+        """クライアント指定の created_at が別の内容の既存ログと同じ場合は、上書きせずに failed を返す"""
+        service = LogsService(idempotency=TTLCache())
+        service.ingest_logs("ingest-test-group", [{"created_at": "2024-02-02T00:00:00Z", "message": "original"}])
+
+        result = service.ingest_logs("ingest-test-group", [{"created_at": "2024-02-02T00:00:00Z", "message": "other"}])
+
+        assert result.data is not None
+        assert result.data.item["results"][0]["status"] == "failed"
+        item = get_table("logs").get_item(
+            Key={"groupid": "ingest-test-group", "created_at": "2024-02-02T00:00:00.000000Z"}
+        )["Item"]
+        assert item["message"] == "original"
+
+
+class TestListLogsOrder:
+    """order / direction / 先頭ページキャッシュのテスト"""
+
+    @pytest.fixture
+    def order_logs(self, create_test_logs: Any) -> list[dict[str, Any]]:
+        logs = [
+            {
+                "groupid": "order-test-group",
+                "created_at": f"2024-01-01T00:00:0{i}Z",
+                "userid": "user@example.com",
+                "username": "User",
+                "type": "Login",
+                "message": f"Message {i}",
+            }
+            for i in range(7)
+        ]
+        return create_test_logs(logs)
+
+    def test_desc_pages_forward_and_back(self, order_logs: list[dict[str, Any]]) -> None:
+        """新しい順で次のページへ進み、prev_key で前のページへ戻れる"""
+        service = LogsService(head_cache=TTLCache())
+
+        first = service.list_logs(groupid="order-test-group", limit=3, order="desc")
+        assert first.data is not None
+        assert [log["created_at"][-3:-1] for log in first.data.items] == ["06", "05", "04"]
+        assert first.data.prev_key is None
+
+        second = service.list_logs(
+            groupid="order-test-group", limit=3, order="desc", startkey=first.data.last_evaluated_key
+        )
+        assert second.data is not None
+        assert [log["created_at"][-3:-1] for log in second.data.items] == ["03", "02", "01"]
+
+        back = service.list_logs(
+            groupid="order-test-group", limit=3, order="desc", startkey=second.data.prev_key, direction="prev"
+        )
+        assert back.data is not None
+        assert back.data.items == first.data.items
+        assert back.data.prev_key is None
+
+    def test_head_page_picks_up_new_logs(self, order_logs: list[dict[str, Any]], create_test_logs: Any) -> None:
+        """キャッシュ済みの先頭ページにも、後から書き込まれたログが反映される"""
+        service = LogsService(head_cache=TTLCache())
+        service.list_logs(groupid="order-test-group", limit=3, order="desc")
+
+        create_test_logs([{**order_logs[0], "created_at": "2024-01-01T00:00:09Z"}])
+        result = service.list_logs(groupid="order-test-group", limit=3, order="desc")
+
+        assert result.data is not None
+        assert [log["created_at"][-3:-1] for log in result.data.items] == ["09", "06", "05"]
+        assert result.data.last_evaluated_key is not None
+
+    def test_head_page_stays_full_with_limit_minus_one_new_logs(
+        self, order_logs: list[dict[str, Any]], create_test_logs: Any
+    ) -> None:
+        """新着が limit - 1 件でも、キャッシュ済みの先頭ページと合わせて limit 件を返す"""
+        service = LogsService(head_cache=TTLCache())
+        service.list_logs(groupid="order-test-group", limit=3, order="desc")
+
+        create_test_logs([{**order_logs[0], "created_at": f"2024-01-01T00:00:0{i}Z"} for i in (7, 8)])
+        result = service.list_logs(groupid="order-test-group", limit=3, order="desc")
+
+        assert result.data is not None
+        assert [log["created_at"][-3:-1] for log in result.data.items] == ["08", "07", "06"]
+
+
+class TestListLogsLongRange:
+    """期間を分割した並列読み出しのテスト"""
+
+    @pytest.fixture
+    def spread_logs(self, create_test_logs: Any) -> list[dict[str, Any]]:
+        logs = [
+            {
+                "groupid": "range-test-group",
+                "created_at": f"2024-01-{day:02d}T12:00:00Z",
+                "userid": "user@example.com",
+                "username": "User",
+                "type": "Login",
+                "message": f"Message {day}",
+            }
+            for day in range(1, 31)
+        ]
+        return create_test_logs(logs)
+
+    def test_returns_whole_range_in_order(self, logs_service: LogsService, spread_logs: list[dict[str, Any]]) -> None:
+        """部分範囲に分けても、created_at 順に重複なく返す"""
+        for order in ("asc", "desc"):
+            result = logs_service.list_logs(
+                groupid="range-test-group",
+                limit=200,
+                begin="2024-01-01T00:00:00Z",
+                end="2024-01-31T00:00:00Z",
+                order=order,
+            )
+            assert result.data is not None
+            expected = sorted((log["created_at"] for log in spread_logs), reverse=order == "desc")
+            assert [log["created_at"] for log in result.data.items] == expected
+            assert result.data.last_evaluated_key is None
+
+    def test_resumes_from_startkey(self, logs_repo: LogsTable, spread_logs: list[dict[str, Any]]) -> None:
+        """途中で止めても、最後に返したアイテムのキーから続きを読める"""
+        stream = logs_repo.iter_logs_parallel(
+            groupid="range-test-group", begin="2024-01-01T00:00:00Z", end="2024-01-31T00:00:00Z"
+        )
+        head = [next(stream) for _ in range(11)]
+        stream.close()
+
+        startkey = LogsTable.key_of(head[-1])
+        rest = list(
+            logs_repo.iter_logs_parallel(
+                groupid="range-test-group", begin="2024-01-01T00:00:00Z", end="2024-01-31T00:00:00Z", startkey=startkey
+            )
+        )
+
+        assert [log["created_at"] for log in head + rest] == sorted(log["created_at"] for log in spread_logs)
+
+
+class TestListLogsBucketed:
+    """時間バケット / シャード付きのキー（log_keys.py）で保存したログの読み出しテスト"""
+
+    def test_reads_bucketed_and_legacy_logs_in_order(self, create_test_logs: Any) -> None:
+        """接尾辞付きと接尾辞なし（移行前）のログを、created_at 順にまとめてページングできる"""
+        scheme = LogKeyScheme(bucket="day", shards=3)
+        logs = [
+            {
+                "groupid": "bucket-test-group",
+                "created_at": f"2024-01-{day:02d}T{hour:02d}:00:00Z",
+                "userid": "user@example.com",
+                "type": "Login",
+                "message": f"Message {day} {hour}",
+            }
+            for day in range(1, 6)
+            for hour in (0, 9, 18)
+        ]
+        create_test_logs([scheme.encode_item(log) if i % 2 else log for i, log in enumerate(logs)])
+        logs_repo = LogsTable(key_scheme=scheme)
+
+        for order in ("asc", "desc"):
+            items: list[dict[str, Any]] = []
+            startkey = None
+            while True:
+                result = logs_repo.list_logs(
+                    groupid="bucket-test-group", limit=4, startkey=startkey, end="2024-01-06T00:00:00Z", order=order
+                )
+                assert result.data is not None
+                items += result.data.items
+                startkey = result.data.last_evaluated_key
+                if not startkey:
+                    break
+
+            expected = sorted((log["created_at"] for log in logs), reverse=order == "desc")
+            assert [log["created_at"] for log in items] == expected
+            assert {log["groupid"] for log in items} == {"bucket-test-group"}
+
+    def test_reads_from_oldest_written_day_without_begin(self) -> None:
+        """begin を指定しない場合、書き込み時に記録した最も古いログの日から読む"""
+        scheme = LogKeyScheme(bucket="month", shards=2, legacy_read=False)
+        groupid = f"bucket-oldest-{uuid.uuid4().hex}"
+        logs = [
+            {"groupid": groupid, "created_at": created_at, "userid": "user@example.com", "type": "Login"}
+            for created_at in ("2023-06-01T00:00:00Z", "2024-03-01T00:00:00Z", "2024-03-02T00:00:00Z")
+        ]
+        logs_repo = LogsTable(key_scheme=scheme)
+        try:
+            result = logs_repo.put_logs(logs)
+            assert result.data is not None and result.data.items == []
+
+            for order in ("asc", "desc"):
+                listed = logs_repo.list_logs(groupid=groupid, limit=10, end="2024-03-03T00:00:00Z", order=order)
+                assert listed.data is not None
+                expected = sorted((log["created_at"] for log in logs), reverse=order == "desc")
+                assert [log["created_at"] for log in listed.data.items] == expected
+        finally:
+            table = get_table("logs")
+            for log in logs:
+                table.delete_item(Key=scheme.encode_key(groupid, log["created_at"]))
+            get_table("logbuckets").delete_item(Key={"groupid": groupid})
+
+
+class TestListLogsArchived:
+    """保持期間を過ぎて S3 にアーカイブしたログの読み出しテスト"""
+
+    @pytest.fixture
+    def archive(self) -> Any:
+        archive = LogArchive(retention_days=3)
+        yield archive
+        for key in [archive.index_key("archive-test-group")] + [
+            archive.day_key("archive-test-group", day) for day in self.archived_days()
+        ]:
+            archive.s3.delete_object(Bucket=archive.bucket, Key=key)
+        index_cache.clear()
+        day_cache.clear()
+
+    @staticmethod
+    def archived_days() -> list[str]:
+        today = datetime.now(UTC).date()
+        return [(today - timedelta(days=n)).isoformat() for n in (10, 9, 8)]
+
+    def test_continues_into_archive(self, archive: LogArchive, create_test_logs: Any) -> None:
+        """begin がホット層より前の場合は、アーカイブと logs テーブルを1つの並びとしてページングできる"""
+
+        def log(created_at: str) -> dict[str, Any]:
+            return {"groupid": "archive-test-group", "created_at": created_at, "message": created_at}
+
+        cold = [log(f"{day}T{hour:02d}:00:00Z") for day in self.archived_days() for hour in (1, 13)]
+        for day in self.archived_days():
+            archive.write_day("archive-test-group", day, [item for item in cold if item["created_at"].startswith(day)])
+        archive.write_index(
+            "archive-test-group",
+            {"archived_through": self.archived_days()[-1], "days": dict.fromkeys(self.archived_days(), 2)},
+        )
+        yesterday = (datetime.now(UTC).date() - timedelta(days=1)).isoformat()
+        hot = create_test_logs([log(f"{yesterday}T{hour:02d}:00:00Z") for hour in (1, 5, 9)])
+        logs_repo = LogsTable(archive=archive)
+
+        for order in ("asc", "desc"):
+            items: list[dict[str, Any]] = []
+            startkey = None
+            while True:
+                result = logs_repo.list_logs(
+                    groupid="archive-test-group", limit=4, startkey=startkey, begin="2000-01-01T00:00:00Z", order=order
+                )
+                assert result.data is not None
+                items += result.data.items
+                startkey = result.data.last_evaluated_key
+                if not startkey:
+                    break
+
+            expected = sorted((item["created_at"] for item in cold + hot), reverse=order == "desc")
+            assert [item["created_at"] for item in items] == expected
+
+    def test_rejects_writes_into_archived_days(self, archive: LogArchive) -> None:
+        """アーカイブ済みの日の created_at を含むバッチは、読み出せなくなるため何も書き込まずに 400 を返す"""
+        archive.write_index(
+            "archive-test-group",
+            {"archived_through": self.archived_days()[-1], "days": dict.fromkeys(self.archived_days(), 0)},
+        )
+        service = LogsService(logs_repo=LogsTable(archive=archive))
+        late = f"{self.archived_days()[0]}T12:00:00Z"
+
+        result = service.ingest_logs(
+            "archive-test-group", [{"message": "now"}, {"created_at": late, "message": "late"}]
+        )
+
+        assert result.code == 400
+        items = get_table("logs").query(KeyConditionExpression=Key("groupid").eq("archive-test-group"))["Items"]
+        assert items == []
+
+    def test_export_and_search_read_archived_days(self, archive: LogArchive) -> None:
+        """テーブルから期限切れで消えたアーカイブ済みの日も、エクスポートと検索で読める"""
+        cold = [
+            {"groupid": "archive-test-group", "created_at": f"{day}T03:00:00Z", "message": f"archived {day}"}
+            for day in self.archived_days()
+        ]
+        for item in cold:
+            archive.write_day("archive-test-group", item["created_at"][:10], [item])
+        archive.write_index(
+            "archive-test-group",
+            {"archived_through": self.archived_days()[-1], "days": dict.fromkeys(self.archived_days(), 1)},
+        )
+        service = LogsService(logs_repo=LogsTable(archive=archive))
+        assert service.index_logs(cold).is_success
+
+        exported = b"".join(service.export_logs("archive-test-group")).decode().splitlines()
+        result = service.search_logs("archive-test-group", q="archived", limit=2)
+
+        assert [json.loads(line)["created_at"] for line in exported] == [item["created_at"] for item in cold]
+        assert result.data is not None
+        assert [item["created_at"] for item in result.data.items] == [item["created_at"] for item in cold[:2]]
+        assert result.data.last_evaluated_key is not None
+
+
+class TestListLogsChunked:
+    """コンパクション済みの日をチャンクから読むテスト"""
+
+    @pytest.fixture
+    def chunks(self) -> Any:
+        chunks = LogChunkTable()
+        yield chunks
+        table = get_table("logchunks")
+        for row in table.query(KeyConditionExpression=Key("groupid").eq("chunk-test-group"))["Items"]:
+            table.delete_item(Key={"groupid": row["groupid"], "chunk": row["chunk"]})
+        meta_cache.clear()
+
+    def test_reads_compacted_days_from_chunks(self, chunks: LogChunkTable, create_test_logs: Any) -> None:
+        """チャンクにまとめた日とまとめていない日を、1つの並びとしてページングできる"""
+        logs = create_test_logs(
+            [
+                {"groupid": "chunk-test-group", "created_at": f"2024-03-{day:02d}T{hour:02d}:00:00Z", "message": "m"}
+                for day in (1, 2, 3)
+                for hour in (3, 15)
+            ]
+        )
+        for day in ("2024-03-01", "2024-03-02"):
+            chunks.write_day("chunk-test-group", day, [log for log in logs if log["created_at"].startswith(day)])
+        chunks.write_meta("chunk-test-group", {"compacted_through": "2024-03-02", "days": {}})
+        logs_repo = LogsTable(chunks=chunks)
+
+        for order in ("asc", "desc"):
+            items: list[dict[str, Any]] = []
+            startkey = None
+            while True:
+                result = logs_repo.list_logs(groupid="chunk-test-group", limit=4, startkey=startkey, order=order)
+                assert result.data is not None
+                items += result.data.items
+                startkey = result.data.last_evaluated_key
+                if not startkey:
+                    break
+
+            expected = sorted((log["created_at"] for log in logs), reverse=order == "desc")
+            assert [log["created_at"] for log in items] == expected
+
+    def test_export_and_search_read_compacted_days(self, chunks: LogChunkTable) -> None:
+        """生のログが期限切れで消えたコンパクション済みの日も、エクスポートと検索で読める"""
+        logs = [
+            {"groupid": "chunk-test-group", "created_at": f"2024-03-0{day}T03:00:00Z", "message": f"compacted {day}"}
+            for day in (1, 2)
+        ]
+        for log in logs:
+            chunks.write_day("chunk-test-group", log["created_at"][:10], [log])
+        chunks.write_meta("chunk-test-group", {"compacted_through": "2024-03-02", "days": {}})
+        service = LogsService(logs_repo=LogsTable(chunks=chunks))
+        assert service.index_logs(logs).is_success
+
+        exported = b"".join(service.export_logs("chunk-test-group")).decode().splitlines()
+        result = service.search_logs("chunk-test-group", q="compacted")
+
+        assert [json.loads(line)["created_at"] for line in exported] == [log["created_at"] for log in logs]
+        assert result.data is not None
+        assert [item["created_at"] for item in result.data.items] == [log["created_at"] for log in logs]
@@ -0,0 +1,131 @@
+# tests/unit/services/test_log_stats_service.py
+"""
+LogStatsService のテスト
+
+LocalStack (デフォルト) または AWS DynamoDB を使用してテストを実行します。
+logstats テーブルが必要です（init-aws.sh で作成されます）。
+"""
+
+import uuid
+from typing import Any
+
+import pytest
+from app.repositories.dynamodb import get_table
+from app.services.log_stats_service import LogStatsService
+
+
+@pytest.fixture
+def log_stats_service() -> LogStatsService:
+    """LogStatsService インスタンス"""
+    return LogStatsService()
+
+
+@pytest.fixture
+def stats_groupid() -> str:
+    """テストごとに独立した集計になるよう、ユニークなグループIDを返す"""
+    return f"stats-{uuid.uuid4().hex[:12]}"
+
+
+def make_logs(groupid: str) -> list[dict[str, Any]]:
+    return [
+        {
+            "groupid": groupid,
+            "created_at": f"2024-01-01T{hour:02d}:00:{i:02d}Z",
+            "userid": f"user-{i % 2}@example.com",
+            "type": "Login" if i % 3 == 0 else "Logout",
+        }
+        for hour in (9, 10)
+        for i in range(6)
+    ]
+
+
+class TestRecordAndGetStats:
+    """record_logs / get_stats のテスト"""
+
+    def test_counts_by_hour(self, log_stats_service: LogStatsService, stats_groupid: str) -> None:
+        """時間バケットごとに件数が集計される"""
+        assert log_stats_service.record_logs(make_logs(stats_groupid)).is_success
+
+        result = log_stats_service.get_stats(stats_groupid, granularity="hour")
+
+        assert result.is_success
+        assert result.data is not None
+        stats = result.data.item
+        assert stats["total"] == 12
+        assert [b["bucket"] for b in stats["buckets"]] == ["2024-01-01T09", "2024-01-01T10"]
+        assert stats["types"] == {"Login": 4, "Logout": 8}
+        assert stats["users"] == {"user-0@example.com": 6, "user-1@example.com": 6}
+
+    def test_counts_are_additive(self, log_stats_service: LogStatsService, stats_groupid: str) -> None:
+        """同じバケットへの書き込みは ADD で加算される"""
+        log_stats_service.record_logs(make_logs(stats_groupid))
+        log_stats_service.record_logs(make_logs(stats_groupid))
+
+        result = log_stats_service.get_stats(stats_groupid, granularity="day")
+
+        assert result.data is not None
+        assert result.data.item["total"] == 24
+        assert len(result.data.item["buckets"]) == 1
+
+    def test_filters_by_type_and_range(self, log_stats_service: LogStatsService, stats_groupid: str) -> None:
+        """type と期間で絞り込める"""
+        log_stats_service.record_logs(make_logs(stats_groupid))
+
+        result = log_stats_service.get_stats(
+            stats_groupid,
+            granularity="hour",
+            begin="2024-01-01T10:00:00Z",
+            end="2024-01-01T10:59:59Z",
+            type_="Login",
+        )
+
+        assert result.data is not None
+        assert result.data.item["total"] == 2
+        assert result.data.item["users"] == {}
+
+    def test_rejects_userid_and_type_together(self, log_stats_service: LogStatsService) -> None:
+        """userid と type は同時に指定できない"""
+        result = log_stats_service.get_stats("any-group", userid="u", type_="Login")
+
+        assert result.code == 400
+
+    def test_buckets_offset_timestamps_in_utc(self, log_stats_service: LogStatsService, stats_groupid: str) -> None:
+        """オフセット付きの created_at / begin / end は UTC のバケットに集計・検索される"""
+        log = {"groupid": stats_groupid, "created_at": "2024-01-01T18:30:00+09:00", "userid": "u", "type": "Login"}
+        assert log_stats_service.record_logs([log]).is_success
+
+        result = log_stats_service.get_stats(
+            stats_groupid, granularity="hour", begin="2024-01-01T18:00:00+09:00", end="2024-01-01T18:59:59+09:00"
+        )
+
+        assert result.data is not None
+        assert result.data.item["total"] == 1
+        assert [b["bucket"] for b in result.data.item["buckets"]] == ["2024-01-01T09"]
+
+    def test_rejects_invalid_range(self, log_stats_service: LogStatsService) -> None:
+        """日時として解釈できない begin / end は 400"""
+        result = log_stats_service.get_stats("any-group", begin="yesterday")
+
+        assert result.code == 400
+
+    def test_keeps_user_counts_in_separate_items(self, log_stats_service: LogStatsService, stats_groupid: str) -> None:
+        """userid 別の件数はバケットのアイテムに持たず、ユーザーが増えてもバケットのアイテムは大きくならない"""
+        logs = [
+            {"groupid": stats_groupid, "created_at": f"2024-01-01T09:00:{i:02d}Z", "userid": f"user-{i}@example.com"}
+            for i in range(50)
+        ]
+        assert log_stats_service.record_logs(logs).is_success
+
+        bucket = get_table("logstats").get_item(Key={"rollupkey": f"{stats_groupid}#day", "bucket": "2024-01-01"})[
+            "Item"
+        ]
+        assert not [attr for attr in bucket if attr.startswith("user#")]
+
+        result = log_stats_service.get_stats(stats_groupid, userid="user-7@example.com")
+        assert result.data is not None
+        assert result.data.item["total"] == 1
+        assert result.data.item["users"] == {"user-7@example.com": 1}
+
+        result = log_stats_service.get_stats(stats_groupid)
+        assert result.data is not None
+        assert len(result.data.item["users"]) == 50
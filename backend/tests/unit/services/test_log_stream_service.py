@@ -0,0 +1,84 @@
+# tests/unit/services/test_log_stream_service.py
+"""
+LogStreamService のテスト
+
+LocalStack (デフォルト) または AWS DynamoDB を使用してテストを実行します。
+pytest-asyncio は使わず、各テストの中で asyncio.run() を呼びます。
+"""
+
+import asyncio
+from datetime import UTC, datetime
+from typing import Any
+
+from app.repositories.dynamodb import datetime_to_created_at
+from app.services.log_stream_service import LogStreamBroker, LogStreamService
+
+
+def make_logs(groupid: str, count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "groupid": groupid,
+            "created_at": f"2024-01-01T00:00:0{i}Z",
+            "userid": "user@example.com",
+            "username": "User",
+            "type": "Login",
+            "message": f"Message {i}",
+        }
+        for i in range(count)
+    ]
+
+
+async def take(stream: Any, count: int) -> list[str | None]:
+    received: list[str | None] = []
+    async for item in stream:
+        received.append(item["created_at"] if item else None)
+        if len(received) >= count:
+            break
+    return received
+
+
+class TestStreamLogs:
+    """stream_logs メソッドのテスト"""
+
+    def test_resumes_after_last_event_id(self, create_test_logs: Any) -> None:
+        """Last-Event-ID より新しいログを読み直してから配信する"""
+        create_test_logs(make_logs("stream-test-group", 4))
+        service = LogStreamService(LogStreamBroker(poll_interval=60), heartbeat=1)
+
+        received = asyncio.run(take(service.stream_logs("stream-test-group", "2024-01-01T00:00:01Z"), 2))
+
+        assert received == ["2024-01-01T00:00:02Z", "2024-01-01T00:00:03Z"]
+
+    def test_fans_out_published_logs(self) -> None:
+        """publish したログは同じグループの全購読者に1度ずつ届き、購読終了でポーリングも止まる"""
+        broker = LogStreamBroker(poll_interval=60)
+        service = LogStreamService(broker, heartbeat=1)
+
+        async def scenario() -> list[list[str | None]]:
+            first = asyncio.create_task(take(service.stream_logs("fanout-test-group"), 1))
+            second = asyncio.create_task(take(service.stream_logs("fanout-test-group"), 1))
+            await asyncio.sleep(0.1)
+            assert broker.subscriber_count("fanout-test-group") == 2
+            broker.publish(
+                "fanout-test-group", [{"groupid": "fanout-test-group", "created_at": "2999-01-01T00:00:00Z"}]
+            )
+            return list(await asyncio.gather(first, second))
+
+        assert asyncio.run(scenario()) == [["2999-01-01T00:00:00Z"], ["2999-01-01T00:00:00Z"]]
+        assert broker.subscriber_count("fanout-test-group") == 0
+
+    def test_publishes_logs_written_in_the_subscribed_second(self) -> None:
+        """購読を始めた秒のうちに書き込まれた（小数秒付きの）ログも配信する"""
+        broker = LogStreamBroker(poll_interval=60)
+
+        async def scenario() -> tuple[str, dict[str, Any] | None]:
+            sub = broker.subscribe("watermark-test-group")
+            created_at = datetime_to_created_at(datetime.now(UTC))
+            broker.publish("watermark-test-group", [{"groupid": "watermark-test-group", "created_at": created_at}])
+            received = sub.queue.get_nowait() if not sub.queue.empty() else None
+            broker.unsubscribe(sub)
+            return created_at, received
+
+        created_at, received = asyncio.run(scenario())
+        assert received is not None
+        assert received["created_at"] == created_at
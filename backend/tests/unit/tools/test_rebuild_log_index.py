@@ -0,0 +1,46 @@
+# tests/unit/tools/test_rebuild_log_index.py
+"""
+tools/rebuild_log_index.py のテスト
+
+LocalStack (デフォルト) または AWS DynamoDB を使用してテストを実行します。
+"""
+
+from collections.abc import Iterable
+from typing import Any
+
+import pytest
+from app.models.common import MessageData, RepositoryResponse
+from tools import rebuild_log_index
+
+
+class RecordingIndex:
+    """index_logs に渡されたログを記録する LogIndexTable の代わり"""
+
+    def __init__(self) -> None:
+        self.items: list[dict[str, Any]] = []
+
+    def index_logs(self, items: Iterable[dict[str, Any]], max_workers: int = 4) -> RepositoryResponse[MessageData]:
+        self.items.extend(items)
+        return RepositoryResponse(code=200, data=MessageData(message="OK"), detail=None)
+
+
+class TestScanSegment:
+    """scan_segment のテスト"""
+
+    def test_indexes_scanned_logs(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        create_test_logs: Any,
+        sample_logs: list[dict[str, Any]],
+    ) -> None:
+        """Scan したログを Python の値のまま posting の作成に渡す"""
+        index = RecordingIndex()
+        monkeypatch.setattr(rebuild_log_index, "LogIndexTable", lambda: index)
+        create_test_logs(sample_logs)
+
+        indexed, failed = rebuild_log_index.scan_segment(0, 1, workers=1)
+
+        assert failed == 0
+        assert indexed == len(index.items)
+        scanned = {item["created_at"]: item["message"] for item in index.items if item["groupid"] == "test-group-1"}
+        assert scanned == {log["created_at"]: log["message"] for log in sample_logs}
@@ -0,0 +1,112 @@
+# LOGS_RETENTION_DAYS=90 uv run --directory backend python -m tools.archive_logs
+# LOGS_RETENTION_DAYS=90 uv run --directory backend python -m tools.archive_logs --groupid group1 --through 2026-01-31
+"""
+logs テーブルのログを1日単位で S3 のアーカイブ（app/repositories/log_archive_repo.py）に書き出し、
+書き出したログに TTL 属性（expires_at = created_at + LOGS_RETENTION_DAYS 日）を付ける。
+
+- グループごとに、index.json の archived_through の翌日（初回は最も古いログの日）から --through（既定は前日）までを
+  古い順に処理する。1日終えるごとに index.json を更新するため、途中で止まっても続きから再開できる
+- TTL はアーカイブ済みのログにしか付けないため、この処理が止まっている間はログが期限切れにならない
+- その日のチャンク（tools/compact_logs.py）があれば、アーカイブ後にチャンクにも TTL を付ける
+- 1日分のログはメモリに載せてから書き出す。1日に数百万件を超えるグループでは LOGS_BUCKET=day を併用すること
+- 毎日1回（日付が変わった後）実行する想定
+"""
+
+import argparse
+import logging
+import time
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+from app.config import settings
+from app.repositories.group_repo import GroupsTable
+from app.repositories.log_archive_repo import TTL_ATTRIBUTE, LogArchive, day_expires_at, expires_at_of
+from app.repositories.log_repo import LogsTable
+from app.repositories.logchunk_repo import LogChunkTable
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def first_day(logs: LogsTable, groupid: str, index: dict[str, Any] | None) -> date | None:
+    """このグループで次にアーカイブする日"""
+    if index:
+        return date.fromisoformat(index["archived_through"]) + timedelta(days=1)
+    oldest = next(iter(logs.iter_logs(groupid=groupid, page_size=1)), [])
+    return date.fromisoformat(oldest[0]["created_at"][:10]) if oldest else None
+
+
+def archive_group(
+    logs: LogsTable,
+    archive: LogArchive,
+    chunks: LogChunkTable,
+    groupid: str,
+    through: date,
+    workers: int,
+    dry_run: bool,
+) -> tuple[int, int]:
+    """groupid のログを through の日までアーカイブし、(日数, 件数) を返す。"""
+    index = archive.read_index(groupid)
+    chunk_days = (chunks.read_meta(groupid) or {}).get("days", {})
+    day = first_day(logs, groupid, index)
+    index = {**(index or {}), "days": dict((index or {}).get("days", {}))}
+    days = archived = 0
+    while day is not None and day <= through:
+        begin = day.isoformat()
+        items = [item for page in logs.iter_logs(groupid=groupid, begin=begin, end=f"{begin}~") for item in page]
+        if not dry_run:
+            if items:
+                archive.write_day(groupid, begin, items)
+                # アーカイブを書き終えてから TTL を付ける
+                for item in items:
+                    item[TTL_ATTRIBUTE] = expires_at_of(item["created_at"], archive.retention_days)
+                res = logs.put_logs(items, max_workers=workers)
+                if res.data and res.data.items:
+                    raise RuntimeError(f"failed to set TTL on {len(res.data.items)} logs of {groupid} {begin}")
+                if chunk_days.get(begin):
+                    chunks.expire_day(
+                        groupid, begin, int(chunk_days[begin]), day_expires_at(begin, archive.retention_days)
+                    )
+                index["days"][begin] = len(items)
+            index["archived_through"] = begin
+            archive.write_index(groupid, index)
+        days += 1
+        archived += len(items)
+        day += timedelta(days=1)
+    logger.info(f"{groupid}: archived {archived} logs in {days} days")
+    return days, archived
+
+
+def main(groupid: str | None, through: date, workers: int, dry_run: bool) -> None:
+    if settings.LOGS_RETENTION_DAYS <= 0:
+        raise SystemExit("LOGS_RETENTION_DAYS is not set; nothing to archive")
+
+    started = time.perf_counter()
+    logs, archive, chunks = LogsTable(), LogArchive(), LogChunkTable()
+    total_days = total = 0
+    for gid in [groupid] if groupid else GroupsTable().list_groupids():
+        days, archived = archive_group(logs, archive, chunks, gid, through, workers, dry_run)
+        total_days += days
+        total += archived
+
+    verb = "would archive" if dry_run else "archived"
+    logger.info(f"{verb} {total} logs ({total_days} group-days) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    yesterday = datetime.now(UTC).date() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Archive old logs to S3 and set their DynamoDB TTL.")
+    parser.add_argument("--groupid", help="Archive only this group")
+    parser.add_argument("--through", type=date.fromisoformat, default=yesterday, help="Last day to archive (UTC)")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel BatchWriteItem workers")
+    parser.add_argument("--dry-run", action="store_true", help="Count logs without writing")
+    args = parser.parse_args()
+
+    if args.through > yesterday:
+        parser.error("--through must be a day that has already ended (UTC)")
+
+    logger.info(f"ENV: {settings.ENV}")
+    logger.info(f"DYNAMODB_ENDPOINT: {settings.DYNAMODB_ENDPOINT}")
+    logger.info(f"LOGS_RETENTION_DAYS={settings.LOGS_RETENTION_DAYS}")
+
+    main(args.groupid, args.through, args.workers, args.dry_run)
@@ -0,0 +1,167 @@
+# uv run --directory backend python -m tools.backfill_log_stats --segments 8
+# uv run --directory backend python -m tools.backfill_log_stats --groupid group1
+# python3 infrastructure/localstack/snapshot.py cat logs.snap --columns groupid,created_at,userid,type \
+#   | uv run --directory backend python -m tools.backfill_log_stats --input - --dry-run
+"""
+logs テーブルを読み直して、集計テーブル（logstats）のバケットを再計算する。
+
+- --groupid 指定時はそのグループだけを Query で読み、それ以外は並列セグメント Scan で全件を読む
+- --input 指定時はテーブルではなく DynamoDB 形式の JSON Lines（snapshot.py cat の出力、
+  export_sample_jsonl.py のシャードなど）から集計する
+- バケット / シャードの接尾辞付きのキー（log_keys.py）は groupid に戻して集計する。移行中（LOGS_LEGACY_READ=true）は
+  同じログが接尾辞なし・付きの両方にあり得るため、(groupid, created_at) で1度だけ数える（Scan した全キーをメモリに持つ）。
+  移行後（LOGS_LEGACY_READ=false）は API と同じく接尾辞なしのアイテムを数えない
+- 集計結果は ADD ではなく put_item でバケットごと上書きするため、何度実行しても結果は同じ。
+  以前の形式でバケットのアイテムに持っていた user#{userid} 属性も、ユーザーごとのアイテムに書き直される
+- 実行中に書き込まれたログは、上書き後に ADD で加算された分が失われる可能性があるため、
+  書き込みの少ない時間帯に実行すること
+"""
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from app.config import settings
+from app.repositories.dynamodb import get_dynamodb_resource, get_full_table_name
+from app.repositories.log_keys import LogKeyScheme
+from app.repositories.log_repo import LogsTable
+from app.repositories.logstats_repo import LogStatsTable, count_logs
+from app.utils.log_codec import decode_line
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+Counters = dict[tuple[str, str, str], Counter[str]]
+
+
+class LogDecoder:
+    """Scan / エクスポートで読んだアイテムを、接尾辞なしの groupid に戻して重複を除く（セグメント間で共有する）。"""
+
+    def __init__(self, scheme: LogKeyScheme) -> None:
+        self.scheme = scheme
+        self.seen: set[tuple[str, str]] | None = set() if scheme.enabled and scheme.legacy_read else None
+        self.lock = threading.Lock()
+
+    def decode(self, items: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        if self.scheme.enabled and not self.scheme.legacy_read:
+            items = [item for item in items if "#" in item["groupid"]]
+        decoded = [self.scheme.decode_item(item) if "#" in item["groupid"] else item for item in items]
+        if self.seen is None:
+            return decoded
+        fresh = []
+        with self.lock:
+            for item in decoded:
+                key = (item["groupid"], item["created_at"])
+                if key not in self.seen:
+                    self.seen.add(key)
+                    fresh.append(item)
+        return fresh
+
+
+def scan_segment(segment: int, total_segments: int, decoder: LogDecoder) -> Counters:
+    """1セグメント分を Scan し、バケットごとのカウンタを返す。"""
+    client = get_dynamodb_resource().meta.client
+    table_name = get_full_table_name("logs")
+    counters: Counters = defaultdict(Counter)
+    scan_kwargs: dict[str, Any] = {
+        "TableName": table_name,
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "ProjectionExpression": "groupid, created_at, userid, #type",
+        "ExpressionAttributeNames": {"#type": "type"},
+    }
+    scanned = 0
+    while True:
+        response = client.scan(**scan_kwargs)
+        items = response.get("Items", [])
+        scanned += len(items)
+        for key, counter in count_logs(decoder.decode(items)).items():
+            counters[key].update(counter)
+        last_evaluated = response.get("LastEvaluatedKey")
+        if not last_evaluated:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_evaluated
+    logger.info(f"segment {segment}/{total_segments}: scanned {scanned} logs")
+    return counters
+
+
+def count_all(total_segments: int) -> Counters:
+    merged: Counters = defaultdict(Counter)
+    decoder = LogDecoder(LogKeyScheme.from_settings())
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        for counters in executor.map(
+            scan_segment, range(total_segments), [total_segments] * total_segments, [decoder] * total_segments
+        ):
+            for key, counter in counters.items():
+                merged[key].update(counter)
+    return merged
+
+
+def count_group(groupid: str) -> Counters:
+    # LogsTable は接尾辞付きのパーティションを groupid に戻し、移行中の重複も除いて返す
+    pages: Iterator[list[dict[str, Any]]] = LogsTable().iter_logs(groupid=groupid)
+    merged: Counters = defaultdict(Counter)
+    for page in pages:
+        for key, counter in count_logs(page).items():
+            merged[key].update(counter)
+    return merged
+
+
+def count_input(path: str) -> Counters:
+    """DynamoDB 形式の JSON Lines（"-" は標準入力）を1行ずつ読んで集計する。"""
+    decoder = LogDecoder(LogKeyScheme.from_settings())
+    with sys.stdin.buffer if path == "-" else open(path, "rb") as f:
+        return count_logs(item for line in f if line.strip() for item in decoder.decode([decode_line(line)]))
+
+
+def write_buckets(counters: Counters, workers: int) -> int:
+    stats_table = LogStatsTable()
+
+    def _put(entry: tuple[tuple[str, str, str], Counter[str]]) -> bool:
+        (groupid, granularity, bucket), counter = entry
+        return stats_table.put_bucket(groupid, granularity, bucket, dict(counter)).is_success
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_put, counters.items()))
+    failed = results.count(False)
+    if failed:
+        logger.error(f"{failed} buckets failed to write")
+    return len(results) - failed
+
+
+def main(groupid: str | None, segments: int, workers: int, dry_run: bool, input_path: str | None = None) -> None:
+    started = time.perf_counter()
+    if input_path:
+        counters = count_input(input_path)
+    else:
+        counters = count_group(groupid) if groupid else count_all(segments)
+    logger.info(f"aggregated {len(counters)} buckets in {time.perf_counter() - started:.1f}s")
+
+    if dry_run:
+        for (gid, granularity, bucket), counter in sorted(counters.items()):
+            print(f"{gid}\t{granularity}\t{bucket}\t{counter['total']}")
+        return
+
+    written = write_buckets(counters, workers)
+    logger.info(f"wrote {written} buckets in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild log rollup buckets from the logs table.")
+    parser.add_argument("--groupid", help="Backfill only this group (Query instead of Scan)")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel writers")
+    parser.add_argument("--input", help="Aggregate DynamoDB-JSON lines from this file ('-' for stdin) instead")
+    parser.add_argument("--dry-run", action="store_true", help="Print bucket totals without writing")
+    args = parser.parse_args()
+
+    logger.info(f"ENV: {settings.ENV}")
+    logger.info(f"DYNAMODB_ENDPOINT: {settings.DYNAMODB_ENDPOINT}")
+
+    main(args.groupid, args.segments, args.workers, args.dry_run, args.input)
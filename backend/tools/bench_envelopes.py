@@ -0,0 +1,134 @@
+# uv run --directory backend python -m tools.bench_envelopes --iterations 10000
+"""
+Repository → Service の結果受け渡しにおける、1リクエストあたりのアロケーション数を計測する。
+
+- before: 旧 UsersService.list_users（dbc5a0c）。Service 層で frozen dataclass の ServiceResponse + ListItemData を組み直す
+- after : 現行 UsersService.list_users。slots 化した ResultEnvelope を ServiceResponse.of() で付け替える
+
+どちらも Repository の呼び出し以降の本体（成否の判定・ログ出力を含む）をそのまま写したもので、
+DynamoDB には接続せず、それぞれの実装の型で作った固定の RepositoryResponse を渡して計測する。
+"""
+
+import argparse
+import gc
+import json
+import logging
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.models.common import ListItemData, RepositoryResponse, ServiceResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class _LegacyListItemData:
+    items: list[dict[str, Any]] = field(default_factory=list)
+    last_evaluated_key: dict[str, Any] | None = None
+    size: int = 0
+    count: int = 0
+
+
+@dataclass(frozen=True)
+class _LegacyResponse:
+    """旧 RepositoryResponse / ServiceResponse（同じ定義）"""
+
+    code: int
+    data: Any = None
+    detail: str | None = None
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.code < 300 or self.code == 20000
+
+
+def make_repository_result(n_items: int) -> RepositoryResponse[ListItemData]:
+    items = [{"userid": f"user{i}@example.com", "username": f"user{i}"} for i in range(n_items)]
+    return RepositoryResponse(code=200, data=ListItemData(items=items, size=0, count=n_items))
+
+
+def make_legacy_repository_result(res: RepositoryResponse[ListItemData]) -> _LegacyResponse:
+    """同じアイテムを持つ、旧実装の型の RepositoryResponse"""
+    assert res.data is not None
+    data = _LegacyListItemData(items=res.data.items, size=res.data.size, count=res.data.count)
+    return _LegacyResponse(code=res.code, data=data, detail=res.detail)
+
+
+def legacy_list_users(res: _LegacyResponse) -> _LegacyResponse:
+    """旧 UsersService.list_users の本体（Service 層で ServiceResponse + ListItemData を組み直す）"""
+    if not res.is_success or res.data is None:
+        return _LegacyResponse(code=res.code, data=_LegacyListItemData(), detail=res.detail)
+
+    items = res.data.items
+    last_evaluated_key = res.data.last_evaluated_key
+
+    logger.info(f"Retrieved items count: {len(items)}")
+
+    return _LegacyResponse(
+        code=res.code,
+        data=_LegacyListItemData(
+            items=items,
+            last_evaluated_key=last_evaluated_key,
+            size=res.data.size,
+            count=res.data.count,
+        ),
+        detail=res.detail,
+    )
+
+
+def current_list_users(res: RepositoryResponse[ListItemData]) -> ServiceResponse[ListItemData]:
+    """現行 UsersService.list_users の本体（data は共有し型だけ付け替える）"""
+    if not res.is_success or res.data is None:
+        return ServiceResponse(code=res.code, data=ListItemData(), detail=res.detail)
+
+    logger.info(f"Retrieved items count: {len(res.data.items)}")
+
+    return ServiceResponse.of(res)
+
+
+def measure(fn: Callable[[Any], Any], res: Any, iterations: int) -> dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [fn(res) for _ in range(iterations)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(s.count_diff for s in stats)
+    size = sum(s.size_diff for s in stats)
+    del keep
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(res)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "allocations_per_request": round(blocks / iterations, 2),
+        "bytes_per_request": round(size / iterations, 1),
+        "ns_per_request": round(elapsed / iterations * 1e9, 1),
+    }
+
+
+def main(iterations: int, n_items: int) -> None:
+    res = make_repository_result(n_items)
+    result = {
+        "iterations": iterations,
+        "items": n_items,
+        "before": measure(legacy_list_users, make_legacy_repository_result(res), iterations),
+        "after": measure(current_list_users, res, iterations),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure allocations of result envelopes per request.")
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=100, help="Items in the repository result")
+    args = parser.parse_args()
+
+    main(args.iterations, args.items)
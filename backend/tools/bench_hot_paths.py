@@ -0,0 +1,516 @@
+# uv run --directory backend python -m tools.bench_hot_paths --output bench.json
+# uv run --directory backend python -m tools.bench_hot_paths --baseline bench.json
+# ENV=local uv run --directory backend python -m tools.bench_hot_paths --backend localstack --sizes 10,100,1000
+"""
+Repository / Service / API のホットパスを、いくつかのデータ件数で計測する。
+
+- query_items            : logs テーブルの1パーティションを limit 件 Query
+- batch_get_items        : users テーブルから N 件を BatchGetItem
+- authorize_group_access : グループの取得と権限チェック
+- list_logs              : GET /groups/{groupid}/logs?limit=N（TestClient 経由でミドルウェアから応答の生成まで）
+
+ケースごとにレイテンシの分布（mean / p50 / p90 / p99 / max）、スループット、1回あたりのメモリ確保
+（tracemalloc のピーク）を計測し、--output に JSON で保存する。--baseline に以前の結果を渡すと、
+p50 かメモリ確保が --threshold を超えて悪化したケースを表示して終了コード 1 で終了する。
+
+バックエンド:
+- inprocess（既定）: botocore の before-call イベントでメモリ上のテーブルが応答する。
+  boto3 のリクエストの組み立てとレスポンスの変換はそのまま動き、HTTP 通信だけを省くため、
+  LocalStack が無くても実行でき、結果のぶれも小さい
+- localstack: 設定（DYNAMODB_ENDPOINT）のエンドポイントに接続する
+
+どちらのバックエンドでも、計測用のデータ（groupid = bench-group、userid = bench-user-*）を先に書き込む。
+"""
+
+import argparse
+import base64
+import bisect
+import gc
+import json
+import logging
+import math
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from typing import Any
+
+import boto3
+from app.api.logs import get_auth_context
+from app.api.utils.auth import AuthContext
+from app.api.utils.authorization import authorize_group_access
+from app.config import settings
+from app.main import app
+from app.repositories import dynamodb
+from app.repositories.dynamodb import batch_get_items, get_full_table_name, put_item, query_items, write_batches
+from app.repositories.log_repo import LogsTable
+from boto3.dynamodb.conditions import Key
+from botocore.awsrequest import AWSResponse
+from botocore.compat import HTTPHeaders
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+BENCH_GROUP = "bench-group"
+BENCH_USER = "bench-user-0@example.com"
+LOG_TYPES = ("LOGIN", "LOGOUT", "CREATE", "DELETE")
+CASES = ("query_items", "batch_get_items", "authorize_group_access", "list_logs")
+
+# メモリ上のテーブルのキー（パーティションキー, ソートキー）
+KEY_SCHEMAS = {
+    "logs": ("groupid", "created_at"),
+    "users": ("userid", None),
+    "groups": ("groupid", None),
+    "logchunks": ("groupid", "chunk"),
+}
+# 比べる指標と、悪化とみなす最小の差（ごく小さい値のぶれを無視する）
+REGRESSION_METRICS = {"p50_ms": 0.05, "alloc_peak_kib": 4.0}
+
+SORT_CONDITION = re.compile(
+    r"^(?:(?P<name>#\w+) (?P<op>=|<=|<|>=|>) (?P<value>:\w+)"
+    r"|(?P<bname>#\w+) BETWEEN (?P<low>:\w+) AND (?P<high>:\w+)"
+    r"|begins_with\((?P<pname>#\w+), (?P<prefix>:\w+)\))$"
+)
+
+
+# ====================
+# メモリ上のバックエンド
+# ====================
+
+
+def key_value(value: dict[str, Any]) -> Any:
+    """DynamoDB 形式の値を、キーとして比べられる値にする。"""
+    return Decimal(value["N"]) if "N" in value else value.get("S", value.get("B"))
+
+
+class InProcessDynamoDB:
+    """
+    botocore の before-call イベントで DynamoDB の呼び出しに応答するメモリ上のバックエンド。
+    対応する操作は GetItem / PutItem / BatchGetItem / BatchWriteItem / Query（GSI と FilterExpression は非対応）。
+    S3 の GetObject は常に NoSuchKey を返す（アーカイブなし）。
+    """
+
+    def __init__(self) -> None:
+        self.schemas = {get_full_table_name(name): schema for name, schema in KEY_SCHEMAS.items()}
+        # テーブル名 → パーティションキーの値 → ソートキーの値 → アイテム（DynamoDB 形式）
+        self.tables: dict[str, dict[Any, dict[Any, dict[str, Any]]]] = defaultdict(lambda: defaultdict(dict))
+        self.sorted: dict[tuple[str, Any], tuple[list[Any], list[dict[str, Any]]]] = {}
+
+    def install(self) -> None:
+        """
+        以降に作るクライアントがこのバックエンドを使うようにする（既に作られたリソースは作り直す）。
+        通信しないため、認証情報は使われないダミーを設定する。
+        """
+        boto3.setup_default_session(
+            aws_access_key_id="bench", aws_secret_access_key="bench", region_name=settings.REGION_NAME
+        )
+        events: Any = boto3.DEFAULT_SESSION.events  # type: ignore[union-attr]
+        events.register("before-call.dynamodb", self.handle_dynamodb)
+        events.register("before-call.s3", self.handle_s3)
+        dynamodb.reset_dynamodb_resources()
+
+    def handle_dynamodb(self, model: Any, params: dict[str, Any], **kwargs: Any) -> tuple[AWSResponse, dict[str, Any]]:
+        request = json.loads(params["body"])
+        handler: Callable[[dict[str, Any]], dict[str, Any]] = getattr(self, model.name)
+        body = handler(request)
+        size = len(json.dumps(body))
+        body["ResponseMetadata"] = {"HTTPStatusCode": 200, "HTTPHeaders": {"content-length": str(size)}}
+        return AWSResponse("", 200, HTTPHeaders(), None), body
+
+    def handle_s3(self, model: Any, **kwargs: Any) -> tuple[AWSResponse, dict[str, Any]]:
+        if model.name != "GetObject":
+            raise NotImplementedError(f"S3 {model.name} is not supported by the in-process backend")
+        error = {"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}}
+        return AWSResponse("", 404, HTTPHeaders(), None), {**error, "ResponseMetadata": {"HTTPStatusCode": 404}}
+
+    def _split_key(self, table: str, key: dict[str, Any]) -> tuple[Any, Any]:
+        pk, sk = self.schemas[table]
+        return key_value(key[pk]), key_value(key[sk]) if sk else None
+
+    def _put(self, table: str, item: dict[str, Any]) -> None:
+        pk, sk = self._split_key(table, item)
+        self.tables[table][pk][sk] = item
+        self.sorted.pop((table, pk), None)
+
+    def _get(self, table: str, key: dict[str, Any]) -> dict[str, Any] | None:
+        pk, sk = self._split_key(table, key)
+        item = self.tables[table][pk].get(sk)
+        # boto3 はレスポンスの値をその場で Python の値に置き換えるため、保存しているアイテムは渡さない
+        return dict(item) if item is not None else None
+
+    def GetItem(self, request: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        item = self._get(request["TableName"], request["Key"])
+        return {"Item": item} if item is not None else {}
+
+    def PutItem(self, request: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        self._put(request["TableName"], request["Item"])
+        return {}
+
+    def BatchGetItem(self, request: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        responses = {
+            table: [item for key in spec["Keys"] if (item := self._get(table, key)) is not None]
+            for table, spec in request["RequestItems"].items()
+        }
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def BatchWriteItem(self, request: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        for table, writes in request["RequestItems"].items():
+            for write in writes:
+                if "PutRequest" in write:
+                    self._put(table, write["PutRequest"]["Item"])
+                else:
+                    pk, sk = self._split_key(table, write["DeleteRequest"]["Key"])
+                    self.tables[table][pk].pop(sk, None)
+                    self.sorted.pop((table, pk), None)
+        return {"UnprocessedItems": {}}
+
+    def Query(self, request: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        if "IndexName" in request or "FilterExpression" in request:
+            raise NotImplementedError("IndexName / FilterExpression are not supported by the in-process backend")
+        table = request["TableName"]
+        values = {name: key_value(value) for name, value in request.get("ExpressionAttributeValues", {}).items()}
+        expression = request["KeyConditionExpression"]
+        while expression.startswith("(") and expression.endswith(")"):
+            expression = expression[1:-1]
+        partition, _, sort_condition = expression.partition(" AND ")
+        pk = values[partition.split(" = ")[1]]
+
+        keys, items = self._partition(table, pk)
+        lo, hi = 0, len(keys)
+        if sort_condition:
+            match = SORT_CONDITION.match(sort_condition)
+            if not match:
+                raise NotImplementedError(f"Unsupported key condition: {sort_condition}")
+            if match["op"]:
+                value = values[match["value"]]
+                if match["op"] in ("=", ">=", ">"):
+                    lo = (bisect.bisect_left if match["op"] != ">" else bisect.bisect_right)(keys, value)
+                if match["op"] in ("=", "<=", "<"):
+                    hi = (bisect.bisect_right if match["op"] != "<" else bisect.bisect_left)(keys, value)
+            elif match["bname"]:
+                lo, hi = (
+                    bisect.bisect_left(keys, values[match["low"]]),
+                    bisect.bisect_right(keys, values[match["high"]]),
+                )
+            else:
+                prefix = values[match["prefix"]]
+                lo, hi = bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + "\uffff")
+
+        forward = request.get("ScanIndexForward", True)
+        start = request.get("ExclusiveStartKey")
+        if start:
+            _, start_sk = self._split_key(table, start)
+            if forward:
+                lo = max(lo, bisect.bisect_right(keys, start_sk))
+            else:
+                hi = min(hi, bisect.bisect_left(keys, start_sk))
+        selected = items[lo:hi] if forward else items[lo:hi][::-1]
+        limit = request.get("Limit", len(selected))
+        page = [dict(item) for item in selected[:limit]]
+        response: dict[str, Any] = {"Items": page, "Count": len(page), "ScannedCount": len(page)}
+        if len(selected) > limit and page:
+            pk_name, sk_name = self.schemas[table]
+            response["LastEvaluatedKey"] = {name: page[-1][name] for name in (pk_name, sk_name) if name}
+        return response
+
+    def _partition(self, table: str, pk: Any) -> tuple[list[Any], list[dict[str, Any]]]:
+        """ソートキー順に並べたパーティション（書き込みがあるまで使い回す）"""
+        cached = self.sorted.get((table, pk))
+        if cached is None:
+            entries = sorted(self.tables[table][pk].items(), key=lambda entry: entry[0])
+            cached = self.sorted[(table, pk)] = ([sk for sk, _ in entries], [item for _, item in entries])
+        return cached
+
+
+# ====================
+# 計測用データ
+# ====================
+
+
+def make_logs(n: int) -> list[dict[str, Any]]:
+    now = datetime(2025, 5, 1, tzinfo=UTC)
+    items = []
+    for i in range(n):
+        userid = f"bench-user-{i % 30}@example.com"
+        log_type = LOG_TYPES[i % len(LOG_TYPES)]
+        items.append(
+            {
+                "groupid": BENCH_GROUP,
+                "created_at": (now + timedelta(seconds=i)).isoformat().replace("+00:00", "Z"),
+                "groupid#userid": f"{BENCH_GROUP}#{userid}",
+                "groupid#type": f"{BENCH_GROUP}#{log_type}",
+                "userid": userid,
+                "username": f"bench-user-{i % 30}",
+                "type": log_type,
+                "message": f"bench-user-{i % 30} が {log_type.lower()} しました",
+            }
+        )
+    return items
+
+
+def make_users(n: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "userid": f"bench-user-{i}@example.com",
+            "username": f"bench-user-{i}",
+            "email": f"bench-user-{i}@example.com",
+            "created_at": "2025-05-01T00:00:00Z",
+            "updated_at": "2025-05-01T00:00:00Z",
+        }
+        for i in range(n)
+    ]
+
+
+def seed(n: int) -> None:
+    """計測用のグループ・ユーザー・ログを書き込む（同じキーで上書きするため何度実行してもよい）。"""
+    put_item(
+        "groups",
+        {
+            "groupid": BENCH_GROUP,
+            "groupname": "Benchmark",
+            "permissions": ["list_logs", "view_logs"],
+            "users": [BENCH_USER],
+            "created_at": "2025-05-01T00:00:00Z",
+            "updated_at": "2025-05-01T00:00:00Z",
+        },
+    )
+    if write_batches("users", make_users(n), max_workers=8):
+        raise RuntimeError("failed to seed users")
+    res = LogsTable().put_logs(make_logs(n), max_workers=8)
+    if res.data is None or res.data.items:
+        raise RuntimeError("failed to seed logs")
+
+
+class BenchAuth(AuthContext):
+    """計測用グループのメンバーとして認可される AuthContext（JWT を解析しない）"""
+
+    def __init__(self) -> None:
+        self.userid = BENCH_USER
+        self.group_roles = [BENCH_GROUP]
+
+
+def get_bench_auth_context(request: Request) -> AuthContext:
+    return BenchAuth()
+
+
+def bearer_token() -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"cognito:username": BENCH_USER}).encode()).decode().rstrip("=")
+    return f"Bearer header.{payload}.signature"
+
+
+# ====================
+# 計測
+# ====================
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    name: str
+    size: int
+    run: Callable[[], Any]
+    count: Callable[[Any], int]  # 結果の件数（データの準備ができているかの確認に使う）
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+def build_cases(names: list[str], sizes: list[int], client: TestClient) -> list[Case]:
+    auth = BenchAuth()
+    headers = {"Authorization": bearer_token()}
+    users = [{"userid": f"bench-user-{i}@example.com"} for i in range(max(sizes))]
+
+    def list_logs(limit: int) -> Any:
+        response = client.get(f"/groups/{BENCH_GROUP}/logs", params={"limit": limit}, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+    def count_items(res: Any) -> int:
+        return int(res.data.count)
+
+    def count_body(body: Any) -> int:
+        return len(body["Items"])
+
+    cases = []
+    for size in sizes:
+        cases += [
+            Case(
+                "query_items",
+                size,
+                partial(query_items, "logs", Key("groupid").eq(BENCH_GROUP), limit=size),
+                count_items,
+            ),
+            Case("batch_get_items", size, partial(batch_get_items, "users", users[:size]), count_items),
+            Case("list_logs", size, partial(list_logs, size), count_body),
+        ]
+    check = partial(authorize_group_access, auth, BENCH_GROUP, "list_logs")
+    cases.append(Case("authorize_group_access", 1, check, lambda _: 1))
+    return [case for case in cases if case.name in names]
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """昇順に並べた samples の q 分位（nearest-rank）"""
+    return samples[max(0, min(len(samples) - 1, math.ceil(q * len(samples)) - 1))]
+
+
+def measure(case: Case, rounds: int, warmup: int, alloc_rounds: int) -> dict[str, float]:
+    count = case.count(case.run())
+    if count != case.size:
+        raise RuntimeError(f"{case.label}: expected {case.size} items but got {count} (is the bench data seeded?)")
+    for _ in range(warmup):
+        case.run()
+
+    gc.collect()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        case.run()
+        samples.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - started
+    samples.sort()
+
+    # 1回の呼び出しで確保したメモリのピーク（呼び出し前に確保済みの分を除く）
+    tracemalloc.start()
+    peaks = []
+    for _ in range(alloc_rounds):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        case.run()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "stdev_ms": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+        "min_ms": round(samples[0], 3),
+        "p50_ms": round(percentile(samples, 0.5), 3),
+        "p90_ms": round(percentile(samples, 0.9), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "max_ms": round(samples[-1], 3),
+        "ops_per_sec": round(rounds / elapsed, 1),
+        "alloc_peak_kib": round(statistics.median(peaks) / 1024, 1) if peaks else 0.0,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """baseline より threshold（割合）を超えて悪化した指標の一覧"""
+    regressions = []
+    for label, current in results["results"].items():
+        base = baseline["results"].get(label)
+        if base is None:
+            continue
+        for metric, min_delta in REGRESSION_METRICS.items():
+            before, after = base[metric], current[metric]
+            if after > before * (1 + threshold) and after - before > min_delta:
+                regressions.append(f"{label} {metric}: {before} → {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_table(results: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    print(f"{'case':<28}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'peak KiB':>10}{'vs base':>10}")
+    for label, result in results["results"].items():
+        base = baseline["results"].get(label) if baseline else None
+        ratio = f"{result['p50_ms'] / base['p50_ms']:.2f}x" if base and base["p50_ms"] else "-"
+        print(
+            f"{label:<28}{result['p50_ms']:>10.3f}{result['p90_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+            f"{result['ops_per_sec']:>10.0f}{result['alloc_peak_kib']:>10.1f}{ratio:>10}"
+        )
+
+
+def main(
+    backend: str,
+    cases: list[str],
+    sizes: list[int],
+    rounds: int,
+    warmup: int,
+    alloc_rounds: int,
+    output: str | None,
+    baseline_path: str | None,
+    threshold: float,
+    verbose: bool = False,
+) -> None:
+    if not verbose:
+        # 端末へのログ出力が計測値をぶらさないよう、INFO 以下のログは出さない
+        logging.disable(logging.INFO)
+    if backend == "inprocess":
+        InProcessDynamoDB().install()
+    elif not settings.dynamodb_endpoint_url:
+        raise SystemExit("DYNAMODB_ENDPOINT is not set; refusing to seed bench data into AWS")
+
+    seed(max(sizes))
+    app.dependency_overrides[get_auth_context] = get_bench_auth_context
+    try:
+        client = TestClient(app)
+        results: dict[str, Any] = {
+            "meta": {
+                "backend": backend,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "created_at": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+                "sizes": sizes,
+            },
+            "results": {},
+        }
+        for case in build_cases(cases, sizes, client):
+            results["results"][case.label] = measure(case, rounds, warmup, alloc_rounds)
+            print(f"⏱️ {case.label}: p50 {results['results'][case.label]['p50_ms']} ms", file=sys.stderr)
+    finally:
+        app.dependency_overrides.pop(get_auth_context, None)
+
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["backend"] != backend:
+            print(f"⚠️ baseline was measured with backend={baseline['meta']['backend']}", file=sys.stderr)
+
+    print_table(results, baseline)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if baseline:
+        regressions = compare(results, baseline, threshold)
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark repository, service and API hot paths.")
+    parser.add_argument("--backend", choices=["inprocess", "localstack"], default="inprocess")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated subset of {', '.join(CASES)}")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated item counts per call")
+    parser.add_argument("--rounds", type=int, default=50, help="Timed calls per case")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed calls per case before measuring")
+    parser.add_argument("--alloc-rounds", type=int, default=5, help="Calls per case traced with tracemalloc")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown ratio before flagging")
+    parser.add_argument("--verbose", action="store_true", help="Keep INFO logs of the measured code")
+    args = parser.parse_args()
+
+    main(
+        args.backend,
+        args.cases.split(","),
+        [int(size) for size in args.sizes.split(",")],
+        args.rounds,
+        args.warmup,
+        args.alloc_rounds,
+        args.output,
+        args.baseline,
+        args.threshold,
+        args.verbose,
+    )
@@ -0,0 +1,99 @@
+# uv run --directory backend python -m tools.bench_log_responses --items 1000 --rounds 50
+"""
+GET /groups/{groupid}/logs のレスポンス生成部分（検証＋シリアライズ）を 1000件ページで計測する。
+
+- before: LogItem.model_validate をアイテムごとに呼び、FastAPI の response_model で
+          再検証 → Python 値へシリアライズ → json.dumps する旧経路
+- after : TypeAdapter でリストをまとめて検証し、JSON バイト列へ直接シリアライズする現行経路
+
+DynamoDB には接続せず、テーブルから読んだ形式の dict を生成して計測する。
+"""
+
+import argparse
+import json
+import statistics
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.api.utils.responses import model_response, validate_items
+from app.schemas.logs import LogItem, LogsResponse
+from pydantic import TypeAdapter
+
+_response_adapter = TypeAdapter(LogsResponse)
+
+
+def make_log_items(n: int) -> list[dict[str, Any]]:
+    now = datetime(2025, 5, 1, tzinfo=UTC)
+    items = []
+    for i in range(n):
+        userid = f"user{i % 30}@example.com"
+        log_type = ("LOGIN", "LOGOUT", "CREATE", "DELETE")[i % 4]
+        items.append(
+            {
+                "groupid": "group1",
+                "created_at": (now + timedelta(seconds=i)).isoformat().replace("+00:00", "Z"),
+                "groupid#userid": f"group1#{userid}",
+                "groupid#type": f"group1#{log_type}",
+                "userid": userid,
+                "username": f"user{i % 30}",
+                "type": log_type,
+                "message": f"user{i % 30} が {log_type.lower()} しました",
+            }
+        )
+    return items
+
+
+def before(items: list[dict[str, Any]], last_key: dict[str, Any]) -> bytes:
+    logs = [LogItem.model_validate(item) for item in items if item is not None]
+    response = LogsResponse(Items=logs, LastEvaluatedKey=last_key)
+    # FastAPI の serialize_response 相当（response_model での再検証＋シリアライズ）と JSONResponse.render
+    value = _response_adapter.validate_python(response)
+    content = _response_adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def after(items: list[dict[str, Any]], last_key: dict[str, Any]) -> bytes:
+    logs = validate_items(LogItem, items)
+    return bytes(model_response(LogsResponse, Items=logs, LastEvaluatedKey=last_key).body)
+
+
+def measure(fn: Callable[[list[dict[str, Any]], dict[str, Any]], bytes], items: Any, rounds: int) -> dict[str, float]:
+    last_key = {"groupid": "group1", "created_at": items[-1]["created_at"]}
+    fn(items, last_key)  # warm up (TypeAdapter の生成など)
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(items, last_key)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+def main(n_items: int, rounds: int) -> None:
+    items = make_log_items(n_items)
+    last_key = {"groupid": "group1", "created_at": items[-1]["created_at"]}
+    assert json.loads(before(items, last_key)) == json.loads(after(items, last_key))
+
+    result = {
+        "items": n_items,
+        "rounds": rounds,
+        "before": measure(before, items, rounds),
+        "after": measure(after, items, rounds),
+    }
+    result["speedup"] = round(result["before"]["mean_ms"] / result["after"]["mean_ms"], 2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark log list response validation and serialization.")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    main(args.items, args.rounds)
@@ -0,0 +1,115 @@
+# uv run --directory backend python -m tools.compact_logs
+# uv run --directory backend python -m tools.compact_logs --groupid group1 --through 2026-01-31
+"""
+日付の変わった日のログを、1日単位で圧縮したチャンク（app/repositories/logchunk_repo.py）にまとめる。
+
+- グループごとに、meta の compacted_through の翌日（初回は最も古いログの日）から --through（既定は前日）までを
+  古い順に処理する。1日終えるごとに meta を更新するため、途中で止まっても続きから再開できる
+- 同じ日を書き直す場合（--rebuild-from）は、前回より減ったパートを削除する
+- logs テーブルのログは削除しない（userid / type の絞り込みや、全文検索の BatchGetItem はテーブルから読む）
+- LOGS_RETENTION_DAYS を設定している場合、S3 にアーカイブ済みの日のチャンクには、その日のログと同じ時期に切れる
+  TTL を付ける。まだアーカイブしていない日のチャンクには付けず、archive_logs.py がアーカイブ後に付ける
+  （アーカイブより先にチャンクが消えると、その日はどこからも読めなくなる）
+- API が読むのは LOGS_CHUNKS=true の場合だけ。先にこのツールで過去分をまとめてから有効にすること
+"""
+
+import argparse
+import logging
+import time
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+
+from app.config import settings
+from app.repositories.group_repo import GroupsTable
+from app.repositories.log_archive_repo import LogArchive, day_expires_at
+from app.repositories.log_repo import LogsTable
+from app.repositories.logchunk_repo import LogChunkTable
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def first_day(logs: LogsTable, groupid: str, meta: dict[str, Any] | None, rebuild_from: date | None) -> date | None:
+    """このグループで次にまとめる日"""
+    if meta and rebuild_from:
+        return min(rebuild_from, date.fromisoformat(meta["compacted_through"]) + timedelta(days=1))
+    if meta:
+        return date.fromisoformat(meta["compacted_through"]) + timedelta(days=1)
+    # ホット層（logs テーブル）だけを読む。iter_logs はコールド層を読まない
+    oldest = next(iter(logs.iter_logs(groupid=groupid, page_size=1)), [])
+    return date.fromisoformat(oldest[0]["created_at"][:10]) if oldest else None
+
+
+def compact_group(
+    logs: LogsTable,
+    chunks: LogChunkTable,
+    archive: LogArchive | None,
+    groupid: str,
+    through: date,
+    rebuild_from: date | None,
+    dry_run: bool,
+) -> tuple[int, int, int]:
+    """groupid のログを through の日までまとめ、(日数, 件数, パート数) を返す。"""
+    meta = chunks.read_meta(groupid)
+    archived_through = ((archive.read_index(groupid) or {}).get("archived_through") if archive else None) or ""
+    day = first_day(logs, groupid, meta, rebuild_from)
+    meta = {**(meta or {}), "days": dict((meta or {}).get("days", {}))}
+    days = compacted = parts = 0
+    while day is not None and day <= through:
+        current = day.isoformat()
+        items = [item for page in logs.iter_logs(groupid=groupid, begin=current, end=f"{current}~") for item in page]
+        if not dry_run:
+            expires_at = None
+            if archive and current <= archived_through:
+                expires_at = day_expires_at(current, archive.retention_days)
+            written = chunks.write_day(
+                groupid, current, items, expires_at=expires_at, stale_parts=int(meta["days"].get(current, 0))
+            )
+            if written:
+                meta["days"][current] = written
+            else:
+                meta["days"].pop(current, None)
+            meta["compacted_through"] = max(current, meta.get("compacted_through", current))
+            chunks.write_meta(groupid, meta)
+            parts += written
+        days += 1
+        compacted += len(items)
+        day += timedelta(days=1)
+    logger.info(f"{groupid}: compacted {compacted} logs in {days} days into {parts} chunks")
+    return days, compacted, parts
+
+
+def main(groupid: str | None, through: date, rebuild_from: date | None, dry_run: bool) -> None:
+    started = time.perf_counter()
+    logs, chunks = LogsTable(), LogChunkTable()
+    archive = LogArchive() if settings.LOGS_RETENTION_DAYS > 0 else None
+    total_days = total = total_parts = 0
+    for gid in [groupid] if groupid else GroupsTable().list_groupids():
+        days, compacted, parts = compact_group(logs, chunks, archive, gid, through, rebuild_from, dry_run)
+        total_days += days
+        total += compacted
+        total_parts += parts
+
+    verb = "would compact" if dry_run else "compacted"
+    logger.info(
+        f"{verb} {total} logs ({total_days} group-days) into {total_parts} chunks "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    yesterday = datetime.now(UTC).date() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Pack closed days of logs into compressed chunk items.")
+    parser.add_argument("--groupid", help="Compact only this group")
+    parser.add_argument("--through", type=date.fromisoformat, default=yesterday, help="Last day to compact (UTC)")
+    parser.add_argument("--rebuild-from", type=date.fromisoformat, help="Rewrite chunks from this day onwards")
+    parser.add_argument("--dry-run", action="store_true", help="Count logs without writing")
+    args = parser.parse_args()
+
+    if args.through > yesterday:
+        parser.error("--through must be a day that has already ended (UTC)")
+
+    logger.info(f"ENV: {settings.ENV}")
+    logger.info(f"DYNAMODB_ENDPOINT: {settings.DYNAMODB_ENDPOINT}")
+
+    main(args.groupid, args.through, args.rebuild_from, args.dry_run)
@@ -0,0 +1,395 @@
+# uv run --directory backend python -m tools.load_test --rate 20 --duration 30
+# uv run --directory backend python -m tools.load_test --url http://localhost:8000 --rate 200 --duration 60
+# uv run --directory backend python -m tools.load_test --url http://localhost:8000 --mix logs=1 --rate 500 --output load.json
+"""
+FastAPI アプリに、シナリオを決めた割合で混ぜた負荷をかけ、ルートごとのレイテンシ・エラー率・スループットを出す。
+
+- 負荷はオープンループ: 応答を待たずに --rate（リクエスト/秒, ポアソン到着）でシナリオを開始する。
+  レイテンシはシナリオを開始する予定だった時刻から測るため、サーバーが詰まって開始が遅れた分も含まれる
+- 対象は、--url を指定した場合は HTTP（uvicorn など）、指定しない場合は同じプロセス内の ASGI アプリ
+  （ASGI の場合はアプリの同期 I/O が負荷生成と同じイベントループを止めるため、目安にだけ使う）
+- 認証には AuthContext が読む形式（Cognito の ID トークンと同じクレーム）の JWT を --jwt-secret で署名して使う
+
+シナリオ（--mix で重みを指定。例: --mix list_users=1,group_page=2,logs=6,bulk_write=1）:
+- list_users : GET /users
+- group_page : グループ画面の表示（/groups/{groupid}、/users、/logs の先頭ページを同時に取得）
+- logs       : GET /groups/{groupid}/logs をタイプ・ユーザー・期間・並び順で絞り込み、--pages ページまでたどる
+- bulk_write : POST /groups/{groupid}/logs:batch（--batch-size 件）
+
+--groups / --users は generate_test_data.py のデータ（group1〜, user1@example.com〜）に合わせる。
+現在の AuthContext は group1 以外へのアクセスを拒否するため、既定は group1 だけ。
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import httpx
+from app.config import settings
+
+LOG_TYPES = ("LOGIN", "LOGOUT", "CREATE", "DELETE")
+DEFAULT_MIX = "list_users=1,group_page=2,logs=6,bulk_write=1"
+PERCENTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("p99.9", 0.999))
+
+
+# ====================
+# 認証
+# ====================
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def sign_jwt(userid: str, secret: str, ttl: int = 3600) -> str:
+    """Cognito の ID トークンと同じクレームの JWT を HS256 で署名する。AuthContext は cognito:username を読む。"""
+    now = int(time.time())
+    header = {"alg": "HS256", "typ": "JWT"}
+    claims = {
+        "sub": str(uuid.uuid5(uuid.NAMESPACE_URL, userid)),
+        "cognito:username": userid,
+        "email": userid,
+        "token_use": "id",
+        "iss": f"https://cognito-idp.{settings.REGION_NAME}.amazonaws.com/load-test",
+        "aud": "load-test",
+        "iat": now,
+        "exp": now + ttl,
+    }
+    signing_input = f"{b64url(json.dumps(header).encode())}.{b64url(json.dumps(claims).encode())}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64url(signature)}"
+
+
+# ====================
+# 集計
+# ====================
+
+
+@dataclass(slots=True)
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)  # 秒
+    statuses: Counter[str] = field(default_factory=Counter)
+    errors: int = 0
+
+
+@dataclass
+class Recorder:
+    measure_from: float  # これより前に予定したシナリオ（ウォームアップ）は集計しない
+    routes: dict[str, RouteStats] = field(default_factory=lambda: defaultdict(RouteStats))
+    dropped: int = 0  # 同時実行数の上限で開始できなかったシナリオ
+
+    def record(self, route: str, scheduled: float, status: str, ok: bool) -> None:
+        if scheduled < self.measure_from:
+            return
+        stats = self.routes[route]
+        stats.latencies.append(time.perf_counter() - scheduled)
+        stats.statuses[status] += 1
+        stats.errors += not ok
+
+
+@dataclass
+class Session:
+    """1回のシナリオ実行。最初のリクエストは予定時刻から、続くリクエストは送信した時刻からレイテンシを測る。"""
+
+    client: httpx.AsyncClient
+    recorder: Recorder
+    scheduled: float
+    token: str
+
+    async def request(self, route: str, method: str, path: str, **kwargs: Any) -> httpx.Response | None:
+        started = self.scheduled
+        self.scheduled = time.perf_counter()  # 同じシナリオ内の次のリクエストはここから
+        try:
+            response = await self.client.request(
+                method, path, headers={"Authorization": f"Bearer {self.token}"}, **kwargs
+            )
+        except httpx.HTTPError as e:
+            self.recorder.record(route, started, type(e).__name__, False)
+            return None
+        self.recorder.record(route, started, str(response.status_code), response.status_code < 400)
+        return response
+
+
+# ====================
+# シナリオ
+# ====================
+
+
+@dataclass(frozen=True)
+class Options:
+    groups: list[str]
+    users: list[str]
+    pages: int
+    batch_size: int
+
+
+Scenario = Callable[[Session, random.Random, Options], Coroutine[Any, Any, None]]
+
+
+async def list_users(session: Session, rng: random.Random, options: Options) -> None:
+    await session.request("GET /users", "GET", "/users", params={"limit": rng.choice((25, 100))})
+
+
+async def group_page(session: Session, rng: random.Random, options: Options) -> None:
+    groupid = rng.choice(options.groups)
+    scheduled = session.scheduled
+    requests = [
+        ("GET /groups/{groupid}", f"/groups/{groupid}", {}),
+        ("GET /groups/{groupid}/users", f"/groups/{groupid}/users", {}),
+        ("GET /groups/{groupid}/logs", f"/groups/{groupid}/logs", {"limit": 25, "order": "desc"}),
+    ]
+    # 画面の表示と同じく3つを同時に送り、いずれも予定時刻から測る
+    await asyncio.gather(
+        *(
+            Session(session.client, session.recorder, scheduled, session.token).request(
+                route, "GET", path, params=params
+            )
+            for route, path, params in requests
+        )
+    )
+
+
+async def logs(session: Session, rng: random.Random, options: Options) -> None:
+    groupid = rng.choice(options.groups)
+    params: dict[str, Any] = {"limit": rng.choice((25, 100, 500)), "order": rng.choice(("asc", "desc"))}
+    choice = rng.random()
+    if choice < 0.25:
+        params["type"] = rng.choice(LOG_TYPES)
+    elif choice < 0.5:
+        params["userid"] = rng.choice(options.users)
+    elif choice < 0.75:
+        end = datetime.now(UTC) - timedelta(days=rng.randrange(30))
+        params["begin"] = (end - timedelta(days=rng.choice((1, 7)))).isoformat().replace("+00:00", "Z")
+        params["end"] = end.isoformat().replace("+00:00", "Z")
+
+    for _ in range(options.pages):
+        response = await session.request("GET /groups/{groupid}/logs", "GET", f"/groups/{groupid}/logs", params=params)
+        if response is None or response.status_code != 200:
+            return
+        last_key = response.json().get("LastEvaluatedKey")
+        if not last_key:
+            return
+        params = {**params, "startkey": json.dumps(last_key)}
+
+
+async def bulk_write(session: Session, rng: random.Random, options: Options) -> None:
+    groupid = rng.choice(options.groups)
+    entries = []
+    for _ in range(options.batch_size):
+        userid = rng.choice(options.users)
+        log_type = rng.choice(LOG_TYPES)
+        entries.append(
+            {
+                "userid": userid,
+                "username": userid.split("@")[0],
+                "type": log_type,
+                "message": f"load test {log_type.lower()}",
+                "idempotency_key": uuid.uuid4().hex,
+            }
+        )
+    await session.request(
+        "POST /groups/{groupid}/logs:batch", "POST", f"/groups/{groupid}/logs:batch", json={"entries": entries}
+    )
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "list_users": list_users,
+    "group_page": group_page,
+    "logs": logs,
+    "bulk_write": bulk_write,
+}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """ "logs=6,list_users=1" → {"logs": 6.0, "list_users": 1.0}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ====================
+# 負荷の生成
+# ====================
+
+
+async def run(
+    client: httpx.AsyncClient,
+    mix: dict[str, float],
+    options: Options,
+    rate: float,
+    duration: float,
+    warmup: float,
+    max_in_flight: int,
+    tokens: dict[str, str],
+    seed: int | None,
+) -> tuple[Recorder, float]:
+    """rate（シナリオ/秒）のポアソン到着でシナリオを開始し、(集計, 計測した秒数) を返す。"""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    started = time.perf_counter()
+    recorder = Recorder(measure_from=started + warmup)
+    in_flight: set[asyncio.Task[None]] = set()
+
+    scheduled = started
+    end = started + warmup + duration
+    while scheduled < end:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            recorder.dropped += scheduled >= recorder.measure_from
+        else:
+            scenario = SCENARIOS[rng.choices(names, weights)[0]]
+            session = Session(client, recorder, scheduled, tokens[rng.choice(options.users)])
+            task = asyncio.create_task(scenario(session, random.Random(rng.random()), options))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        scheduled += rng.expovariate(rate)
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return recorder, time.perf_counter() - recorder.measure_from
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """昇順に並べた samples の q 分位（nearest-rank）"""
+    return samples[max(0, min(len(samples) - 1, math.ceil(q * len(samples)) - 1))]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict[str, Any]:
+    routes: dict[str, dict[str, Any]] = {}
+    for route, stats in sorted(recorder.routes.items()):
+        latencies = sorted(stats.latencies)
+        count = len(latencies)
+        routes[route] = {
+            "requests": count,
+            "errors": stats.errors,
+            "error_rate": round(stats.errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2),
+            **{f"{name}_ms": round(percentile(latencies, q) * 1000, 2) for name, q in PERCENTILES},
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "statuses": dict(stats.statuses),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    errors = sum(route["errors"] for route in routes.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2),
+        "dropped_scenarios": recorder.dropped,
+        "routes": routes,
+    }
+
+
+def print_report(summary: dict[str, Any]) -> None:
+    header = f"{'route':<36}{'reqs':>8}{'err%':>7}{'rps':>8}" + "".join(f"{name:>9}" for name, _ in PERCENTILES)
+    print(header + f"{'max':>9}")
+    for route, stats in summary["routes"].items():
+        print(
+            f"{route:<36}{stats['requests']:>8}{stats['error_rate'] * 100:>6.1f}%{stats['throughput_rps']:>8.1f}"
+            + "".join(f"{stats[f'{name}_ms']:>9.1f}" for name, _ in PERCENTILES)
+            + f"{stats['max_ms']:>9.1f}"
+        )
+    print(
+        f"total: {summary['requests']} requests in {summary['elapsed_s']}s "
+        f"({summary['throughput_rps']} rps), errors {summary['error_rate'] * 100:.2f}%, "
+        f"dropped scenarios {summary['dropped_scenarios']}"
+    )
+
+
+def make_client(url: str | None, max_in_flight: int, timeout: float) -> httpx.AsyncClient:
+    if url:
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout)
+    from app.main import app  # ASGI の場合だけアプリを読み込む
+
+    # 例外はサーバーと同じく 500 の応答にして集計する
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=timeout)
+
+
+async def main(
+    url: str | None,
+    mix: dict[str, float],
+    options: Options,
+    rate: float,
+    duration: float,
+    warmup: float,
+    max_in_flight: int,
+    timeout: float,
+    jwt_secret: str,
+    seed: int | None,
+    output: str | None,
+) -> None:
+    tokens = {userid: sign_jwt(userid, jwt_secret) for userid in options.users}
+    target = url or "in-process ASGI app"
+    print(f"🚀 {rate} scenarios/s for {duration}s (+{warmup}s warmup) against {target}: {mix}", file=sys.stderr)
+    async with make_client(url, max_in_flight, timeout) as client:
+        recorder, elapsed = await run(client, mix, options, rate, duration, warmup, max_in_flight, tokens, seed)
+
+    summary = summarize(recorder, elapsed)
+    print_report(summary)
+    if output:
+        result = {"target": target, "rate": rate, "duration": duration, "mix": mix, **summary}
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop HTTP load generator for the FastAPI app.")
+    parser.add_argument("--url", help="Base URL of a running server (default: drive the app in-process over ASGI)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Default: {DEFAULT_MIX}")
+    parser.add_argument("--rate", type=float, default=20, help="Scenario arrivals per second (Poisson)")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of load before measuring")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Scenarios running at once before dropping")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--groups", default="group1", help="Comma-separated groupids to use")
+    parser.add_argument("--users", type=int, default=100, help="Use user1@example.com .. userN@example.com")
+    parser.add_argument("--pages", type=int, default=3, help="Pages followed by the logs scenario")
+    parser.add_argument("--batch-size", type=int, default=100, help="Entries per bulk_write request")
+    parser.add_argument("--jwt-secret", default="load-test", help="HS256 key used to sign test tokens")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible request sequence")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    asyncio.run(
+        main(
+            args.url,
+            args.mix,
+            Options(
+                groups=args.groups.split(","),
+                users=[f"user{i + 1}@example.com" for i in range(args.users)],
+                pages=args.pages,
+                batch_size=args.batch_size,
+            ),
+            args.rate,
+            args.duration,
+            args.warmup,
+            args.max_in_flight,
+            args.timeout,
+            args.jwt_secret,
+            args.seed,
+            args.output,
+        )
+    )
@@ -0,0 +1,112 @@
+# LOGS_BUCKET=month LOGS_SHARDS=4 uv run --directory backend python -m tools.migrate_log_keys --dry-run
+# LOGS_BUCKET=month LOGS_SHARDS=4 uv run --directory backend python -m tools.migrate_log_keys --groupid group1
+"""
+接尾辞なしのキーで保存されている既存のログを、LOGS_BUCKET / LOGS_SHARDS のキー（app/repositories/log_keys.py）に書き換える。
+
+- LOGS_BUCKET を使う場合は、書き込む前にグループごとの最も古いログの日を logbuckets テーブルに記録する
+  （begin を指定しない読み出しはその日のバケットから始まる）
+- 接尾辞付きのアイテムを書き込んでから、接尾辞なしのアイテムを削除する。途中で止まっても、
+  LOGS_LEGACY_READ=true の間は両方が重複なく読めるため、もう一度実行すればよい
+- --groupid 指定時はそのグループだけを Query で読み、それ以外は並列セグメント Scan で groupid に "#" を含まない
+  （= 接尾辞なしの）アイテムを読む
+- 全グループの移行が終わったら LOGS_LEGACY_READ=false にする
+"""
+
+import argparse
+import logging
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from app.config import settings
+from app.repositories.dynamodb import get_dynamodb_resource, get_full_table_name
+from app.repositories.log_keys import LogKeyScheme
+from app.repositories.logbucket_repo import LogBucketTable
+from boto3.dynamodb.conditions import Attr, Key
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def legacy_pages(groupid: str | None, segment: int = 0, total_segments: int = 1) -> Iterator[list[dict[str, Any]]]:
+    table = get_dynamodb_resource().Table(get_full_table_name("logs"))
+    kwargs: dict[str, Any] = {"Limit": BATCH_SIZE}
+    if groupid:
+        kwargs["KeyConditionExpression"] = Key("groupid").eq(groupid)
+    else:
+        kwargs.update(Segment=segment, TotalSegments=total_segments, FilterExpression=~Attr("groupid").contains("#"))
+    while True:
+        response = table.query(**kwargs) if groupid else table.scan(**kwargs)
+        yield response.get("Items", [])
+        last_evaluated = response.get("LastEvaluatedKey")
+        if not last_evaluated:
+            return
+        kwargs["ExclusiveStartKey"] = last_evaluated
+
+
+def migrate_pages(pages: Iterator[list[dict[str, Any]]], scheme: LogKeyScheme, dry_run: bool) -> int:
+    table = get_dynamodb_resource().Table(get_full_table_name("logs"))
+    buckets = LogBucketTable() if scheme.bucket else None
+    migrated = 0
+    for page in pages:
+        if buckets is not None and not dry_run:
+            res = buckets.record_logs(page)
+            if not res.is_success:
+                raise RuntimeError(f"Failed to record the oldest log days: {res.detail}")
+        if not dry_run and page:
+            # 書き込みをすべて終えてから削除する（同じ batch_writer に混ぜると同一キーの重複扱いになりうる）
+            with table.batch_writer() as writer:
+                for item in page:
+                    writer.put_item(Item=scheme.encode_item(item))
+            with table.batch_writer() as writer:
+                for item in page:
+                    writer.delete_item(Key={"groupid": item["groupid"], "created_at": item["created_at"]})
+        migrated += len(page)
+    return migrated
+
+
+def migrate_segment(segment: int, total_segments: int, scheme: LogKeyScheme, dry_run: bool) -> int:
+    migrated = migrate_pages(legacy_pages(None, segment, total_segments), scheme, dry_run)
+    logger.info(f"segment {segment}/{total_segments}: migrated {migrated} logs")
+    return migrated
+
+
+def main(groupid: str | None, segments: int, dry_run: bool) -> None:
+    scheme = LogKeyScheme.from_settings()
+    if not scheme.enabled:
+        raise SystemExit("LOGS_BUCKET / LOGS_SHARDS are not set; nothing to migrate")
+
+    started = time.perf_counter()
+    if groupid:
+        migrated = migrate_pages(legacy_pages(groupid), scheme, dry_run)
+    else:
+        with ThreadPoolExecutor(max_workers=segments) as executor:
+            migrated = sum(
+                executor.map(
+                    migrate_segment,
+                    range(segments),
+                    [segments] * segments,
+                    [scheme] * segments,
+                    [dry_run] * segments,
+                )
+            )
+
+    verb = "would migrate" if dry_run else "migrated"
+    logger.info(f"{verb} {migrated} logs in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite legacy log keys to the bucketed / sharded key scheme.")
+    parser.add_argument("--groupid", help="Migrate only this group (Query instead of Scan)")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--dry-run", action="store_true", help="Count legacy logs without writing")
+    args = parser.parse_args()
+
+    logger.info(f"ENV: {settings.ENV}")
+    logger.info(f"DYNAMODB_ENDPOINT: {settings.DYNAMODB_ENDPOINT}")
+    logger.info(f"LOGS_BUCKET={settings.LOGS_BUCKET} LOGS_SHARDS={settings.LOGS_SHARDS}")
+
+    main(args.groupid, args.segments, args.dry_run)
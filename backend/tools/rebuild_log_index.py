@@ -0,0 +1,132 @@
+# uv run --directory backend python -m tools.rebuild_log_index --segments 8
+# uv run --directory backend python -m tools.rebuild_log_index --groupid group1
+# uv run --directory backend python -m tools.rebuild_log_index --input ../infrastructure/localstack/dynamodb/sample_data/prototype-app-logs-devel.jsonl
+"""
+ログ全文検索用の転置インデックス（logindex）を作り直す。
+
+- --input 指定時は export_tables.py / export_sample_jsonl.py が出力した JSONL（DynamoDB 形式）を読む
+- --groupid 指定時はそのグループだけを Query で読み、それ以外は並列セグメント Scan で全件を読む
+- posting のキーは (termkey, created_at) で値を持たないため、同じログを何度登録しても結果は同じ
+- ログから消えた語の posting は削除しない。完全に作り直す場合はテーブルを作り直してから実行すること
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from app.config import settings
+from app.repositories.dynamodb import get_dynamodb_resource, get_full_table_name
+from app.repositories.log_keys import LogKeyScheme
+from app.repositories.log_repo import LogsTable
+from app.repositories.logindex_repo import LogIndexTable
+from boto3.dynamodb.types import TypeDeserializer
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+PROJECTION = "groupid, created_at, message"
+
+
+def read_export(path: Path) -> Iterator[list[dict[str, Any]]]:
+    """DynamoDB 形式の JSONL を BATCH_SIZE 件ずつ読む。"""
+    deserializer = TypeDeserializer()
+    batch: list[dict[str, Any]] = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            batch.append({k: deserializer.deserialize(v) for k, v in record.items()})
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def index_pages(pages: Iterator[list[dict[str, Any]]], index: LogIndexTable, workers: int) -> tuple[int, int]:
+    indexed = failed = 0
+    for page in pages:
+        res = index.index_logs(page, max_workers=workers)
+        if res.is_success:
+            indexed += len(page)
+        else:
+            failed += len(page)
+            logger.error(f"failed to index {len(page)} logs: {res.detail}")
+    return indexed, failed
+
+
+def scan_segment(segment: int, total_segments: int, workers: int) -> tuple[int, int]:
+    """1セグメント分を Scan し、読んだページごとに posting を書き込む。"""
+    # リソースの client は属性値を Python の値に変換して返す（backfill_log_stats.py と同じ）
+    client = get_dynamodb_resource().meta.client
+    scheme = LogKeyScheme.from_settings()
+    scan_kwargs: dict[str, Any] = {
+        "TableName": get_full_table_name("logs"),
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "ProjectionExpression": PROJECTION,
+        "Limit": BATCH_SIZE,
+    }
+
+    def _pages() -> Iterator[list[dict[str, Any]]]:
+        while True:
+            response = client.scan(**scan_kwargs)
+            items = response.get("Items", [])
+            # バケット / シャードの接尾辞付きのキー（log_keys.py）は groupid に戻す
+            yield [scheme.decode_item(item) if "#" in item["groupid"] else item for item in items]
+            last_evaluated = response.get("LastEvaluatedKey")
+            if not last_evaluated:
+                return
+            scan_kwargs["ExclusiveStartKey"] = last_evaluated
+
+    indexed, failed = index_pages(_pages(), LogIndexTable(), workers)
+    logger.info(f"segment {segment}/{total_segments}: indexed {indexed} logs")
+    return indexed, failed
+
+
+def index_all(total_segments: int, workers: int) -> tuple[int, int]:
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        results = list(
+            executor.map(
+                scan_segment,
+                range(total_segments),
+                [total_segments] * total_segments,
+                [workers] * total_segments,
+            )
+        )
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def main(input_path: Path | None, groupid: str | None, segments: int, workers: int) -> None:
+    started = time.perf_counter()
+    if input_path:
+        indexed, failed = index_pages(read_export(input_path), LogIndexTable(), workers)
+    elif groupid:
+        indexed, failed = index_pages(
+            LogsTable().iter_logs(groupid=groupid, page_size=BATCH_SIZE), LogIndexTable(), workers
+        )
+    else:
+        indexed, failed = index_all(segments, workers)
+
+    logger.info(f"indexed {indexed} logs ({failed} failed) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the log full-text search index.")
+    parser.add_argument("--input", type=Path, help="Read logs from a DynamoDB JSONL export instead of the table")
+    parser.add_argument("--groupid", help="Rebuild only this group (Query instead of Scan)")
+    parser.add_argument("--segments", type=int, default=4, help="Parallel scan segments")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel BatchWriteItem workers per segment")
+    args = parser.parse_args()
+
+    logger.info(f"ENV: {settings.ENV}")
+    logger.info(f"DYNAMODB_ENDPOINT: {settings.DYNAMODB_ENDPOINT}")
+
+    main(args.input, args.groupid, args.segments, args.workers)
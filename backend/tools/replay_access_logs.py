@@ -0,0 +1,362 @@
+# uv run --directory backend python -m tools.replay_access_logs access.log --url http://localhost:8000 --speed 10
+# aws logs filter-log-events --log-group-name /aws/lambda/prototype-app --filter-pattern '"access:"' \
+#   --query 'events[]' --output json | jq -c '.[]' > access.jsonl
+# uv run --directory backend python -m tools.replay_access_logs access.jsonl --url http://localhost:8000 --speed 50
+"""
+本番のアクセスログ（log_access_middleware の完了行と、log_start の START 行）から
+リクエストの流れを組み立て、元の到着間隔を --speed 倍に縮めて対象に送り直し、
+元のレイテンシ・ステータスの分布と比べる。
+
+入力（.gz も可。"-" は標準入力）:
+- テキストのログ: 行頭付近にタイムスタンプがある行（Python logging の asctime、Lambda の
+  "[INFO]\t2025-05-01T00:00:00.123Z\t<request id>\t..." など）。タイムスタンプの無い行は使えない
+- CloudWatch Logs のイベントの JSON Lines: {"timestamp": <epoch ms>, "message": "..."}
+
+組み立て:
+- 到着時刻は START 行があればその時刻、無ければ完了行の時刻から処理時間を引いた時刻
+- ユーザーは START 行の "by <user>" から取り、そのユーザーの JWT（load_test.py と同じ形式）を付けて送る
+- アクセスログにはリクエストボディが残らないため、既定では GET だけを送り直す（--methods で変更）
+
+送り直しは --concurrency 件までを同時に送り、埋まっている間は次のリクエストの送信を待たせる
+（予定時刻からの遅れは late_ms として出す）。
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import re
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import IO, Any
+
+import httpx
+from tools.load_test import make_client, percentile, sign_jwt
+
+COMPLETED = re.compile(
+    r'(?P<ip>\S+) - "(?P<method>[A-Z]+) (?P<target>\S+) HTTP/[\d.]+" (?P<status>\d{3}) \((?P<duration>[\d.]+)s\)'
+)
+START = re.compile(r'(?P<ip>\S+) - "(?P<method>[A-Z]+) (?P<target>\S+) HTTP/[\d.]+" by (?P<user>.+?) START')
+ACCESS_SEGMENT = re.compile(r'\S+ - "[A-Z]+ ')
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+LATENCY_PERCENTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+
+@dataclass(frozen=True, slots=True)
+class AccessRecord:
+    at: float  # 到着時刻（epoch 秒）
+    method: str
+    target: str  # パス + クエリ
+    status: int
+    duration: float  # 秒（ログの値、10ms 単位）
+    user: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class Replayed:
+    record: AccessRecord
+    status: str  # ステータスコード、または通信エラーの例外名
+    latency: float
+    late: float  # 予定時刻からの送信の遅れ
+
+
+# ====================
+# ログの読み込み
+# ====================
+
+
+def parse_timestamp(value: str) -> float:
+    """ISO 8601 風の文字列を epoch 秒にする（タイムゾーンが無ければ UTC とみなす）。"""
+    parsed = datetime.fromisoformat(value.replace(",", ".").replace(" ", "T"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=UTC)
+    return parsed.timestamp()
+
+
+def leading_timestamp(text: str) -> float | None:
+    """アクセスログ部分（<ip> - "...）より前にあるタイムスタンプ。クエリ文字列などの中の日時は使わない。"""
+    access = ACCESS_SEGMENT.search(text)
+    found = TIMESTAMP.search(text, 0, access.start()) if access else None
+    return parse_timestamp(found.group()) if found else None
+
+
+def iter_messages(lines: Iterable[str]) -> Iterator[tuple[float | None, str]]:
+    """(タイムスタンプ, メッセージ)。CloudWatch のイベント JSON と、タイムスタンプ付きのテキスト行を読む。"""
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith("{"):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            message = event.get("message", "")
+            # Lambda の行は message の中にもタイムスタンプがあるため、そちら（ログを出した時刻）を優先する
+            inline = leading_timestamp(message)
+            yield (inline if inline is not None else event.get("timestamp", 0) / 1000), message
+        else:
+            yield leading_timestamp(line), line
+
+
+def parse_access_logs(lines: Iterable[str]) -> tuple[list[AccessRecord], Counter[str]]:
+    """アクセスログから到着順のリクエストを組み立てる。読み飛ばした行の理由ごとの件数も返す。"""
+    starts: dict[tuple[str, str, str], deque[tuple[float, str]]] = defaultdict(deque)
+    records = []
+    skipped: Counter[str] = Counter()
+    for at, message in iter_messages(lines):
+        if message.endswith("START") and (start := START.search(message)):
+            if at is not None:
+                starts[(start["ip"], start["method"], start["target"])].append((at, start["user"]))
+            continue
+        completed = COMPLETED.search(message)
+        if not completed:
+            continue
+        if at is None:
+            skipped["no timestamp"] += 1
+            continue
+        duration = float(completed["duration"])
+        arrived, user = at - duration, None
+        pending = starts.get((completed["ip"], completed["method"], completed["target"]))
+        # 同じリクエストの START は完了行より前にある。古いものから対応付け、
+        # 処理時間より前の START（完了行が出なかったリクエスト）は捨てる
+        while pending and pending[0][0] <= at:
+            started_at, started_by = pending.popleft()
+            if started_at >= at - duration - 1:
+                arrived, user = started_at, started_by
+                break
+        records.append(
+            AccessRecord(
+                at=arrived,
+                method=completed["method"],
+                target=completed["target"],
+                status=int(completed["status"]),
+                duration=duration,
+                user=None if user == "unknown" else user,
+            )
+        )
+    records.sort(key=lambda record: record.at)
+    return records, skipped
+
+
+def open_log(path: str) -> IO[str]:
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+# ====================
+# 送り直し
+# ====================
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    records: list[AccessRecord],
+    speed: float,
+    concurrency: int,
+    token_of: dict[str, str],
+    default_user: str,
+) -> tuple[list[Replayed], float]:
+    """元の到着間隔を speed 倍に縮めて送り、(結果, かかった秒数) を返す。"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[Replayed] = []
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def send(record: AccessRecord, scheduled: float) -> None:
+        started = time.perf_counter()
+        user = record.user or default_user
+        headers = {"Authorization": f"Bearer {token_of[user]}"}
+        try:
+            response = await client.request(record.method, record.target, headers=headers)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            semaphore.release()
+        results.append(Replayed(record, status, time.perf_counter() - started, started - scheduled))
+
+    started = time.perf_counter()
+    first = records[0].at
+    for record in records:
+        scheduled = started + (record.at - first) / speed
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await semaphore.acquire()  # 同時実行数が埋まっている間は、以降の送信も遅れる
+        task = asyncio.create_task(send(record, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+# ====================
+# 比較
+# ====================
+
+
+def route_matcher() -> Callable[[str, str], str]:
+    """パスを FastAPI のルートのテンプレート（/groups/{groupid}/logs など）にまとめる関数"""
+    from app.main import app
+    from starlette.routing import compile_path
+
+    patterns = [(compile_path(template)[0], template) for template in app.openapi()["paths"]]
+
+    def route_of(method: str, target: str) -> str:
+        path = target.split("?", 1)[0]
+        for regex, template in patterns:
+            if regex.match(path):
+                return f"{method} {template}"
+        return f"{method} {path}"
+
+    return route_of
+
+
+def latency_stats(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    return {f"{name}_ms": round(percentile(samples, q) * 1000, 1) for name, q in LATENCY_PERCENTILES}
+
+
+def error_rate(statuses: Iterable[str]) -> float:
+    statuses = list(statuses)
+    errors = sum(not (status.isdigit() and int(status) < 400) for status in statuses)
+    return round(errors / len(statuses), 4) if statuses else 0.0
+
+
+def compare(results: list[Replayed], elapsed: float, original_span: float) -> dict[str, Any]:
+    route_of = route_matcher()
+    by_route: dict[str, list[Replayed]] = defaultdict(list)
+    for result in results:
+        by_route[route_of(result.record.method, result.record.target)].append(result)
+
+    routes = {}
+    for route, replayed in sorted(by_route.items()):
+        original_statuses = [str(result.record.status) for result in replayed]
+        replay_statuses = [result.status for result in replayed]
+        routes[route] = {
+            "requests": len(replayed),
+            "original": {
+                **latency_stats([result.record.duration for result in replayed]),
+                "error_rate": error_rate(original_statuses),
+                "statuses": dict(Counter(original_statuses)),
+            },
+            "replay": {
+                **latency_stats([result.latency for result in replayed]),
+                "error_rate": error_rate(replay_statuses),
+                "statuses": dict(Counter(replay_statuses)),
+            },
+            "status_mismatches": sum(a != b for a, b in zip(original_statuses, replay_statuses, strict=True)),
+        }
+    lateness = sorted(result.late for result in results)
+    return {
+        "requests": len(results),
+        "original_span_s": round(original_span, 2),
+        "replay_span_s": round(elapsed, 2),
+        "achieved_speed": round(original_span / elapsed, 2) if elapsed else 0.0,
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "late_ms": {name: round(percentile(lateness, q) * 1000, 1) for name, q in LATENCY_PERCENTILES},
+        "routes": routes,
+    }
+
+
+def print_report(summary: dict[str, Any]) -> None:
+    print(
+        f"{'route':<36}{'reqs':>7}{'orig p50/p95/p99 ms':>24}{'replay p50/p95/p99 ms':>26}{'err% o→r':>14}{'diff':>6}"
+    )
+    for route, stats in summary["routes"].items():
+        original, replayed = stats["original"], stats["replay"]
+        original_ms = "/".join(f"{original[f'{name}_ms']:.0f}" for name, _ in LATENCY_PERCENTILES)
+        replay_ms = "/".join(f"{replayed[f'{name}_ms']:.0f}" for name, _ in LATENCY_PERCENTILES)
+        errors = f"{original['error_rate'] * 100:.1f}→{replayed['error_rate'] * 100:.1f}"
+        print(
+            f"{route:<36}{stats['requests']:>7}{original_ms:>24}{replay_ms:>26}{errors:>14}{stats['status_mismatches']:>6}"
+        )
+    print(
+        f"total: {summary['requests']} requests, {summary['original_span_s']}s of traffic replayed in "
+        f"{summary['replay_span_s']}s (x{summary['achieved_speed']}, {summary['throughput_rps']} rps), "
+        f"late p50/p95/p99 {'/'.join(str(v) for v in summary['late_ms'].values())} ms"
+    )
+
+
+async def main(
+    paths: list[str],
+    url: str | None,
+    speed: float,
+    concurrency: int,
+    methods: set[str],
+    limit: int | None,
+    default_user: str,
+    jwt_secret: str,
+    timeout: float,
+    output: str | None,
+) -> None:
+    records: list[AccessRecord] = []
+    skipped: Counter[str] = Counter()
+    for path in paths:
+        with open_log(path) as f:
+            parsed, path_skipped = parse_access_logs(f)
+        records += parsed
+        skipped.update(path_skipped)
+    records.sort(key=lambda record: record.at)
+    skipped["method"] += sum(record.method not in methods for record in records)
+    records = [record for record in records if record.method in methods][:limit]
+    if not records:
+        raise SystemExit(f"No replayable requests found (skipped: {dict(skipped)})")
+
+    original_span = records[-1].at - records[0].at
+    users = {record.user or default_user for record in records}
+    token_of = {user: sign_jwt(user, jwt_secret) for user in users}
+    target = url or "in-process ASGI app"
+    print(
+        f"🔁 {len(records)} requests ({original_span:.1f}s of traffic) at x{speed} against {target}; "
+        f"skipped {dict(skipped)}",
+        file=sys.stderr,
+    )
+
+    async with make_client(url, concurrency, timeout) as client:
+        results, elapsed = await replay(client, records, speed, concurrency, token_of, default_user)
+
+    summary = compare(results, elapsed, original_span)
+    print_report(summary)
+    if output:
+        with open(output, "w") as f:
+            json.dump({"target": target, "speed": speed, "skipped": dict(skipped), **summary}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay access logs against the API at scaled speed.")
+    parser.add_argument("paths", nargs="+", help="Access log files (.gz ok, '-' for stdin)")
+    parser.add_argument("--url", help="Base URL of a running server (default: drive the app in-process over ASGI)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (e.g. 10 = 10x faster)")
+    parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight at once")
+    parser.add_argument("--methods", default="GET", help="Comma-separated methods to replay (bodies are not logged)")
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--default-user", default="user1@example.com", help="User for requests without a START line")
+    parser.add_argument("--jwt-secret", default="load-test", help="HS256 key used to sign test tokens")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write the comparison as JSON to this file")
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    asyncio.run(
+        main(
+            args.paths,
+            args.url,
+            args.speed,
+            args.concurrency,
+            set(args.methods.upper().split(",")),
+            args.limit,
+            args.default_user,
+            args.jwt_secret,
+            args.timeout,
+            args.output,
+        )
+    )
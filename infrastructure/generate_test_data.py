@@ -1,134 +1,277 @@
+"""
+users / groups / logs テーブルのテストデータ（DynamoDB 形式の JSON Lines）を生成します。
+
+使用方法:
+    # 既定（10 グループ・30 ユーザー・200 ログ）をカレントディレクトリに出力
+    python3 generate_test_data.py --appname prototype-app --env devel
+
+    # 負荷試験用: 1,000 グループ・1 万ユーザー・1,000 万ログ（30 日分）を gzip で出力
+    python3 generate_test_data.py --appname prototype-app --env devel \\
+        --groups 1000 --users 10000 --logs 10000000 --days 30 --compress
+
+    # ログだけを標準出力に流し、ファイルを作らずにそのまま投入する
+    python3 generate_test_data.py --appname prototype-app --env devel --logs 5000000 --stdout logs \\
+        | python3 localstack/fast_loader.py prototype-app-logs-devel -
+
+主な処理:
+    - 乱数は --seed から作るため、同じ引数なら同じデータになる（users / groups は --logs を変えても変わらない）
+    - グループの人気（ログ件数・メンバー数）は指数 --group-skew の Zipf 分布。group1 が最も多い
+    - グループ内でログを書くユーザーも指数 --user-skew の Zipf 分布（番号の小さいユーザーほど多い）
+    - ログの時刻は --days 日間に散らし、時間帯（--tz-offset の現地時刻で日中に多い）と曜日（週末は少ない）で偏らせる
+    - ログは CHUNK_SIZE 件ずつ NumPy でまとめて抽選して書き出すため、件数によらずメモリ使用量は一定
+    - created_at はマイクロ秒まで持つ。ごくまれに同じグループ・同じ時刻のログができた場合は投入時に上書きされる
+    - groups のアイテムはメンバー全員を持つため、--users を増やしすぎると人気のグループが 400KB を超える（警告を出す）
+    - NumPy が必要（pip install numpy）
+"""
+
 import argparse
-import json
-import random
-from datetime import datetime, timedelta
-from typing import Any
-
-# 定数
-NUM_GROUPS = 10
-NUM_USERS = 30
-NUM_LOGS = 200
+import gzip
+import sys
+import time
+from datetime import date, datetime
+from typing import IO, Any
+
+import numpy as np
+
 GROUP_PREFIX = "group"
 USER_PREFIX = "user"
+USER_NAMES = ["Alice", "Bob", "Charlie", "Dave", "Eve", "Frank", "Grace", "Heidi", "Ivan", "Judy"]
+ROLES = ["admin", "member", "guest"]
+PERMISSIONS = ["list_logs", "view_logs", "read_group", "get_members", "write_logs"]
+LOG_TYPES = ["LOGIN", "LOGOUT", "CREATE", "DELETE"]
+LOG_TYPE_WEIGHTS = [0.35, 0.3, 0.25, 0.1]
+# 現地時刻 0時〜23時 の相対的なログの多さ（朝から増え、昼休みに少し減り、夕方以降に減る）
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 14, 18, 17, 15, 12, 15, 17, 16, 14, 11, 8, 6, 4, 3, 2, 1]
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.4, 0.3]  # 月〜日
+CHUNK_SIZE = 100_000  # 変えると同じ --seed でも別のデータになる
+MAX_ITEM_BYTES = 400 * 1024
+
+
+def zipf_weights(n: int, skew: float) -> np.ndarray:
+    """1位〜n位の出現確率（1位が最も大きい）"""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
 
-# CLI引数の処理
-parser = argparse.ArgumentParser()
-parser.add_argument("--appname", required=True, help="アプリケーション名 (例: prototype-app)")
-parser.add_argument("--env", required=True, choices=["devel", "staging", "prod"], help="環境名")
-args = parser.parse_args()
-appname = args.appname
-env = args.env
-
-group_ids = [f"{GROUP_PREFIX}{i + 1}" for i in range(NUM_GROUPS)]
-user_emails = [f"{USER_PREFIX}{i + 1}@example.com" for i in range(NUM_USERS)]
-user_names = [
-    "Alice",
-    "Bob",
-    "Charlie",
-    "Dave",
-    "Eve",
-    "Frank",
-    "Grace",
-    "Heidi",
-    "Ivan",
-    "Judy",
-]
-
-# グループとユーザーの対応を作成
-group_to_users: dict[str, list[dict[str, str]]] = {gid: [] for gid in group_ids}
-user_to_groups: dict[str, list[str]] = {}
-
-users: list[dict[str, Any]] = []
-groups: list[dict[str, Any]] = []
-logs: list[dict[str, Any]] = []
-
-for email in user_emails:
-    name = random.choice(user_names)
-    n = random.randint(1, 5)
-    assigned_groups = random.sample(group_ids, n)
-
-    groups_list = []
-    for gid in assigned_groups:
-        role = random.choice(["admin", "member", "guest"])
-        groups_list.append({"M": {"groupid": {"S": gid}, "role": {"S": role}}})
-        group_to_users[gid].append({"email": email, "role": role})
-
-    user_to_groups[email] = assigned_groups
-
-    users.append(
-        {
-            "userid": {"S": email},
-            "email": {"S": email},
-            "username": {"S": name},
-            "groups": {"L": groups_list},
-        }
-    )
-
-    group_roles = ", ".join(f"{g['groupid']['S']}({g['role']['S']})" for g in [item["M"] for item in groups_list])
-    print(f"✅ ユーザーを追加しました: {name} ({email}) 所属グループ: {group_roles}")
-
-# グループを生成
-for gid in group_ids:
-    users_list = [{"M": {"userid": {"S": u["email"]}, "role": {"S": u["role"]}}} for u in group_to_users[gid]]
-
-    groups.append(
-        {
-            "groupid": {"S": gid},
-            "groupname": {"S": f"グループ {gid[len(GROUP_PREFIX) :]}"},
-            "users": {"L": users_list},
-        }
-    )
-
-# ログを生成
-log_types = ["LOGIN", "LOGOUT", "CREATE", "DELETE"]
-start_time = datetime(2025, 5, 1, 8, 0, 0)
-
-unique_keys = set()
-
-for _ in range(NUM_LOGS):
-    group_id = random.choice(group_ids)
-    if group_to_users[group_id]:
-        user = random.choice(group_to_users[group_id])
-        user_email = user["email"]
+
+def zipf_ranks(rng: np.random.Generator, sizes: np.ndarray, skew: float) -> np.ndarray:
+    """
+    要素数 sizes[i] の集合それぞれから、Zipf 分布に従う順位（0 始まり）を1つずつ選ぶ。
+    集合ごとに大きさが違っても一度に計算できるよう、連続のべき分布の逆関数で近似する。
+    """
+    x = rng.random(len(sizes))
+    if abs(skew - 1.0) < 1e-9:
+        ranks = np.exp(x * np.log(sizes + 1.0))
     else:
-        user_email = random.choice(user_emails)
-
-    user_name = next(u["username"]["S"] for u in users if u["userid"]["S"] == user_email)
-
-    log_type = random.choice(log_types)
-    timestamp = start_time + timedelta(minutes=random.randint(0, 1440))
-    created_at = timestamp.isoformat() + "Z"
-
-    key = (group_id, user_email, created_at)
-    if key in unique_keys:
-        continue  # skip duplicates
-    unique_keys.add(key)
-
-    logs.append(
-        {
-            "groupid": {"S": group_id},
-            "created_at": {"S": created_at},
-            "userid": {"S": user_email},
-            "username": {"S": user_name},
-            "type": {"S": log_type},
-            "message": {"S": f"{user_name} が {log_type.lower()} しました"},
-            "groupid#type": {"S": f"{group_id}#{log_type}"},
-            "groupid#userid": {"S": f"{group_id}#{user_email}"},
-        }
-    )
-
-
-# ファイル出力関数
-def write_jsonl(table_name: str, items: list[dict[str, Any]]) -> None:
-    filename = f"{appname}-{table_name}-{env}.jsonl"
-    with open(filename, "w", encoding="utf-8") as f:
-        for item in items:
-            json.dump(item, f, ensure_ascii=False)
-            f.write("\n")
-    print(f"📄 {filename} に {len(items)} 件を書き出しました。")
-
-
-# JSONL として保存
-write_jsonl("users", users)
-write_jsonl("groups", groups)
-write_jsonl("logs", logs)
+        a = 1.0 - skew
+        ranks = (((sizes + 1.0) ** a - 1.0) * x + 1.0) ** (1.0 / a)
+    return np.minimum(ranks.astype(np.int64) - 1, sizes - 1)  # type: ignore[no-any-return]
+
+
+def assign_groups(
+    rng: np.random.Generator, num_users: int, group_weights: np.ndarray, max_groups: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    ユーザーごとに 1〜max_groups 個のグループを、人気のグループほど選ばれやすく重複なしで選ぶ（Gumbel-top-k）。
+    (ユーザー番号, グループ番号, ロール番号) の配列をグループ番号・ユーザー番号の順に並べて返す。
+    """
+    num_groups = len(group_weights)
+    max_groups = min(max_groups, num_groups)
+    log_weights = np.log(group_weights)
+    users, groups = [], []
+    step = max(1, 10_000_000 // num_groups)  # (ユーザー数 × グループ数) の行列を 1,000 万要素ずつ作る
+    for begin in range(0, num_users, step):
+        count = min(step, num_users - begin)
+        keys = log_weights + rng.gumbel(size=(count, num_groups))
+        top = np.argpartition(-keys, max_groups - 1, axis=1)[:, :max_groups]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1), axis=1)
+        picked = rng.integers(1, max_groups + 1, size=count)
+        mask = np.arange(max_groups) < picked[:, None]
+        users.append(np.repeat(np.arange(begin, begin + count), picked))
+        groups.append(top[mask])
+    user_idx, group_idx = np.concatenate(users), np.concatenate(groups)
+
+    # メンバーのいないグループには、ランダムなユーザーを1人入れる
+    empty = np.setdiff1d(np.arange(num_groups), group_idx)
+    if len(empty):
+        user_idx = np.concatenate([user_idx, rng.integers(0, num_users, size=len(empty))])
+        group_idx = np.concatenate([group_idx, empty])
+
+    order = np.lexsort((user_idx, group_idx))
+    roles = rng.integers(0, len(ROLES), size=len(order))
+    return user_idx[order], group_idx[order], roles
+
+
+def day_weights(start: date, days: int) -> np.ndarray:
+    weights = np.array([WEEKDAY_WEIGHTS[date.fromordinal(start.toordinal() + d).weekday()] for d in range(days)])
+    return weights / weights.sum()  # type: ignore[no-any-return]
+
+
+def open_output(path: str, compress: bool) -> IO[str]:
+    if path == "-":
+        return sys.stdout
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8")
+
+
+def write_users(
+    f: IO[str], user_ids: list[str], user_names: list[str], member_user: Any, member_group: Any, member_role: Any
+) -> int:
+    memberships: list[list[str]] = [[] for _ in user_ids]
+    for u, g, r in zip(member_user.tolist(), member_group.tolist(), member_role.tolist(), strict=True):
+        memberships[u].append(
+            f'{{"M": {{"groupid": {{"S": "{GROUP_PREFIX}{g + 1}"}}, "role": {{"S": "{ROLES[r]}"}}}}}}'
+        )
+    for userid, name, groups in zip(user_ids, user_names, memberships, strict=True):
+        f.write(
+            f'{{"userid": {{"S": "{userid}"}}, "email": {{"S": "{userid}"}}, "username": {{"S": "{name}"}}, '
+            f'"groups": {{"L": [{", ".join(groups)}]}}}}\n'
+        )
+    return len(user_ids)
+
+
+def write_groups(
+    f: IO[str], num_groups: int, user_ids: list[str], member_user: Any, member_group: Any, member_role: Any
+) -> int:
+    bounds = np.searchsorted(member_group, np.arange(num_groups + 1))
+    permissions = ", ".join(f'{{"S": "{p}"}}' for p in PERMISSIONS)
+    oversized = 0
+    for g in range(num_groups):
+        members = [
+            f'{{"M": {{"userid": {{"S": "{user_ids[u]}"}}, "role": {{"S": "{ROLES[r]}"}}}}}}'
+            for u, r in zip(
+                member_user[bounds[g] : bounds[g + 1]].tolist(),
+                member_role[bounds[g] : bounds[g + 1]].tolist(),
+                strict=True,
+            )
+        ]
+        line = (
+            f'{{"groupid": {{"S": "{GROUP_PREFIX}{g + 1}"}}, "groupname": {{"S": "グループ {g + 1}"}}, '
+            f'"permissions": {{"L": [{permissions}]}}, "users": {{"L": [{", ".join(members)}]}}}}\n'
+        )
+        oversized += len(line.encode("utf-8")) > MAX_ITEM_BYTES
+        f.write(line)
+    if oversized:
+        print(
+            f"⚠️ {oversized} 件のグループが DynamoDB のアイテム上限（400KB）を超えています。--users か --max-groups を減らしてください",
+            file=sys.stderr,
+        )
+    return num_groups
+
+
+def write_logs(
+    f: IO[str],
+    rng: np.random.Generator,
+    num_logs: int,
+    group_weights: np.ndarray,
+    user_skew: float,
+    start: date,
+    days: int,
+    tz_offset: int,
+    user_ids: list[str],
+    user_names: list[str],
+    member_user: np.ndarray,
+    member_group: np.ndarray,
+) -> int:
+    num_groups = len(group_weights)
+    bounds = np.searchsorted(member_group, np.arange(num_groups + 1))
+    sizes = np.diff(bounds)
+    hourly = np.array(HOURLY_WEIGHTS, dtype=float) / sum(HOURLY_WEIGHTS)
+    daily = day_weights(start, days)
+    # 現地時刻の start 0時を UTC に直した時刻（マイクロ秒）
+    origin = np.datetime64(start.isoformat(), "us") - np.timedelta64(tz_offset, "h")
+    gids = [f"{GROUP_PREFIX}{g + 1}" for g in range(num_groups)]
+    messages = {(name, t): f"{name} が {t.lower()} しました" for name in set(user_names) for t in LOG_TYPES}
+
+    written = 0
+    started = time.monotonic()
+    while written < num_logs:
+        n = min(CHUNK_SIZE, num_logs - written)
+        g = rng.choice(num_groups, size=n, p=group_weights)
+        u = member_user[bounds[g] + zipf_ranks(rng, sizes[g], user_skew)]
+        offsets = (
+            rng.choice(days, size=n, p=daily) * 86_400_000_000
+            + rng.choice(24, size=n, p=hourly) * 3_600_000_000
+            + rng.integers(0, 3_600_000_000, size=n)
+        )
+        created = np.datetime_as_string(origin + offsets.astype("timedelta64[us]"), unit="us")
+        types = rng.choice(len(LOG_TYPES), size=n, p=LOG_TYPE_WEIGHTS)
+
+        lines = []
+        for gi, ui, ts, ti in zip(g.tolist(), u.tolist(), created.tolist(), types.tolist(), strict=True):
+            gid, userid, name, log_type = gids[gi], user_ids[ui], user_names[ui], LOG_TYPES[ti]
+            lines.append(
+                f'{{"groupid": {{"S": "{gid}"}}, "created_at": {{"S": "{ts}Z"}}, "userid": {{"S": "{userid}"}}, '
+                f'"username": {{"S": "{name}"}}, "type": {{"S": "{log_type}"}}, '
+                f'"message": {{"S": "{messages[name, log_type]}"}}, "groupid#type": {{"S": "{gid}#{log_type}"}}, '
+                f'"groupid#userid": {{"S": "{gid}#{userid}"}}}}\n'
+            )
+        f.writelines(lines)
+        written += n
+        elapsed = max(time.monotonic() - started, 1e-6)
+        print(f"📈 logs: {written:,} / {num_logs:,} 件 ({written / elapsed:,.0f} 件/秒)", file=sys.stderr)
+    return written
+
+
+def main(args: argparse.Namespace) -> None:
+    users_seed, logs_seed = np.random.SeedSequence(args.seed).spawn(2)
+    users_rng, logs_rng = np.random.default_rng(users_seed), np.random.default_rng(logs_seed)
+
+    group_weights = zipf_weights(args.groups, args.group_skew)
+    user_ids = [f"{USER_PREFIX}{i + 1}@example.com" for i in range(args.users)]
+    user_names = [USER_NAMES[i] for i in users_rng.integers(0, len(USER_NAMES), size=args.users).tolist()]
+    member_user, member_group, member_role = assign_groups(users_rng, args.users, group_weights, args.max_groups)
+
+    tables = [args.stdout] if args.stdout else ["users", "groups", "logs"]
+    for table in tables:
+        path = "-" if args.stdout else f"{args.output_dir}/{args.appname}-{table}-{args.env}.jsonl"
+        if args.compress and not args.stdout:
+            path += ".gz"
+        with open_output(path, args.compress) as f:
+            if table == "users":
+                count = write_users(f, user_ids, user_names, member_user, member_group, member_role)
+            elif table == "groups":
+                count = write_groups(f, args.groups, user_ids, member_user, member_group, member_role)
+            else:
+                count = write_logs(
+                    f,
+                    logs_rng,
+                    args.logs,
+                    group_weights,
+                    args.user_skew,
+                    args.start,
+                    args.days,
+                    args.tz_offset,
+                    user_ids,
+                    user_names,
+                    member_user,
+                    member_group,
+                )
+        print(f"📄 {path} に {count:,} 件を書き出しました。", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate reproducible DynamoDB JSONL test data.")
+    parser.add_argument("--appname", required=True, help="アプリケーション名 (例: prototype-app)")
+    parser.add_argument("--env", required=True, choices=["devel", "staging", "prod"], help="環境名")
+    parser.add_argument("--groups", type=int, default=10, help="Number of groups")
+    parser.add_argument("--users", type=int, default=30, help="Number of users")
+    parser.add_argument("--logs", type=int, default=200, help="Number of logs")
+    parser.add_argument("--max-groups", type=int, default=5, help="Maximum groups a user belongs to")
+    parser.add_argument("--group-skew", type=float, default=1.1, help="Zipf exponent of group popularity (0: uniform)")
+    parser.add_argument("--user-skew", type=float, default=1.1, help="Zipf exponent of user activity in a group")
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2025, 5, 1), help="First day of logs")
+    parser.add_argument("--days", type=int, default=1, help="Number of days the logs span")
+    parser.add_argument("--tz-offset", type=int, default=9, help="UTC offset (hours) of the diurnal pattern")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output-dir", default=".", help="Directory to write the JSONL files to")
+    parser.add_argument("--compress", action="store_true", help="Write .jsonl.gz files")
+    parser.add_argument("--stdout", choices=["users", "groups", "logs"], help="Write only this table to stdout")
+    args = parser.parse_args()
+
+    if min(args.groups, args.users, args.days, args.max_groups) < 1 or args.logs < 0:
+        parser.error("--groups, --users, --days and --max-groups must be positive")
+
+    started = datetime.now()
+    main(args)
+    print(f"✅ 完了しました（{(datetime.now() - started).total_seconds():.1f} 秒）", file=sys.stderr)
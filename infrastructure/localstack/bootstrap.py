@@ -0,0 +1,268 @@
+"""
+###############################################################################
+# LocalStack の初期化（init-aws.sh から実行）。何度実行しても同じ状態になる。
+###############################################################################
+
+主な処理:
+    - s3/ 以下のディレクトリ名から S3 バケットを作成し、中身をアップロード（同じ内容のオブジェクトはスキップ）
+    - dynamodb/create_tables/*.json の定義で DynamoDB テーブルを並列に作成し、ACTIVE になるのを並列に待つ
+      既に同じ定義のテーブルがあればそのまま使い、キーやインデックスが違う場合は削除して作り直す
+    - TTL を有効にする（TTL_ATTRIBUTES）
+    - dynamodb/sample_data/ の *.jsonl / *.jsonl.gz / *.snap を、テーブルごとに fast_loader.py を並列に起動して投入
+      既にアイテムがあるテーブルには投入しない（--reload で投入し直す。途中で止まった投入はチェックポイントから再開する）
+
+使用方法:
+    python3 bootstrap.py                                  # LocalStack（http://localhost:4566）を初期化
+    python3 bootstrap.py --data-dir /path/to/snapshots    # 作成済みのスナップショット（*.snap）から復元
+    python3 bootstrap.py --reload --skip-s3               # テーブルのデータだけ投入し直す
+
+スナップショットは snapshot.py write で作成する（JSONL より小さく、展開しながらそのまま投入できる）。
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+LOCALSTACK_ENDPOINT = "http://localhost:4566"
+MULTIPART_THRESHOLD = 8 * 1024 * 1024  # upload_file の既定値。これより小さいオブジェクトの ETag は MD5
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+S3_DIR = os.path.join(BASE_DIR, "s3")
+TABLE_DIR = os.path.join(BASE_DIR, "dynamodb", "create_tables")
+DATA_DIR = os.path.join(BASE_DIR, "dynamodb", "sample_data")
+DATA_SUFFIXES = (".jsonl", ".jsonl.gz", ".snap")
+
+# logs / logchunks は S3 にアーカイブ済みのものにだけ、logidempotency は全アイテムに expires_at が付く
+TTL_ATTRIBUTES = {
+    "prototype-app-logs-devel": "expires_at",
+    "prototype-app-logchunks-devel": "expires_at",
+    "prototype-app-logidempotency-devel": "expires_at",
+}
+
+
+def log(message: str) -> None:
+    print(message, flush=True)
+
+
+def upload_bucket(s3: Any, bucket_dir: str, workers: int) -> int:
+    """バケットを作成し、同じ内容のオブジェクトが無いファイルだけをアップロードして、その件数を返す。"""
+    bucket = os.path.basename(bucket_dir)
+    try:
+        s3.create_bucket(Bucket=bucket)
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+            raise
+    existing: dict[str, tuple[int, str]] = {
+        obj["Key"]: (obj["Size"], obj["ETag"].strip('"'))
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket)
+        for obj in page.get("Contents", [])
+    }
+
+    def unchanged(path: str, key: str) -> bool:
+        if key not in existing or existing[key][0] != os.path.getsize(path):
+            return False
+        if existing[key][0] >= MULTIPART_THRESHOLD:
+            return True  # マルチパートの ETag は MD5 ではないため、サイズだけで比べる
+        with open(path, "rb") as f:
+            return hashlib.md5(f.read()).hexdigest() == existing[key][1]
+
+    files = [
+        (path, os.path.relpath(path, bucket_dir).replace(os.sep, "/"))
+        for path in glob.glob(os.path.join(bucket_dir, "**", "*"), recursive=True)
+        if os.path.isfile(path)
+    ]
+    uploads = [(path, key) for path, key in files if not unchanged(path, key)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda upload: s3.upload_file(upload[0], bucket, upload[1]), uploads))
+    log(f"🪣 {bucket}: {len(uploads)} 件をアップロード（{len(files) - len(uploads)} 件は変更なし）")
+    return len(uploads)
+
+
+def table_shape(table: dict[str, Any]) -> dict[str, Any]:
+    """作り直しが必要かどうかを比べるための、キー・属性・GSI の定義"""
+    return {
+        "KeySchema": table["KeySchema"],
+        "AttributeDefinitions": sorted(table["AttributeDefinitions"], key=lambda a: a["AttributeName"]),
+        "GlobalSecondaryIndexes": sorted(
+            (gsi["IndexName"], gsi["KeySchema"], gsi["Projection"].get("ProjectionType"))
+            for gsi in table.get("GlobalSecondaryIndexes", [])
+        ),
+    }
+
+
+def ensure_table(client: Any, definition: dict[str, Any]) -> str:
+    """
+    テーブルを定義どおりの状態にして ACTIVE になるまで待つ。
+    戻り値は "created" / "recreated" / "unchanged"。
+    """
+    table_name = definition["TableName"]
+    status = "created"
+    try:
+        existing = client.describe_table(TableName=table_name)["Table"]
+    except client.exceptions.ResourceNotFoundException:
+        existing = None
+    if existing is not None:
+        if table_shape(existing) == table_shape(definition):
+            status = "unchanged"
+        else:
+            log(f"♻️ {table_name} の定義が異なるため作り直します")
+            client.delete_table(TableName=table_name)
+            client.get_waiter("table_not_exists").wait(TableName=table_name, WaiterConfig={"Delay": 1})
+            status = "recreated"
+    if status != "unchanged":
+        client.create_table(**definition)
+    client.get_waiter("table_exists").wait(TableName=table_name, WaiterConfig={"Delay": 1})
+
+    attribute = TTL_ATTRIBUTES.get(table_name)
+    if attribute:
+        ttl = client.describe_time_to_live(TableName=table_name)["TimeToLiveDescription"]
+        if ttl.get("TimeToLiveStatus") not in ("ENABLED", "ENABLING"):
+            client.update_time_to_live(
+                TableName=table_name, TimeToLiveSpecification={"Enabled": True, "AttributeName": attribute}
+            )
+    return status
+
+
+def has_items(client: Any, table_name: str) -> bool:
+    return bool(client.scan(TableName=table_name, Limit=1, Select="COUNT")["Count"])
+
+
+def data_files(data_dir: str) -> dict[str, str]:
+    """テーブル名 → 投入するファイル。同じテーブルに複数ある場合は .snap、.jsonl.gz、.jsonl の順に優先する"""
+    files: dict[str, str] = {}
+    for suffix in reversed(DATA_SUFFIXES):
+        for path in sorted(glob.glob(os.path.join(data_dir, f"*{suffix}"))):
+            name = os.path.basename(path)[: -len(suffix)]
+            files.setdefault(name, path)
+    return files
+
+
+def checkpoint_of(table_name: str, path: str) -> str:
+    """fast_loader.py が途中まで投入したときに残すチェックポイント（.snap は標準入力から読むため残らない）"""
+    return f"{path}.{table_name}.checkpoint"
+
+
+def load_file(table_name: str, path: str, endpoint_url: str, region: str, workers: int, restart: bool) -> float:
+    """
+    fast_loader.py を別プロセスで実行し、かかった秒数を返す。.snap は snapshot.py cat から標準入力で渡す。
+    restart の場合はチェックポイントを無視して最初から投入する（作り直したばかりの空のテーブル）。
+    """
+    started = time.perf_counter()
+    loader = [sys.executable, os.path.join(BASE_DIR, "fast_loader.py"), table_name]
+    options = ["--endpoint-url", endpoint_url, "--region", region, "--workers", str(workers)]
+    if restart:
+        options.append("--restart")
+    if path.endswith(".snap"):
+        cat = subprocess.Popen(
+            [sys.executable, os.path.join(BASE_DIR, "snapshot.py"), "cat", path], stdout=subprocess.PIPE
+        )
+        try:
+            result = subprocess.run([*loader, "-", *options], stdin=cat.stdout)
+        finally:
+            assert cat.stdout is not None
+            cat.stdout.close()
+            cat.wait()
+    else:
+        result = subprocess.run([*loader, path, *options])
+    if result.returncode:
+        raise RuntimeError(f"{table_name} への投入が終了コード {result.returncode} で失敗しました")
+    if path.endswith(".snap") and cat.returncode:
+        raise RuntimeError(f"snapshot.py cat {path} が終了コード {cat.returncode} で失敗しました")
+    return time.perf_counter() - started
+
+
+def main(
+    endpoint_url: str, region: str, data_dir: str, workers: int, loader_workers: int, reload: bool, skip_s3: bool
+) -> None:
+    started = time.perf_counter()
+    config = Config(max_pool_connections=workers, retries={"max_attempts": 5, "mode": "standard"})
+    dynamodb = boto3.client("dynamodb", endpoint_url=endpoint_url, region_name=region, config=config)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # S3 とテーブルの作成を同時に進める
+        uploads = []
+        if not skip_s3:
+            s3 = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+            bucket_dirs = sorted(path for path in glob.glob(os.path.join(S3_DIR, "*")) if os.path.isdir(path))
+            uploads = [executor.submit(upload_bucket, s3, path, workers) for path in bucket_dirs]
+
+        definitions = []
+        for path in sorted(glob.glob(os.path.join(TABLE_DIR, "*.json"))):
+            with open(path) as f:
+                definitions.append(json.load(f))
+        statuses = dict(
+            zip(
+                [definition["TableName"] for definition in definitions],
+                executor.map(lambda definition: ensure_table(dynamodb, definition), definitions),
+                strict=True,
+            )
+        )
+        for table_name, status in statuses.items():
+            log(f"📄 {table_name}: {status}")
+        log(f"✅ テーブル準備完了（{time.perf_counter() - started:.1f} 秒）")
+
+        # 投入するテーブルを決め、テーブルごとに fast_loader.py を並列に実行する
+        loads = []
+        for table_name, path in data_files(data_dir).items():
+            if table_name not in statuses:
+                log(f"⚠️ テーブル {table_name} が存在しません。{os.path.basename(path)} をスキップします。")
+            elif (
+                not reload
+                and statuses[table_name] == "unchanged"
+                and not os.path.exists(checkpoint_of(table_name, path))
+                and has_items(dynamodb, table_name)
+            ):
+                log(f"⏭️ {table_name} には既にデータがあるため投入をスキップします（--reload で投入し直す）")
+            else:
+                loads.append((table_name, path, statuses[table_name] != "unchanged"))
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(len(loads), 1)) as loaders:
+            futures = {
+                loaders.submit(load_file, table_name, path, endpoint_url, region, loader_workers, restart): table_name
+                for table_name, path, restart in loads
+            }
+            for future, table_name in futures.items():
+                try:
+                    log(f"📥 {table_name}: {future.result():.1f} 秒")
+                except RuntimeError as e:
+                    log(f"❌ {e}")
+                    failed += 1
+        for upload in uploads:
+            upload.result()
+
+    if failed:
+        raise SystemExit(f"❌ {failed} 件のテーブルへの投入に失敗しました")
+    log(f"🎉 LocalStack 初期化完了！（{time.perf_counter() - started:.1f} 秒）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Idempotently create LocalStack buckets/tables and load sample data.")
+    parser.add_argument("--endpoint-url", default=os.getenv("AWS_ENDPOINT_URL", LOCALSTACK_ENDPOINT))
+    parser.add_argument("--region", default=os.getenv("AWS_DEFAULT_REGION", "ap-northeast-1"))
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory of <table>.jsonl / .jsonl.gz / .snap files")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent S3 uploads and table operations")
+    parser.add_argument("--loader-workers", type=int, default=8, help="--workers passed to each fast_loader.py")
+    parser.add_argument("--reload", action="store_true", help="Load data even into tables that already have items")
+    parser.add_argument("--skip-s3", action="store_true", help="Do not create buckets or upload objects")
+    args = parser.parse_args()
+
+    main(
+        args.endpoint_url,
+        args.region,
+        args.data_dir,
+        args.workers,
+        args.loader_workers,
+        args.reload,
+        args.skip_s3,
+    )
@@ -1,153 +1,507 @@
+"""
+DynamoDB テーブルのデータを JSONL（DynamoDB 形式、1行 = 1アイテム）に書き出します。
+対象のテーブルは describe_tables/*.json（export_tables.py の出力）か、引数で指定したテーブルです。
+
+使用方法:
+    # サンプル: 各テーブルから最大 50 件を取得し、sample_data/<テーブル名>.jsonl にマージする
+    python3 export_sample_jsonl.py
+    python3 export_sample_jsonl.py prototype-app-logs-devel --pk group1 --limit 200
+
+    # 差分: 前回以降に作成・更新（updated_at、無ければ created_at）されたアイテムをすべて sample_data に反映する
+    python3 export_sample_jsonl.py --incremental
+    python3 export_sample_jsonl.py prototype-app-logs-devel --incremental --since 2026-01-01 --pk group1
+
+sample_data への反映（サンプル・差分）:
+    - <ファイル>.idx にキーと内容のハッシュを持ち、変わったアイテムだけを追記・上書きする（IncrementalJsonl）
+
+    # テーブル全体: 8 セグメントの並列 Scan で exports/<テーブル名>/segment-0000-of-0008.jsonl ... に書き出す
+    python3 export_sample_jsonl.py --all --segments 8
+    # 指定したパーティションキーの Query を並列に実行し、exports/<テーブル名>/query-0000.jsonl ... に書き出す
+    python3 export_sample_jsonl.py prototype-app-logs-devel --all --pk group1 --pk group2
+
+全体の書き出し（--all）:
+    - すべてのテーブルのセグメント（またはパーティションキー）を --workers 個のスレッドで並列に読み、
+      1ページ（最大 1MB）ごとにシャードのファイルへ追記する
+    - シャードごとに <シャード>.checkpoint（書き込み済みのバイト数と LastEvaluatedKey）を保存し、
+      途中で止まった場合は同じコマンドで続きから再開する（--restart で最初から）
+    - テーブルのすべてのシャードを書き終えたら manifest.json（シャードごとの件数）を書き、チェックポイントを消す
+    - シャードはそのまま fast_loader.py で投入できる
+"""
+
+import argparse
+import base64
+import hashlib
 import json
 import os
-import subprocess
+import struct
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+import boto3
+from botocore.config import Config
+
 AWS_REGION = "ap-northeast-1"
-MAX_ITEMS = 50  # 各テーブルから取得する最大アイテム数
+MAX_ITEMS = 50  # サンプルとして各テーブルから取得する最大アイテム数
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DESCRIBE_DIR = os.path.join(BASE_DIR, "dynamodb", "describe_tables")
 OUTPUT_DIR = os.path.join(BASE_DIR, "dynamodb", "sample_data")
+EXPORT_DIR = os.path.join(BASE_DIR, "dynamodb", "exports")
+WATERMARK_ATTRIBUTES = ("updated_at", "created_at")
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-
-def scan_table_sample(table_name: str, max_items: int) -> Any:
-    print(f"📥 テーブル「{table_name}」から最大 {max_items} 件のデータを取得中 (Scan)...")
-    result = subprocess.run(
-        [
-            "aws",
-            "dynamodb",
-            "scan",
-            "--table-name",
-            table_name,
-            "--region",
-            AWS_REGION,
-            "--limit",
-            str(max_items),
-        ],
-        stdout=subprocess.PIPE,
-        text=True,
-        check=True,
-    )
-    return json.loads(result.stdout).get("Items", [])
+
+def to_json(value: Any) -> Any:
+    """AWS CLI の出力と同じく、バイナリ（B / BS）は base64 の文字列にする。"""
+    if isinstance(value, bytes | bytearray):
+        return base64.b64encode(value).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
 
-def query_table_sample(table_name: str, pk_name: str, pk_value: str, max_items: int) -> Any:
+def encode_item(item: dict[str, Any]) -> bytes:
+    return (json.dumps(item, ensure_ascii=False, default=to_json) + "\n").encode("utf-8")
+
+
+def key_schema(table_name: str) -> tuple[str, str | None, str]:
+    """(パーティションキー名, ソートキー名, パーティションキーの型)"""
+    with open(os.path.join(DESCRIBE_DIR, f"{table_name}.json")) as f:
+        table = json.load(f)["Table"]
+    keys = {k["KeyType"]: k["AttributeName"] for k in table["KeySchema"]}
+    types = {a["AttributeName"]: a["AttributeType"] for a in table["AttributeDefinitions"]}
+    return keys["HASH"], keys.get("RANGE"), types[keys["HASH"]]
+
+
+# ---- サンプル ----
+
+
+def sample_table(client: Any, table_name: str, pk_value: str | None, max_items: int) -> list[dict[str, Any]]:
+    if pk_value is None:
+        print(f"📥 テーブル「{table_name}」から最大 {max_items} 件のデータを取得中 (Scan)...")
+        return client.scan(TableName=table_name, Limit=max_items).get("Items", [])  # type: ignore[no-any-return]
+    pk_name, _, pk_type = key_schema(table_name)
     print(f"📥 テーブル「{table_name}」から最大 {max_items} 件のデータを取得中 (Query)...")
-    result = subprocess.run(
-        [
-            "aws",
-            "dynamodb",
-            "query",
-            "--table-name",
-            table_name,
-            "--region",
-            AWS_REGION,
-            "--limit",
-            str(max_items),
-            "--key-condition-expression",
-            f"{pk_name} = :pkval",
-            "--expression-attribute-values",
-            json.dumps({":pkval": pk_value}),
-        ],
-        stdout=subprocess.PIPE,
-        text=True,
-        check=True,
+    return client.query(  # type: ignore[no-any-return]
+        TableName=table_name,
+        Limit=max_items,
+        KeyConditionExpression="#pk = :pkval",
+        ExpressionAttributeNames={"#pk": pk_name},
+        ExpressionAttributeValues={":pkval": {pk_type: pk_value}},
+    ).get("Items", [])
+
+
+class IncrementalJsonl:
+    """
+    JSONL ファイルと、そのサイドカーのインデックス（<ファイル>.idx / <ファイル>.idx.json）。
+    ファイル全体を読み込んだり書き直したりせずに、アイテムを追加・更新する。
+
+    <ファイル>.idx は 1アイテム 28 バイトのレコード（キーのハッシュ, 内容のハッシュ, 行の位置, 行の長さ）を追記していく。
+    同じキーのレコードは後のものが有効。内容のハッシュが変わらないアイテムは書き込まない。
+    更新したアイテムは、長さが同じ行ならその場で上書きし、違う場合は古い行を空白で埋めて末尾に追記する
+    （空行は fast_loader.py も読み飛ばす）。空白の合計がファイルの半分を超えたら、ファイルを詰めて書き直す。
+    <ファイル>.idx.json はファイルの大きさ・空白の合計・次回の書き出しの基準（watermark）を持つ。
+    ファイルが他で書き換えられた（大きさが合わない）場合は、ファイルを1回読んでインデックスを作り直す。
+    """
+
+    RECORD = struct.Struct("<8s8sQI")
+
+    def __init__(self, path: str, pk_name: str, sk_name: str | None) -> None:
+        self.path = path
+        self.pk_name = pk_name
+        self.sk_name = sk_name
+        self.index: dict[bytes, tuple[bytes, int, int]] = {}  # キーのハッシュ → (内容のハッシュ, 位置, 長さ)
+        self.meta: dict[str, Any] = {"size": 0, "dead_bytes": 0, "watermark": None}
+        self.new_count = self.overwrite_count = self.unchanged_count = 0
+
+    def __enter__(self) -> "IncrementalJsonl":
+        if os.path.exists(f"{self.path}.idx.json"):
+            with open(f"{self.path}.idx.json") as f:
+                self.meta = json.load(f)
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size != self.meta["size"] or not os.path.exists(f"{self.path}.idx"):
+            self.rebuild()
+        else:
+            self.index = self.read_index()
+        self._file = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+        self._index_file = open(f"{self.path}.idx", "ab")
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._file.close()
+        self._index_file.close()
+        if exc_info[0] is None and self.meta["dead_bytes"] * 2 > self.meta["size"]:
+            self.compact()
+        self.write_meta()
+
+    # ---- ハッシュ ----
+
+    def key_of(self, item: dict[str, Any]) -> bytes:
+        key = [item[self.pk_name], item.get(self.sk_name) if self.sk_name else None]
+        return hashlib.blake2b(json.dumps(key, sort_keys=True).encode("utf-8"), digest_size=8).digest()
+
+    @staticmethod
+    def canonical(item: dict[str, Any]) -> bytes:
+        """内容の比較と書き込みに使う1行（キーの順序を揃える）"""
+        return (json.dumps(item, sort_keys=True, ensure_ascii=False, default=to_json) + "\n").encode("utf-8")
+
+    @staticmethod
+    def digest(line: bytes) -> bytes:
+        return hashlib.blake2b(line, digest_size=8).digest()
+
+    # ---- インデックス ----
+
+    def read_index(self) -> dict[bytes, tuple[bytes, int, int]]:
+        index = {}
+        with open(f"{self.path}.idx", "rb") as f:
+            for key, digest, offset, length in self.RECORD.iter_unpack(f.read()):
+                index[key] = (digest, offset, length)
+        return index
+
+    def rebuild(self) -> None:
+        """JSONL を先頭から1回読み、インデックスを作り直す（同じキーの行が複数ある場合は後の行を残す）。"""
+        self.index, dead_bytes, offset = {}, 0, 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        item = json.loads(line)
+                        key = self.key_of(item)
+                        if key in self.index:
+                            dead_bytes += self.index[key][2]
+                        self.index[key] = (self.digest(self.canonical(item)), offset, len(line))
+                    else:
+                        dead_bytes += len(line)
+                    offset += len(line)
+        with open(f"{self.path}.idx", "wb") as f:
+            f.write(b"".join(self.RECORD.pack(k, d, o, n) for k, (d, o, n) in self.index.items()))
+        self.meta.update(size=offset, dead_bytes=dead_bytes)
+        self.write_meta()
+
+    def write_meta(self) -> None:
+        tmp_path = f"{self.path}.idx.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, f"{self.path}.idx.json")
+
+    def compact(self) -> None:
+        """有効な行だけを元の順に書き直し、インデックスを作り直す。"""
+        tmp_path = f"{self.path}.tmp"
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            for _, offset, length in sorted(self.index.values(), key=lambda entry: entry[1]):
+                src.seek(offset)
+                dst.write(src.read(length))
+        os.replace(tmp_path, self.path)
+        self.rebuild()
+
+    # ---- 書き込み ----
+
+    def upsert(self, item: dict[str, Any]) -> None:
+        key, line = self.key_of(item), self.canonical(item)
+        digest = self.digest(line)
+        current = self.index.get(key)
+        if current and current[0] == digest:
+            self.unchanged_count += 1
+            return
+
+        if current and current[2] == len(line):
+            offset = current[1]  # 同じ長さなら元の行を上書きする
+        else:
+            if current:
+                self._file.seek(current[1])
+                self._file.write(b" " * (current[2] - 1) + b"\n")
+                self.meta["dead_bytes"] += current[2]
+            offset = self.meta["size"]
+            self.meta["size"] += len(line)
+        self._file.seek(offset)
+        self._file.write(line)
+        self.index[key] = (digest, offset, len(line))
+        self._index_file.write(self.RECORD.pack(key, digest, offset, len(line)))
+
+        label = f"{self.pk_name}={json.dumps(item[self.pk_name], ensure_ascii=False)}"
+        if self.sk_name and self.sk_name in item:
+            label += f", {self.sk_name}={json.dumps(item[self.sk_name], ensure_ascii=False)}"
+        if current:
+            print(f"🔁 上書き: {label}")
+            self.overwrite_count += 1
+        else:
+            print(f"➕ 新規追加: {label}")
+            self.new_count += 1
+
+    def flush(self) -> None:
+        """ここまでの書き込みを確定する（途中で止まっても、次回はインデックスと大きさから続きを判断できる）"""
+        self._file.flush()
+        self._index_file.flush()
+        self.write_meta()
+
+
+def watermark_of(item: dict[str, Any]) -> str | None:
+    """書き出しの基準に使う時刻（updated_at、無ければ created_at）"""
+    for name in WATERMARK_ATTRIBUTES:
+        value = item.get(name, {}).get("S")
+        if value:
+            return str(value)
+    return None
+
+
+def changed_since_request(table_name: str, pk_value: str | None, since: str) -> dict[str, Any]:
+    """
+    since 以降に作成・更新されたアイテムを読む Scan / Query の引数。
+    パーティションキーを指定し、ソートキーが created_at のテーブル（logs）は、ソートキーの範囲で絞り込む。
+    """
+    pk_name, sk_name, pk_type = key_schema(table_name)
+    request: dict[str, Any] = {"TableName": table_name}
+    if pk_value is not None and sk_name == "created_at":
+        request["KeyConditionExpression"] = "#pk = :pkval AND #c >= :since"
+        request["ExpressionAttributeNames"] = {"#pk": pk_name, "#c": "created_at"}
+    else:
+        request["FilterExpression"] = "#u >= :since OR (attribute_not_exists(#u) AND #c >= :since)"
+        request["ExpressionAttributeNames"] = {"#u": "updated_at", "#c": "created_at"}
+        if pk_value is not None:
+            request["KeyConditionExpression"] = "#pk = :pkval"
+            request["ExpressionAttributeNames"]["#pk"] = pk_name
+    request["ExpressionAttributeValues"] = {":since": {"S": since}}
+    if pk_value is not None:
+        request["ExpressionAttributeValues"][":pkval"] = {pk_type: pk_value}
+    return request
+
+
+def export_sample(client: Any, table_name: str, pk_value: str | None, max_items: int) -> None:
+    pk_name, sk_name, _ = key_schema(table_name)
+    items = sample_table(client, table_name, pk_value, max_items)
+    if not items:
+        print("⚠️ データが見つかりませんでした。")
+        return
+
+    with IncrementalJsonl(os.path.join(OUTPUT_DIR, f"{table_name}.jsonl"), pk_name, sk_name) as output:
+        for item in items:
+            output.upsert(item)
+    print_summary(output)
+
+
+def export_changed(client: Any, table_name: str, pk_value: str | None, since: str | None) -> None:
+    """
+    前回の書き出し以降（または since 以降）に作成・更新されたアイテムを、すべて sample_data/<テーブル名>.jsonl に反映する。
+    初回（基準が無い場合）はテーブル全体を読む。基準はテーブル全体を読んだ場合（pk_value が None）だけ進める。
+    """
+    pk_name, sk_name, _ = key_schema(table_name)
+    with IncrementalJsonl(os.path.join(OUTPUT_DIR, f"{table_name}.jsonl"), pk_name, sk_name) as output:
+        since = since or output.meta["watermark"]
+        if since:
+            request = changed_since_request(table_name, pk_value, since)
+        else:
+            request = shard_requests(table_name, 1, [pk_value] if pk_value is not None else [])
+            request = next(iter(request.values()))
+        print(f"📥 テーブル「{table_name}」から {since or '最初'} 以降のアイテムを取得中...")
+
+        operation = client.query if "KeyConditionExpression" in request else client.scan
+        watermark = output.meta["watermark"]
+        for page in iter_pages(operation, request):
+            for item in page:
+                output.upsert(item)
+                value = watermark_of(item)
+                if value and (watermark is None or value > watermark):
+                    watermark = value
+            output.flush()
+        # 最後まで読めた場合だけ基準を進める（時刻が同じアイテムを取りこぼさないよう、次回も >= で読む）
+        if pk_value is None:
+            output.meta["watermark"] = watermark
+    print_summary(output)
+
+
+def iter_pages(operation: Any, request: dict[str, Any]) -> Iterator[list[dict[str, Any]]]:
+    start_key = None
+    while True:
+        page = operation(**request, **({"ExclusiveStartKey": start_key} if start_key else {}))
+        yield page.get("Items", [])
+        start_key = page.get("LastEvaluatedKey")
+        if not start_key:
+            return
+
+
+def print_summary(output: IncrementalJsonl) -> None:
+    print(
+        f"✅ 保存しました。🧾 登録済み: {len(output.index)} 件 "
+        f"（新規 {output.new_count} 件、上書き {output.overwrite_count} 件、未更新 {output.unchanged_count} 件）\n"
     )
-    return json.loads(result.stdout).get("Items", [])
 
 
-def load_existing_jsonl(path: str) -> list[Any]:
+# ---- 全体 ----
+
+
+class Progress:
+    def __init__(self) -> None:
+        self.items: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self._reported_at = 0.0
+
+    def add(self, table_name: str, count: int) -> None:
+        with self.lock:
+            self.items[table_name] = self.items.get(table_name, 0) + count
+            now = time.monotonic()
+            if now - self._reported_at < 5:
+                return
+            self._reported_at = now
+            total = sum(self.items.values())
+            print(
+                f"📈 {total:,} 件 ({total / max(now - self.started, 1e-6):,.0f} 件/秒) "
+                + " ".join(f"{name}={count:,}" for name, count in self.items.items()),
+                file=sys.stderr,
+                flush=True,
+            )
+
+
+def read_checkpoint(path: str) -> dict[str, Any]:
     if not os.path.exists(path):
-        return []
+        return {"bytes": 0, "items": 0, "key": None, "done": False}
     with open(path) as f:
-        return [json.loads(line) for line in f if line.strip()]
-
-
-def merge_items(
-    existing_items: Any, new_items: Any, pk_name: str, sk_name: str | None = None
-) -> tuple[Any, int, int, int]:
-    item_map = {}
-    overwrite_count = 0
-    new_count = 0
-    unchanged_count = 0
-
-    def make_key(item: Any) -> tuple[str, str | None]:
-        pk_val = json.dumps(item[pk_name])
-        sk_val = json.dumps(item[sk_name]) if sk_name and sk_name in item else None
-        return (pk_val, sk_val)
-
-    for item in existing_items:
-        item_map[make_key(item)] = item
-
-    for item in new_items:
-        key = make_key(item)
-        new_item_serialized = json.dumps(item, sort_keys=True)
-
-        if key in item_map:
-            existing_item_serialized = json.dumps(item_map[key], sort_keys=True)
-            if new_item_serialized != existing_item_serialized:
-                print(f"🔁 上書き: {pk_name}={key[0]}" + (f", {sk_name}={key[1]}" if sk_name else ""))
-                item_map[key] = item
-                overwrite_count += 1
-            else:
-                unchanged_count += 1
-        else:
-            print(f"➕ 新規追加: {pk_name}={key[0]}" + (f", {sk_name}={key[1]}" if sk_name else ""))
-            item_map[key] = item
-            new_count += 1
+        return json.load(f)  # type: ignore[no-any-return]
 
-    merged = list(item_map.values())
-    return merged, new_count, overwrite_count, unchanged_count
 
+def write_checkpoint(path: str, state: dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, default=to_json)
+    os.replace(tmp_path, path)
 
-# メイン処理
-for filename in os.listdir(DESCRIBE_DIR):
-    if not filename.endswith(".json"):
-        continue
 
-    table_name = filename.replace(".json", "")
-    describe_path = os.path.join(DESCRIBE_DIR, filename)
+def export_shard(client: Any, shard_path: str, request: dict[str, Any], progress: Progress) -> int:
+    """
+    request（Scan または Query の引数）の結果をすべて shard_path に書き出し、件数を返す。
+    1ページ書き込むごとにチェックポイントを更新し、再開時は書き込み済みの位置から続ける。
+    """
+    checkpoint_path = f"{shard_path}.checkpoint"
+    state = read_checkpoint(checkpoint_path)
+    if state["done"]:
+        return int(state["items"])
 
-    try:
-        with open(describe_path) as f:
-            desc = json.load(f)
+    operation = client.query if "KeyConditionExpression" in request else client.scan
+    with open(shard_path, "ab") as f:
+        # 前回チェックポイントを書いた後に追記された分は捨てる
+        f.truncate(state["bytes"])
+        f.seek(state["bytes"])
+        while not state["done"]:
+            page = operation(**request, **({"ExclusiveStartKey": state["key"]} if state["key"] else {}))
+            f.write(b"".join(encode_item(item) for item in page.get("Items", [])))
+            f.flush()
+            state = {
+                "bytes": f.tell(),
+                "items": state["items"] + len(page.get("Items", [])),
+                "key": page.get("LastEvaluatedKey"),
+                "done": "LastEvaluatedKey" not in page,
+            }
+            write_checkpoint(checkpoint_path, state)
+            progress.add(request["TableName"], len(page.get("Items", [])))
+    return int(state["items"])
 
-        key_schema = desc["Table"]["KeySchema"]
-        pk_name = key_schema[0]["AttributeName"]
-        sk_name = key_schema[1]["AttributeName"] if len(key_schema) > 1 else None
 
-        # ユーザーに PK 入力を求める
-        pk_input = input(
-            f"🔑 テーブル「{table_name}」のパーティションキー「{pk_name}」の値を指定しますか？(空で scan): "
-        ).strip()
-        if pk_input:
-            pk_value: Any = {desc["Table"]["AttributeDefinitions"][0]["AttributeType"]: pk_input}
-            items = query_table_sample(table_name, pk_name, pk_value, MAX_ITEMS)
-        else:
-            items = scan_table_sample(table_name, MAX_ITEMS)
+def shard_requests(table_name: str, segments: int, pk_values: list[str]) -> dict[str, dict[str, Any]]:
+    """シャードのファイル名 → Scan / Query の引数"""
+    if not pk_values:
+        return {
+            f"segment-{segment:04d}-of-{segments:04d}.jsonl": {
+                "TableName": table_name,
+                "Segment": segment,
+                "TotalSegments": segments,
+            }
+            for segment in range(segments)
+        }
+    pk_name, _, pk_type = key_schema(table_name)
+    return {
+        f"query-{i:04d}.jsonl": {
+            "TableName": table_name,
+            "KeyConditionExpression": "#pk = :pkval",
+            "ExpressionAttributeNames": {"#pk": pk_name},
+            "ExpressionAttributeValues": {":pkval": {pk_type: value}},
+        }
+        for i, value in enumerate(pk_values)
+    }
 
-        if not items:
-            print("⚠️ データが見つかりませんでした。")
+
+def export_all(
+    client: Any, tables: list[str], segments: int, pk_values: list[str], workers: int, restart: bool
+) -> None:
+    progress = Progress()
+    plans: dict[str, dict[str, dict[str, Any]]] = {}
+    for table_name in tables:
+        table_dir = os.path.join(EXPORT_DIR, table_name)
+        manifest_path = os.path.join(table_dir, "manifest.json")
+        if restart and os.path.isdir(table_dir):
+            for name in os.listdir(table_dir):
+                os.remove(os.path.join(table_dir, name))
+        if os.path.exists(manifest_path):
+            print(f"⏭️ {table_name} は書き出し済みです（やり直す場合は --restart）")
             continue
+        os.makedirs(table_dir, exist_ok=True)
+        plans[table_name] = shard_requests(table_name, segments, pk_values)
+
+    # すべてのテーブルのシャードを1つのスレッドプールで並列に読む
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            (table_name, shard): executor.submit(
+                export_shard, client, os.path.join(EXPORT_DIR, table_name, shard), request, progress
+            )
+            for table_name, shards in plans.items()
+            for shard, request in shards.items()
+        }
+        counts = {key: future.result() for key, future in futures.items()}
 
-        output_path = os.path.join(OUTPUT_DIR, f"{table_name}.jsonl")
-        existing_items = load_existing_jsonl(output_path)
+    for table_name, shards in plans.items():
+        table_dir = os.path.join(EXPORT_DIR, table_name)
+        manifest = {
+            "table": table_name,
+            "shards": {shard: counts[table_name, shard] for shard in shards},
+            "items": sum(counts[table_name, shard] for shard in shards),
+        }
+        with open(os.path.join(table_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        for shard in shards:
+            os.remove(os.path.join(table_dir, f"{shard}.checkpoint"))
+        print(f"✅ {table_name}: {manifest['items']:,} 件を {len(shards)} 個のシャードに書き出しました → {table_dir}")
+
+
+def main(args: argparse.Namespace) -> None:
+    tables = args.tables or sorted(name[:-5] for name in os.listdir(DESCRIBE_DIR) if name.endswith(".json"))
+    if args.pk and len(tables) != 1:
+        raise SystemExit("--pk にはテーブルを1つだけ指定してください")
+
+    client = boto3.client(
+        "dynamodb",
+        region_name=args.region,
+        endpoint_url=args.endpoint_url,
+        config=Config(max_pool_connections=args.workers, retries={"max_attempts": 10, "mode": "adaptive"}),
+    )
+    if args.all:
+        export_all(client, tables, args.segments, args.pk, args.workers, args.restart)
+        return
 
-        merged_items, new_count, overwrite_count, unchanged_count = merge_items(existing_items, items, pk_name, sk_name)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for table_name in tables:
+        try:
+            for pk_value in args.pk or [None]:
+                if args.incremental:
+                    export_changed(client, table_name, pk_value, args.since)
+                else:
+                    export_sample(client, table_name, pk_value, args.limit)
+        except Exception as e:
+            print(f"❌ テーブル「{table_name}」の取得中にエラーが発生しました: {e}")
 
-        with open(output_path, "w") as f:
-            for item in merged_items:
-                f.write(json.dumps(item) + "\n")
 
-        print(
-            f"✅ 保存しました。🧾 登録済み: {len(merged_items)} 件 "
-            f"（新規 {new_count} 件、上書き {overwrite_count} 件、未更新 {unchanged_count} 件）\n"
-        )
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export DynamoDB items as DynamoDB-JSON lines.")
+    parser.add_argument("tables", nargs="*", help="Tables to export (default: every table in describe_tables/)")
+    parser.add_argument("--pk", action="append", default=[], help="Query this partition key value (repeatable)")
+    parser.add_argument("--limit", type=int, default=MAX_ITEMS, help="Items per table in sample mode")
+    parser.add_argument("--incremental", action="store_true", help="Apply every item changed since the last run")
+    parser.add_argument("--since", help="With --incremental: ISO timestamp to read changes from")
+    parser.add_argument("--all", action="store_true", help="Export whole tables into sharded JSONL files")
+    parser.add_argument("--segments", type=int, default=8, help="Parallel Scan segments per table (--all)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent Scan/Query streams")
+    parser.add_argument("--restart", action="store_true", help="Discard checkpoints and export from scratch (--all)")
+    parser.add_argument("--region", default=AWS_REGION)
+    parser.add_argument("--endpoint-url", help="e.g. http://localhost:4566 for LocalStack")
+    args = parser.parse_args()
 
-    except subprocess.CalledProcessError as e:
-        print(f"❌ テーブル「{table_name}」の取得中にエラーが発生しました: {e}")
-    except Exception as e:
-        print(f"❌ 想定外のエラー: {e}")
+    main(args)
@@ -5,16 +5,25 @@ LocalStack や他環境で再構築できるように、以下の2種類の JSON
 1. describe_tables/: describe-table のレスポンスをそのまま保存
 2. create_tables/: create-table コマンドに使える JSON を整形して保存
 
+使用方法:
+    python3 export_tables.py                      # AWS のすべてのテーブル
+    python3 export_tables.py --prefix prototype-app-  # 名前が prefix で始まるテーブルだけ
+    python3 export_tables.py --endpoint-url http://localhost:4566   # LocalStack から
+
 前提条件:
-- AWS CLI がインストールされていること
-- `aws configure` によって認証情報とリージョンが設定されていること
+- `aws configure` などで認証情報とリージョンが設定されていること（boto3 の既定の認証情報を使う）
 """
 
+import argparse
 import json
 import os
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Any
 
+import boto3
+from botocore.config import Config
+
 AWS_REGION = "ap-northeast-1"
 
 # このスクリプトのあるディレクトリを基準にパスを構築
@@ -22,10 +31,6 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DESCRIBE_DIR = os.path.join(BASE_DIR, "dynamodb", "describe_tables")
 CREATE_DIR = os.path.join(BASE_DIR, "dynamodb", "create_tables")
 
-# 出力ディレクトリを作成（存在する場合は何もしない）
-os.makedirs(DESCRIBE_DIR, exist_ok=True)
-os.makedirs(CREATE_DIR, exist_ok=True)
-
 
 def filter_provisioned_throughput(pt: Any) -> dict[str, int]:
     """
@@ -43,52 +48,16 @@ def filter_provisioned_throughput(pt: Any) -> dict[str, int]:
     }
 
 
-print("📋 AWS からテーブル一覧を取得しています...")
-
-# AWS CLI を使って DynamoDB テーブル名一覧を取得
-result = subprocess.run(
-    ["aws", "dynamodb", "list-tables", "--region", AWS_REGION],
-    stdout=subprocess.PIPE,
-    text=True,
-    check=True,
-)
-
-tables = json.loads(result.stdout).get("TableNames", [])
-print(f"✅ {len(tables)} 件のテーブルを検出しました: {tables}")
-
-# 各テーブルに対して describe + create JSON を生成
-for table_name in tables:
-    print(f"🔍 テーブルの詳細情報を取得中: {table_name}")
-
-    describe_path = os.path.join(DESCRIBE_DIR, f"{table_name}.json")
-    create_path = os.path.join(CREATE_DIR, f"{table_name}.json")
-
-    # describe-table を取得
-    result = subprocess.run(
-        [
-            "aws",
-            "dynamodb",
-            "describe-table",
-            "--table-name",
-            table_name,
-            "--region",
-            AWS_REGION,
-        ],
-        stdout=subprocess.PIPE,
-        text=True,
-        check=True,
-    )
-
-    describe_json = json.loads(result.stdout)
+def to_json(value: Any) -> Any:
+    """AWS CLI の出力と同じく、日時は ISO 8601 の文字列にする。"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
-    # describe JSON を保存
-    with open(describe_path, "w") as f:
-        json.dump(describe_json, f, indent=2)
-    print("📁 describe_tablesに保存しました")
 
-    # create-table 用に整形
-    table_def = describe_json["Table"]
-    create_json = {
+def create_table_input(table_def: dict[str, Any]) -> dict[str, Any]:
+    """describe-table の Table から create-table 用の JSON を作る。"""
+    create_json: dict[str, Any] = {
         "TableName": table_def["TableName"],
         "AttributeDefinitions": table_def["AttributeDefinitions"],
         "KeySchema": table_def["KeySchema"],
@@ -106,8 +75,54 @@ for table_name in tables:
             }
             for gsi in table_def["GlobalSecondaryIndexes"]
         ]
+    return create_json
+
+
+def export_table(client: Any, table_name: str) -> str:
+    describe_json = client.describe_table(TableName=table_name)
+    describe_json.pop("ResponseMetadata", None)
+
+    # describe JSON を保存
+    with open(os.path.join(DESCRIBE_DIR, f"{table_name}.json"), "w") as f:
+        json.dump(describe_json, f, indent=2, default=to_json)
 
     # create JSON を保存（常に上書き）
-    with open(create_path, "w") as f:
-        json.dump(create_json, f, indent=2)
-    print("✅ create-tables に保存しました")
+    with open(os.path.join(CREATE_DIR, f"{table_name}.json"), "w") as f:
+        json.dump(create_table_input(describe_json["Table"]), f, indent=2)
+    return table_name
+
+
+def main(region: str, endpoint_url: str | None, prefix: str, workers: int) -> None:
+    # 出力ディレクトリを作成（存在する場合は何もしない）
+    os.makedirs(DESCRIBE_DIR, exist_ok=True)
+    os.makedirs(CREATE_DIR, exist_ok=True)
+
+    # boto3 のクライアントはスレッド間で共有できる。接続プールをワーカー数に合わせる
+    client = boto3.client(
+        "dynamodb", region_name=region, endpoint_url=endpoint_url, config=Config(max_pool_connections=workers)
+    )
+
+    print("📋 テーブル一覧を取得しています...")
+    tables = [
+        name
+        for page in client.get_paginator("list_tables").paginate()
+        for name in page["TableNames"]
+        if name.startswith(prefix)
+    ]
+    print(f"✅ {len(tables)} 件のテーブルを検出しました: {tables}")
+
+    # describe-table を並列に実行する
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for table_name in executor.map(lambda name: export_table(client, name), tables):
+            print(f"📁 {table_name} を describe_tables / create_tables に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up DynamoDB table definitions as describe/create JSON.")
+    parser.add_argument("--region", default=AWS_REGION)
+    parser.add_argument("--endpoint-url", help="e.g. http://localhost:4566 for LocalStack")
+    parser.add_argument("--prefix", default="", help="Export only tables whose names start with this")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent describe-table calls")
+    args = parser.parse_args()
+
+    main(args.region, args.endpoint_url, args.prefix, args.workers)
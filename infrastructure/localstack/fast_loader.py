@@ -1,53 +1,426 @@
 """
 ###############################################################################
 # このスクリプトは、LocalStack が自動実行する初期化スクリプトです。
+# AWS 上のテーブルへの投入にも使えます（--aws を指定）。
 ###############################################################################
 
-JSONL ファイルから指定された DynamoDB テーブルへ一括でデータを投入します。
+JSONL ファイル（1行 = DynamoDB 形式の1アイテム）から、指定された DynamoDB テーブルへ一括でデータを投入します。
 
 使用方法:
-    python3 fast_loader.py <table_name> <file_path>
+    python3 fast_loader.py <table_name> <file_path> [--workers 8] [--wcu 0]
+    python3 fast_loader.py <table_name> <file_path> --aws --wcu 500     # AWS 上のテーブルに投入
+    python3 fast_loader.py <table_name> <file_path> --processes 4       # 1つのファイルを 4 プロセスで分担
+    python3 fast_loader.py <table_name> <file_path> --part 2/4          # 4 分割した 2 番目の範囲だけ（別マシンで分担）
 
 引数:
     table_name: 投入先の DynamoDB テーブル名
-    file_path : JSON Lines 形式のファイルパス
+    file_path : JSON Lines 形式のファイルパス（.jsonl.gz / .jsonl.zst はストリームで展開しながら読む。- は標準入力）
 
 主な処理:
-    - 指定された JSONL ファイルを 25件ずつ読み取り
-    - batch_write_item を使って DynamoDB に一括登録
-    - UnprocessedItems がある場合には警告を表示
+    - ファイルを 25件ずつのバッチに分け、--workers 個のスレッドで batch_write_item を並列に実行
+    - UnprocessedItems とスロットリングは指数バックオフ（ジッタ付き）で再送し、
+      --max-attempts 回で書き込めなければエラー終了する（データを黙って捨てない）
+    - --wcu を指定すると、書き込みキャパシティ（1KB = 1WCU で概算）が毎秒その値を超えないように待つ
+    - 書き込み済みのバイト位置を <file_path>.<table_name>.checkpoint に保存し、
+      途中で止まった場合は次回その位置から再開する（完了したら削除する。--restart で最初から）
+    - 件数・スループット・残り時間を定期的に表示する
+    - 非圧縮のファイルは mmap で読み、--part / --processes の範囲の境目は行頭に揃える
+    - orjson が入っていれば JSON のパースに使う
 """
 
+import argparse
+import gzip
+import heapq
+import io
 import json
+import mmap
+import os
+import random
 import sys
-from itertools import islice
-from typing import Any
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, BinaryIO
 
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-# 引数からテーブル名とファイルパスを取得
-TABLE_NAME = sys.argv[1]
-FILE_PATH = sys.argv[2]
+# 任意の依存。入っていれば使う
+try:
+    import orjson  # type: ignore[import-not-found]
 
-# LocalStack 用の DynamoDB クライアントを作成
-dynamodb = boto3.client("dynamodb", endpoint_url="http://localhost:4566", region_name="ap-northeast-1")
+    loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    loads = json.loads
+try:
+    from compression import zstd  # type: ignore[import-not-found]  # Python 3.14 以降
+except ImportError:
+    zstd = None
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:
+    zstandard = None
 
+BATCH_SIZE = 25  # batch_write_item の上限
+LOCALSTACK_ENDPOINT = "http://localhost:4566"
+THROTTLE_ERRORS = ("ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded")
 
-def batch_write_requests(file_path: str) -> Any:
+
+class RateLimiter:
+    """トークンバケット。rate が 0 の場合は制限しない。"""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: float) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # 1秒分を超えるバッチも通せるよう、バケットが満杯なら借り越しを許す
+                if self.tokens >= amount or self.tokens >= self.rate:
+                    self.tokens -= amount
+                    return
+                wait_seconds = (amount - self.tokens) / self.rate
+            time.sleep(min(wait_seconds, 1.0))
+
+
+class Checkpoint:
     """
-    指定された JSONL ファイルを 25 件ずつ読み取り、DynamoDB の
-    batch_write_item に渡せる形式のリクエストを生成するジェネレータ。
+    書き込みが完了したバイト位置の記録。バッチは並列に完了するため、
+    先頭から途切れなく完了した位置（watermark）だけを保存する。path が None の場合は保存しない（標準入力）。
     """
-    with open(file_path, encoding="utf-8") as f:
-        while True:
-            batch = list(islice(f, 25))  # 最大25行ずつ取得
-            if not batch:
-                break
-            yield [{"PutRequest": {"Item": json.loads(line)}} for line in batch]
 
+    def __init__(self, path: str | None, source: str, offset: int) -> None:
+        self.path = path
+        self.source = source
+        self.offset = offset
+        self._done: list[tuple[int, int]] = []  # (開始位置, 終了位置) の heap
+        self._saved_at = 0.0
+
+    @staticmethod
+    def load(path: str, source: str) -> int | None:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") != os.path.abspath(source) or state.get("size") != os.path.getsize(source):
+            raise SystemExit(f"❌ {path} は別のファイルのチェックポイントです。--restart で最初から投入してください")
+        return int(state["offset"])
+
+    def complete(self, start: int, end: int) -> None:
+        heapq.heappush(self._done, (start, end))
+        while self._done and self._done[0][0] == self.offset:
+            self.offset = heapq.heappop(self._done)[1]
+
+    def save(self, force: bool = False) -> None:
+        if self.path is None or (not force and time.monotonic() - self._saved_at < 2):
+            return
+        state = {"source": os.path.abspath(self.source), "size": os.path.getsize(self.source), "offset": self.offset}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def remove(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Progress:
+    """position は読み終えたバイト数（圧縮ファイルの場合は圧縮後のバイト数）。total_bytes が 0 の場合は割合と残り時間を出さない。"""
+
+    def __init__(self, total_bytes: int, start_position: int, label: str = "") -> None:
+        self.total_bytes = total_bytes
+        self.start_position = start_position
+        self.label = label
+        self.items = 0
+        self.retries = 0
+        self.started = time.monotonic()
+        self._reported_at = 0.0
+
+    def report(self, position: int, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._reported_at < 5:
+            return
+        self._reported_at = now
+        elapsed = max(now - self.started, 1e-6)
+        rate = (position - self.start_position) / elapsed
+        message = f"📈 {self.label}{self.items:,} 件"
+        if self.total_bytes:
+            message += f" ({position / self.total_bytes * 100:.1f}%)"
+        message += f" {self.items / elapsed:,.0f} 件/秒 {rate / 1024 / 1024:.2f} MB/秒 再送 {self.retries:,} 回"
+        if self.total_bytes and rate > 0:
+            message += f" 残り約 {(self.total_bytes - position) / rate:,.0f} 秒"
+        print(message, file=sys.stderr, flush=True)
+
+
+def batched(lines: Iterator[bytes], offset: int) -> Iterator[tuple[int, int, list[bytes]]]:
+    """offset から始まる行を 25 行ずつまとめ、(開始位置, 終了位置, 行のリスト) を返す。空行は読み飛ばす。"""
+    start = offset
+    batch: list[bytes] = []
+    for line in lines:
+        offset += len(line)
+        if line.strip():
+            batch.append(line)
+        if len(batch) >= BATCH_SIZE:
+            yield start, offset, batch
+            start, batch = offset, []
+    if batch or start < offset:
+        yield start, offset, batch
+
+
+class Source:
+    """
+    入力ファイル。拡張子が .gz / .zst の場合はストリームで展開しながら読み、それ以外は mmap で読む。
+    非圧縮のファイルは行の境目で parts 個に分け、part 番目の範囲だけを読める（複数のプロセスで1つのファイルを分担する）。
+    "-" の場合は標準入力から読む（大きさが分からず、再開もできない）。
+    オフセットはいずれも展開後のバイト位置。
+    """
+
+    def __init__(self, file_path: str, part: int = 0, parts: int = 1) -> None:
+        self.file_path = file_path
+        self.stdin = file_path == "-"
+        self.size = 0 if self.stdin else os.path.getsize(file_path)
+        self.compression = "gzip" if file_path.endswith(".gz") else "zstd" if file_path.endswith(".zst") else None
+        self._raw: BinaryIO | None = None
+        self._raw_position = 0
+        if self.compression is None and not self.stdin:
+            self.start, self.end = self.split(part, parts)
+        elif parts > 1:
+            raise SystemExit("❌ 圧縮ファイルと標準入力は分割して読めません。--part / --processes を外してください")
+        else:
+            self.start, self.end = 0, self.size
+
+    def split(self, part: int, parts: int) -> tuple[int, int]:
+        """part 番目（0 始まり）の範囲。境目は size * part / parts の位置を含む行の次の行頭にずらす。"""
+        if self.size == 0:
+            return 0, 0
+        with open(self.file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+
+            def align(position: int) -> int:
+                if position <= 0 or position >= self.size:
+                    return min(max(position, 0), self.size)
+                newline = mm.find(b"\n", position - 1)
+                return self.size if newline < 0 else newline + 1
+
+            return align(self.size * part // parts), align(self.size * (part + 1) // parts)
+
+    @property
+    def total(self) -> int:
+        return self.end - self.start
+
+    def position(self, offset: int) -> int:
+        """offset まで書き込んだときの進み具合（Progress に渡す）"""
+        if self.compression is None:
+            return offset - self.start
+        # 圧縮ファイルは展開後の大きさが分からないため、元ファイルを読み進めた位置で代用する
+        # （開く前は 0、閉じた後は閉じる直前の位置）
+        return self._raw.tell() if self._raw and not self._raw.closed else self._raw_position
+
+    def iter_batches(self, offset: int) -> Iterator[tuple[int, int, list[bytes]]]:
+        if self.stdin:
+            return batched(iter(sys.stdin.buffer), offset)
+        lines = self._iter_mapped(offset) if self.compression is None else self._iter_stream(offset)
+        return batched(lines, offset)
+
+    def _iter_mapped(self, offset: int) -> Iterator[bytes]:
+        if offset >= self.end:
+            return
+        with open(self.file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while offset < self.end:
+                newline = mm.find(b"\n", offset, self.end)
+                stop = self.end if newline < 0 else newline + 1
+                yield mm[offset:stop]
+                offset = stop
+
+    def _iter_stream(self, offset: int) -> Iterator[bytes]:
+        with open(self.file_path, "rb") as raw:
+            self._raw = raw
+            try:
+                stream = self._decompress(raw)
+                # 再開時は展開しながら読み飛ばす（オフセットは行頭なので、続きは行単位で読める）
+                skip = offset
+                while skip > 0:
+                    chunk = stream.read(min(skip, 1024 * 1024))
+                    if not chunk:
+                        return
+                    skip -= len(chunk)
+                yield from stream
+            finally:
+                self._raw_position = raw.tell()
+
+    def _decompress(self, raw: BinaryIO) -> io.BufferedIOBase:
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=raw)
+        if zstd is not None:
+            return zstd.ZstdFile(raw)  # type: ignore[no-any-return]
+        if zstandard is not None:
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True))
+        raise SystemExit("❌ .zst の読み込みには Python 3.14 以降か zstandard パッケージが必要です")
+
+
+def write_batch(client: Any, table_name: str, lines: list[bytes], limiter: RateLimiter, max_attempts: int) -> int:
+    """1バッチを書き込み、再送した回数を返す。"""
+    requests = [{"PutRequest": {"Item": loads(line)}} for line in lines]
+    if not requests:
+        return 0
+    # 1アイテムの書き込みはサイズ 1KB ごとに 1WCU。DynamoDB 形式の JSON は実サイズより大きいため多めの見積もりになる
+    limiter.acquire(sum(len(line) // 1024 + 1 for line in lines))
+
+    pending: dict[str, Any] = {table_name: requests}
+    for attempt in range(max_attempts):
+        if attempt:
+            time.sleep(random.uniform(0, min(0.05 * 2**attempt, 5.0)))  # full jitter
+        try:
+            response = client.batch_write_item(RequestItems=pending)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in THROTTLE_ERRORS:
+                continue
+            raise
+        pending = response.get("UnprocessedItems") or {}
+        if not pending:
+            return attempt
+    raise RuntimeError(f"{len(pending.get(table_name, []))} 件を {max_attempts} 回の再送で書き込めませんでした")
+
+
+def load(
+    table_name: str,
+    file_path: str,
+    endpoint_url: str | None,
+    region: str,
+    workers: int,
+    wcu: float,
+    max_attempts: int,
+    checkpoint_path: str | None,
+    restart: bool,
+    part: int = 0,
+    parts: int = 1,
+) -> int:
+    """file_path（parts 個に分けた part 番目）を投入し、件数を返す。"""
+    source = Source(file_path, part, parts)
+    label = f"[{part + 1}/{parts}] " if parts > 1 else ""
+    if source.stdin:
+        checkpoint_path = None
+    elif checkpoint_path is None:
+        suffix = f".{part + 1}of{parts}" if parts > 1 else ""
+        checkpoint_path = f"{file_path}.{table_name}{suffix}.checkpoint"
+    if checkpoint_path and restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    offset = Checkpoint.load(checkpoint_path, file_path) if checkpoint_path else None
+    if offset is None:
+        offset = source.start
+    else:
+        print(f"↩️ {label}チェックポイントから再開します: {offset:,} バイト目", file=sys.stderr)
+
+    client = boto3.client(
+        "dynamodb",
+        endpoint_url=endpoint_url,
+        region_name=region,
+        config=Config(max_pool_connections=workers * 2, retries={"max_attempts": 3, "mode": "standard"}),
+    )
+    checkpoint = Checkpoint(checkpoint_path, file_path, offset)
+    progress = Progress(source.total, source.position(offset), label)
+    limiter = RateLimiter(wcu)
+
+    # 投入中のバッチは workers の2倍までにし、ファイル全体をメモリに読み込まない
+    in_flight: dict[Future[int], tuple[int, int, int]] = {}
+
+    def finish(future: Future[int]) -> None:
+        start, end, count = in_flight.pop(future)
+        progress.retries += future.result()
+        progress.items += count
+        checkpoint.complete(start, end)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for start, end, lines in source.iter_batches(offset):
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(future)
+                    checkpoint.save()
+                    progress.report(source.position(checkpoint.offset))
+                future = executor.submit(write_batch, client, table_name, lines, limiter, max_attempts)
+                in_flight[future] = (start, end, len(lines))
+            for future in list(in_flight):
+                finish(future)
+        except BaseException:
+            # 完了済みのバッチまでを保存してから終了する（未完了の投入はキャンセル）
+            for future in list(in_flight):
+                future.cancel()
+            for future in list(in_flight):
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    finish(future)
+            checkpoint.save(force=True)
+            if checkpoint_path:
+                print(f"❌ {label}中断しました。次回は {checkpoint.offset:,} バイト目から再開します", file=sys.stderr)
+            raise
+
+    progress.report(source.total, force=True)
+    checkpoint.remove()
+    print(f"✅ {label}{table_name} に {progress.items:,} 件を投入しました", file=sys.stderr)
+    return progress.items
+
+
+def load_parallel(processes: int, **kwargs: Any) -> None:
+    """非圧縮のファイルを processes 個の範囲に分け、それぞれ別のプロセスで投入する。--wcu は各プロセスに等分する。"""
+    kwargs["wcu"] = kwargs["wcu"] / processes
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(load, **kwargs, part=part, parts=processes) for part in range(processes)]
+        total = sum(future.result() for future in futures)
+    print(f"✅ {kwargs['table_name']} に合計 {total:,} 件を投入しました", file=sys.stderr)
+
+
+def parse_part(value: str) -> tuple[int, int]:
+    """ "2/4" → (1, 4)（0 始まりの番号, 分割数）"""
+    part, _, parts = value.partition("/")
+    if not (part.isdigit() and parts.isdigit() and 1 <= int(part) <= int(parts)):
+        raise argparse.ArgumentTypeError("expected N/M (e.g. 2/4)")
+    return int(part) - 1, int(parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk load a DynamoDB JSONL file (.jsonl, .jsonl.gz, .jsonl.zst).")
+    parser.add_argument("table_name")
+    parser.add_argument("file_path")
+    parser.add_argument("--aws", action="store_true", help="Write to AWS instead of LocalStack")
+    parser.add_argument("--endpoint-url", default=os.getenv("AWS_ENDPOINT_URL", LOCALSTACK_ENDPOINT))
+    parser.add_argument("--region", default=os.getenv("AWS_DEFAULT_REGION", "ap-northeast-1"))
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent batch_write_item calls")
+    parser.add_argument("--wcu", type=float, default=0, help="Target write capacity units per second (0: unlimited)")
+    parser.add_argument("--max-attempts", type=int, default=10, help="Attempts per batch before giving up")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <file_path>.<table_name>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and load from the beginning")
+    split = parser.add_mutually_exclusive_group()
+    split.add_argument("--part", type=parse_part, help="Load only the N-th of M newline-aligned ranges (N/M)")
+    split.add_argument("--processes", type=int, default=1, help="Split the file across this many processes")
+    args = parser.parse_args()
 
-# 25件ずつバッチ投入
-for batch in batch_write_requests(FILE_PATH):
-    response = dynamodb.batch_write_item(RequestItems={TABLE_NAME: batch})
-    if response.get("UnprocessedItems"):
-        print("⚠️ 一部データが未処理です。再試行が必要です。")
+    options: dict[str, Any] = {
+        "table_name": args.table_name,
+        "file_path": args.file_path,
+        "endpoint_url": None if args.aws else args.endpoint_url,
+        "region": args.region,
+        "workers": args.workers,
+        "wcu": args.wcu,
+        "max_attempts": args.max_attempts,
+        "checkpoint_path": args.checkpoint,
+        "restart": args.restart,
+    }
+    if args.processes > 1:
+        if args.checkpoint:
+            parser.error("--checkpoint cannot be combined with --processes")
+        load_parallel(args.processes, **options)
+    else:
+        part, parts = args.part or (0, 1)
+        load(**options, part=part, parts=parts)
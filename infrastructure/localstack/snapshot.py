@@ -0,0 +1,321 @@
+"""
+DynamoDB テーブルのスナップショット（列ごとに圧縮したブロックの形式, *.snap）を作成・読み出します。
+
+使用方法:
+    # JSONL（export_sample_jsonl.py --all のシャード、sample_data など）からスナップショットを作る
+    python3 snapshot.py write --table prototype-app-logs-devel -o logs.snap dynamodb/exports/prototype-app-logs-devel/*.jsonl
+
+    # DynamoDB 形式の JSONL に戻す（列とキーの範囲を選べる）。fast_loader.py にそのまま流せる
+    python3 snapshot.py cat logs.snap | python3 fast_loader.py prototype-app-logs-devel -
+    python3 snapshot.py cat logs.snap --columns groupid,created_at,type --pk group1 --sk-begin 2025-05-01 --sk-end 2025-05-02
+
+    # ヘッダとブロックの一覧
+    python3 snapshot.py info logs.snap
+
+形式:
+    MAGIC, ヘッダ, ブロック..., フッタ, フッタの位置 (8 バイト), MAGIC
+    - ヘッダ（JSON）: テーブル名と、describe_tables/<テーブル名>.json から取ったキー・属性の定義
+    - ブロック: 全アイテムをキー順に並べて --block-rows 件ごとに区切り、属性（列）ごとに zlib で圧縮したもの
+      入力（Scan のシャードなど）はキー順ではないため、--run-rows 件ずつ並べて一時ファイルに書き出し、
+      それらを merge しながらブロックに分ける。ブロックのキーの範囲が重ならないため、読み出し時に絞り込める
+      列の値がすべて同じ型（S / N / BOOL など）なら値だけを、そうでなければ DynamoDB 形式の値を並べる。
+      属性を持たないアイテムは null。DynamoDB 形式の値をそのまま持つため、JSONL に戻しても元と同じになる
+    - フッタ（JSON）: ブロックごとの位置・件数・最小と最大のキー・列ごとの位置
+    読み出し時は、フッタのキーの範囲で対象外のブロックを読み飛ばし、指定した列だけを展開する。
+    JSON は長さ（4 バイト, little endian）付きで格納する。
+"""
+
+import argparse
+import base64
+import heapq
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from collections.abc import Iterable, Iterator
+from decimal import Decimal
+from typing import IO, Any
+
+MAGIC = b"DDBSNAP1"
+BLOCK_ROWS = 10_000
+RUN_ROWS = 200_000  # 並べ替えでメモリに載せる件数。超えた分は並べて一時ファイルに書き出す
+SCALAR_TYPES = ("S", "N", "B", "BOOL")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DESCRIBE_DIR = os.path.join(BASE_DIR, "dynamodb", "describe_tables")
+
+Key = tuple[Any, ...]
+
+
+def read_schema(table_name: str, describe_dir: str = DESCRIBE_DIR) -> dict[str, Any]:
+    """describe_tables/<テーブル名>.json から、スナップショットのヘッダに入れる定義を取り出す。"""
+    with open(os.path.join(describe_dir, f"{table_name}.json")) as f:
+        table = json.load(f)["Table"]
+    keys = {k["KeyType"]: k["AttributeName"] for k in table["KeySchema"]}
+    return {
+        "table": table_name,
+        "partition_key": keys["HASH"],
+        "sort_key": keys.get("RANGE"),
+        "attributes": {a["AttributeName"]: a["AttributeType"] for a in table["AttributeDefinitions"]},
+        "indexes": [
+            {"name": gsi["IndexName"], "keys": [k["AttributeName"] for k in gsi["KeySchema"]]}
+            for gsi in table.get("GlobalSecondaryIndexes", [])
+        ],
+    }
+
+
+def key_value(value: dict[str, Any] | None) -> Any:
+    """キーの値を DynamoDB と同じ順序で比べられる形にする（N は数値、B はバイト列）。"""
+    if value is None:
+        return ()
+    if "N" in value:
+        return Decimal(value["N"])
+    if "B" in value:
+        return base64.b64decode(value["B"])
+    return value["S"]
+
+
+def pack_json(value: Any) -> bytes:
+    body = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return struct.pack("<I", len(body)) + body
+
+
+def unpack_json(f: IO[bytes]) -> Any:
+    (length,) = struct.unpack("<I", f.read(4))
+    return json.loads(f.read(length))
+
+
+def encode_column(values: list[dict[str, Any] | None]) -> bytes:
+    """1列分の値を圧縮する。すべて同じスカラー型なら {"t": 型, "v": [値...]}、それ以外は DynamoDB 形式の値を並べる。"""
+    types = {next(iter(value)) for value in values if value is not None}
+    if len(types) == 1 and (type_ := types.pop()) in SCALAR_TYPES:
+        column: dict[str, Any] = {"t": type_, "v": [None if value is None else value[type_] for value in values]}
+    else:
+        column = {"t": None, "v": values}
+    return zlib.compress(json.dumps(column, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decode_column(body: bytes) -> list[dict[str, Any] | None]:
+    column = json.loads(zlib.decompress(body))
+    if column["t"] is None:
+        return column["v"]  # type: ignore[no-any-return]
+    return [None if value is None else {column["t"]: value} for value in column["v"]]
+
+
+class SnapshotWriter:
+    def __init__(
+        self, f: IO[bytes], schema: dict[str, Any], block_rows: int = BLOCK_ROWS, run_rows: int = RUN_ROWS
+    ) -> None:
+        self.f = f
+        self.schema = schema
+        self.block_rows = block_rows
+        self.run_rows = run_rows
+        self.blocks: list[dict[str, Any]] = []
+        self.pending: list[dict[str, Any]] = []  # まだ並べていないアイテム
+        self.runs: list[IO[bytes]] = []  # キー順に並べて書き出した一時ファイル（JSON Lines）
+        self.f.write(MAGIC + pack_json({**schema, "block_rows": block_rows, "codec": "zlib"}))
+
+    def key_of(self, item: dict[str, Any]) -> Key:
+        sort_key = self.schema["sort_key"]
+        return (key_value(item.get(self.schema["partition_key"])), key_value(item.get(sort_key) if sort_key else None))
+
+    def write(self, item: dict[str, Any]) -> None:
+        self.pending.append(item)
+        if len(self.pending) >= self.run_rows:
+            self.spill()
+
+    def spill(self) -> None:
+        """溜まったアイテムをキー順に並べ、一時ファイルに書き出す。"""
+        run = tempfile.TemporaryFile()
+        for item in sorted(self.pending, key=self.key_of):
+            run.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        run.seek(0)
+        self.runs.append(run)
+        self.pending = []
+
+    def sorted_items(self) -> Iterator[dict[str, Any]]:
+        """書き込まれた全アイテムをキー順に返す（一時ファイルに書き出した場合は merge する）。"""
+        if not self.runs:
+            return iter(sorted(self.pending, key=self.key_of))
+        if self.pending:
+            self.spill()
+        return heapq.merge(*((json.loads(line) for line in run) for run in self.runs), key=self.key_of)
+
+    def write_block(self, rows: list[dict[str, Any]]) -> None:
+        names = sorted({name for row in rows for name in row})
+        offset = self.f.tell()
+        columns = {}
+        for name in names:
+            body = encode_column([row.get(name) for row in rows])
+            columns[name] = [self.f.tell() - offset, len(body)]
+            self.f.write(body)
+        pk, sk = self.schema["partition_key"], self.schema["sort_key"]
+        self.blocks.append(
+            {
+                "offset": offset,
+                "rows": len(rows),
+                "min": [rows[0].get(pk), rows[0].get(sk) if sk else None],
+                "max": [rows[-1].get(pk), rows[-1].get(sk) if sk else None],
+                "columns": columns,
+            }
+        )
+
+    def close(self) -> int:
+        """全アイテムをキー順にブロックへ書き、フッタを書いて件数を返す。"""
+        rows: list[dict[str, Any]] = []
+        try:
+            for item in self.sorted_items():
+                rows.append(item)
+                if len(rows) >= self.block_rows:
+                    self.write_block(rows)
+                    rows = []
+            if rows:
+                self.write_block(rows)
+        finally:
+            for run in self.runs:
+                run.close()
+            self.runs, self.pending = [], []
+        footer_offset = self.f.tell()
+        self.f.write(pack_json({"blocks": self.blocks}) + struct.pack("<Q", footer_offset) + MAGIC)
+        return sum(block["rows"] for block in self.blocks)
+
+
+class SnapshotReader:
+    def __init__(self, f: IO[bytes]) -> None:
+        self.f = f
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not a snapshot file")
+        self.header: dict[str, Any] = unpack_json(f)
+        f.seek(-(8 + len(MAGIC)), os.SEEK_END)
+        (footer_offset,) = struct.unpack("<Q", f.read(8))
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("snapshot file is truncated")
+        f.seek(footer_offset)
+        self.blocks: list[dict[str, Any]] = unpack_json(f)["blocks"]
+
+    def select_blocks(self, pk: dict[str, Any] | None, sk_begin: Any, sk_end: Any) -> list[dict[str, Any]]:
+        """パーティション pk の sk_begin <= ソートキー < sk_end のアイテムを含む可能性のあるブロック"""
+        if pk is None:
+            return self.blocks
+        target = key_value(pk)
+        selected = []
+        for block in self.blocks:
+            pk_min, sk_min = (key_value(value) for value in block["min"])
+            pk_max, sk_max = (key_value(value) for value in block["max"])
+            if pk_max < target or pk_min > target:
+                continue
+            if pk_max == target and sk_begin is not None and sk_max < sk_begin:
+                continue
+            if pk_min == target and sk_end is not None and sk_min >= sk_end:
+                continue
+            selected.append(block)
+        return selected
+
+    def iter_items(
+        self,
+        columns: Iterable[str] | None = None,
+        pk: str | None = None,
+        sk_begin: str | None = None,
+        sk_end: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        アイテムを DynamoDB 形式で返す。columns を指定した場合はその列だけを展開する。
+        pk を指定した場合は、そのパーティションの sk_begin <= ソートキー < sk_end のアイテムだけを返す。
+        キーの値は文字列で指定し、ヘッダの属性の型（S / N / B）として扱う。
+        """
+        pk_name, sk_name = self.header["partition_key"], self.header["sort_key"]
+        attributes = self.header["attributes"]
+        pk_value = {attributes[pk_name]: pk} if pk is not None else None
+        begin = key_value({attributes[sk_name]: sk_begin}) if sk_name and sk_begin is not None else None
+        end = key_value({attributes[sk_name]: sk_end}) if sk_name and sk_end is not None else None
+
+        wanted = set(columns) if columns is not None else None
+        for block in self.select_blocks(pk_value, begin, end):
+            names = [name for name in block["columns"] if wanted is None or name in wanted]
+            if pk is not None:
+                names = list(dict.fromkeys([pk_name, *([sk_name] if sk_name else []), *names]))
+            decoded = {name: self.read_column(block, name) for name in names if name in block["columns"]}
+            for row in range(block["rows"]):
+                item = {name: values[row] for name, values in decoded.items() if values[row] is not None}
+                if pk is not None:
+                    if item.get(pk_name) != pk_value:
+                        continue
+                    sort = key_value(item.get(sk_name)) if sk_name else None
+                    if (begin is not None and sort < begin) or (end is not None and sort >= end):
+                        continue
+                    if wanted is not None:
+                        item = {name: value for name, value in item.items() if name in wanted}
+                yield item
+
+    def read_column(self, block: dict[str, Any], name: str) -> list[dict[str, Any] | None]:
+        offset, length = block["columns"][name]
+        self.f.seek(block["offset"] + offset)
+        return decode_column(self.f.read(length))
+
+
+def iter_jsonl(paths: list[str]) -> Iterator[dict[str, Any]]:
+    for path in paths:
+        f = sys.stdin.buffer if path == "-" else open(path, "rb")  # noqa: SIM115
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Columnar compressed snapshots of DynamoDB tables.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    write = commands.add_parser("write", help="Build a snapshot from DynamoDB-JSON lines")
+    write.add_argument("inputs", nargs="+", help="JSONL files ('-' for stdin)")
+    write.add_argument("--table", required=True, help="Table name (schema is read from describe_tables/)")
+    write.add_argument("-o", "--output", required=True)
+    write.add_argument("--block-rows", type=int, default=BLOCK_ROWS)
+    write.add_argument("--run-rows", type=int, default=RUN_ROWS, help="Items sorted in memory before spilling")
+    write.add_argument("--describe-dir", default=DESCRIBE_DIR)
+
+    cat = commands.add_parser("cat", help="Print items as DynamoDB-JSON lines")
+    cat.add_argument("snapshot")
+    cat.add_argument("--columns", help="Comma-separated attributes to output (default: all)")
+    cat.add_argument("--pk", help="Only this partition key value")
+    cat.add_argument("--sk-begin", help="With --pk: smallest sort key (inclusive)")
+    cat.add_argument("--sk-end", help="With --pk: largest sort key (exclusive)")
+
+    info = commands.add_parser("info", help="Show the header and block index")
+    info.add_argument("snapshot")
+    args = parser.parse_args()
+
+    if args.command == "write":
+        schema = read_schema(args.table, args.describe_dir)
+        tmp_path = f"{args.output}.tmp"
+        with open(tmp_path, "wb") as f:
+            writer = SnapshotWriter(f, schema, args.block_rows, args.run_rows)
+            for item in iter_jsonl(args.inputs):
+                writer.write(item)
+            count = writer.close()
+        os.replace(tmp_path, args.output)
+        print(f"✅ {args.output} に {count:,} 件を書き出しました（{len(writer.blocks)} ブロック）", file=sys.stderr)
+    elif args.command == "cat":
+        if (args.sk_begin or args.sk_end) and not args.pk:
+            parser.error("--sk-begin / --sk-end require --pk")
+        columns = args.columns.split(",") if args.columns else None
+        with open(args.snapshot, "rb") as f:
+            out = sys.stdout.buffer
+            for item in SnapshotReader(f).iter_items(columns, args.pk, args.sk_begin, args.sk_end):
+                out.write((json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8"))
+    else:
+        with open(args.snapshot, "rb") as f:
+            reader = SnapshotReader(f)
+        print(json.dumps(reader.header, ensure_ascii=False, indent=2))
+        for i, block in enumerate(reader.blocks):
+            size = sum(length for _, length in block["columns"].values())
+            print(f"block {i}: {block['rows']:,} rows, {size:,} bytes, {block['min']} .. {block['max']}")
+
+
+if __name__ == "__main__":
+    main()